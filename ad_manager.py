@@ -4,7 +4,8 @@ from models.user import db
 from models.adsense import AdSenseConfig, AdUnit, AdDisplay
 from models.player import Player
 from utils.security import log_security_event
-from utils.fraud_detection import FraudDetector
+from utils.fraud_detection import FraudDetector, HIGH_RISK_SCORE
+from utils.risk_score import RiskScoreService
 
 class AdManager:
     """Gerenciador de anúncios com controle de intervalos e proteção."""
@@ -213,13 +214,18 @@ class AdManager:
                     }
                 
                 # Verificar se o jogador não está sendo suspeito de fraude
+                # (bloqueia apenas com FRAUD_RISK_SCORE_ENFORCE; caso contrário, só registra)
                 fraud_score = FraudDetector.calculate_fraud_score(player_id)
-                if fraud_score > 80:  # Score alto indica possível fraude
-                    return {
-                        'can_show': False,
-                        'reason': 'High fraud score detected',
-                        'retry_after': None
-                    }
+                if fraud_score > HIGH_RISK_SCORE:  # Score alto indica possível fraude
+                    log_security_event('ad_high_fraud_score',
+                                      f'Player {player_id} requested an ad with risk score {fraud_score}',
+                                      'warning')
+                    if RiskScoreService.enforce:
+                        return {
+                            'can_show': False,
+                            'reason': 'High fraud score detected',
+                            'retry_after': None
+                        }
             
             return {'can_show': True}
         
@@ -5,12 +5,24 @@ from models.scenario import Scenario, Monster, ScenarioReward, PlayerScenarioPro
 from models.level import LevelReward
 from models.player import Player
 from models.transaction import Transaction
+from models.ledger_entry import LedgerEntry
+from models.withdrawal import WithdrawalRequest
 from models.mining import MiningSession, MiningStatistics
+from models.mining_rollup import MiningRollup
 from models.adsense import AdSenseConfig, AdUnit, AdDisplay, AdRevenue
 from models.security_log import SecurityLog
 from models.auth import RevokedToken
 from models.item import CollectibleCard, PlayerCollectibleCard
 from utils.security import token_required, admin_required, log_security_event
+from utils.money import from_units
+from utils.balance import BalanceService
+from utils.ledger import Ledger
+from utils.withdrawal_queue import WithdrawalQueue
+from utils.query_profiler import QueryProfiler
+from utils.fraud_pipeline import FraudPipeline
+from utils.fraud_detection import FraudDetector
+from utils.pagination import parse_cursor, parse_bool_arg
+from utils.fraud_alerts import FraudAlertStore
 from decimal import Decimal
 import json
 
@@ -667,7 +679,7 @@ def get_dashboard_stats():
         total_monsters = Monster.query.count()
         total_cards = CollectibleCard.query.count()
         total_transactions = Transaction.query.count()
-        total_dooficoin_mined = db.session.query(db.func.sum(MiningStat.total_mined)).scalar() or Decimal("0")
+        total_dooficoin_mined = from_units(MiningRollup.totals(MiningRollup.GLOBAL)["amount_mined_units"])
         total_security_logs = SecurityLog.query.count()
 
         return jsonify({
@@ -711,6 +723,188 @@ def get_security_logs():
         "current_page": logs.page
     })
 
+# --- Ledger ---
+@admin_bp.route("/ledger/reconcile", methods=["GET"])
+@token_required
+@admin_required
+def reconcile_ledger():
+    """Compara os saldos das carteiras com o livro-razão (snapshot + lançamentos posteriores)."""
+    after = request.args.get("after", 0, type=int)
+    limit = min(request.args.get("limit", 100, type=int), 1000)
+
+    try:
+        return jsonify(Ledger.reconcile(after_player_id=after, limit=limit))
+    except Exception as e:
+        log_security_event("admin_ledger_error", f"Error reconciling ledger: {e}", "error", user_id=request.token_payload["user_id"])
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route("/ledger/snapshots", methods=["POST"])
+@token_required
+@admin_required
+def take_ledger_snapshots():
+    """Consolida imediatamente os snapshots de saldo (normalmente feito pela tarefa periódica)."""
+    try:
+        updated = Ledger.take_snapshots()
+        log_security_event("admin_action", f"Admin took ledger snapshots ({updated} players)", "info", user_id=request.token_payload["user_id"])
+        return jsonify({"snapshots_updated": updated})
+    except Exception as e:
+        db.session.rollback()
+        log_security_event("admin_ledger_error", f"Error taking ledger snapshots: {e}", "error", user_id=request.token_payload["user_id"])
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route("/players/<int:player_id>/ledger", methods=["GET"])
+@token_required
+@admin_required
+def get_player_ledger(player_id):
+    """Retorna os lançamentos do jogador (mais recentes primeiro) e o saldo segundo o livro-razão."""
+    before = request.args.get("before", type=int)
+    limit = min(request.args.get("limit", 50, type=int), 200)
+
+    try:
+        query = LedgerEntry.query.filter_by(player_id=player_id)
+        if before:
+            query = query.filter(LedgerEntry.id < before)
+
+        entries = query.order_by(LedgerEntry.id.desc()).limit(limit).all()
+        return jsonify({
+            "entries": [entry.to_dict() for entry in entries],
+            "ledger_balance": from_units(Ledger.balance_of(player_id)),
+            "next_before": entries[-1].id if len(entries) == limit else None
+        })
+    except Exception as e:
+        log_security_event("admin_ledger_error", f"Error fetching ledger for player (ID: {player_id}): {e}", "error", user_id=request.token_payload["user_id"])
+        return jsonify({"error": str(e)}), 500
+
+# --- Withdrawals ---
+@admin_bp.route("/withdrawals/reconciliation", methods=["GET"])
+@token_required
+@admin_required
+def get_withdrawals_to_reconcile():
+    """Saques com desfecho desconhecido na rede, aguardando conferência (mais antigos primeiro)."""
+    after = request.args.get("after", 0, type=int)
+    limit = max(1, min(request.args.get("limit", 50, type=int), 200))
+
+    withdrawals = WithdrawalRequest.query.filter(
+        WithdrawalRequest.status == WithdrawalRequest.NEEDS_RECONCILIATION,
+        WithdrawalRequest.id > after
+    ).order_by(WithdrawalRequest.id).limit(limit).all()
+    return jsonify({
+        "withdrawals": [withdrawal.to_dict() for withdrawal in withdrawals],
+        "next_after": withdrawals[-1].id if len(withdrawals) == limit else None
+    })
+
+@admin_bp.route("/withdrawals/<int:withdrawal_id>/reconcile", methods=["POST"])
+@token_required
+@admin_required
+def reconcile_withdrawal(withdrawal_id):
+    """
+    Finaliza um saque em reconciliação conforme a rede.
+
+    Corpo: {"tx_hash": "0x..."} se a transferência foi encontrada, ou {"error": "..."} se
+    não existe na rede (o valor reservado é estornado ao jogador).
+    """
+    data = request.get_json(silent=True) or {}
+    tx_hash = data.get("tx_hash")
+    error = data.get("error")
+    if bool(tx_hash) == bool(error):
+        return jsonify({"error": "Exactly one of tx_hash or error is required"}), 400
+
+    admin_id = request.token_payload["user_id"]
+    try:
+        withdrawal = WithdrawalQueue.resolve(withdrawal_id, tx_hash=tx_hash, error=error)
+        if not withdrawal:
+            return jsonify({"error": "Withdrawal not awaiting reconciliation"}), 404
+
+        db.session.commit()
+        log_security_event("admin_action", f"Admin reconciled withdrawal (ID: {withdrawal_id}) as {withdrawal.status}", "warning", user_id=admin_id)
+        return jsonify({"withdrawal": withdrawal.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        log_security_event("admin_withdrawal_error", f"Error reconciling withdrawal (ID: {withdrawal_id}): {e}", "error", user_id=admin_id)
+        return jsonify({"error": str(e)}), 500
+
+# --- Query Profiling ---
+@admin_bp.route("/query-stats", methods=["GET"])
+@token_required
+@admin_required
+def get_query_stats():
+    """Relatório de consultas SQL por endpoint (quantidade, tempo no banco e suspeitas de N+1)."""
+    return jsonify({
+        "endpoints": QueryProfiler.report(),
+        "n_plus_one_threshold": QueryProfiler.n_plus_one_threshold
+    })
+
+@admin_bp.route("/query-stats", methods=["DELETE"])
+@token_required
+@admin_required
+def reset_query_stats():
+    """Zera o relatório de consultas SQL."""
+    QueryProfiler.reset()
+    return jsonify({"message": "Query stats reset"})
+
+# --- Fraud Pipeline ---
+@admin_bp.route("/fraud-pipeline", methods=["GET"])
+@token_required
+@admin_required
+def get_fraud_pipeline_metrics():
+    """Métricas da análise de fraude em segundo plano (fila, vazão, descartes e atraso)."""
+    metrics = FraudPipeline.metrics()
+    metrics["alerts_pending"] = FraudAlertStore.pending_count()
+    metrics["alerts_dropped"] = FraudAlertStore.dropped_count()
+    return jsonify(metrics)
+
+@admin_bp.route("/fraud-alerts", methods=["GET"])
+@token_required
+@admin_required
+def get_fraud_alerts():
+    """
+    Retorna alertas de fraude, mais recentes primeiro.
+
+    Filtros: ?reviewed=true|false e ?player_id=. Paginação por cursor: ?after=<timestamp,id>
+    (o next_cursor da página anterior).
+    """
+    limit = max(1, min(request.args.get("limit", 50, type=int), 200))
+    player_id = request.args.get("player_id", type=int)
+    reviewed = request.args.get("reviewed")
+    if reviewed is not None:
+        reviewed = parse_bool_arg(reviewed)
+
+    try:
+        after = parse_cursor(request.args.get("after"))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    try:
+        alerts, next_cursor = FraudDetector.get_fraud_alerts(reviewed=reviewed, limit=limit, player_id=player_id, after=after)
+        return jsonify({
+            "alerts": [alert.to_dict() for alert in alerts],
+            "next_cursor": next_cursor,
+            "has_next": next_cursor is not None
+        })
+    except Exception as e:
+        log_security_event("admin_fraud_alerts_error", f"Error fetching fraud alerts: {e}", "error", user_id=request.token_payload["user_id"])
+        return jsonify({"error": str(e)}), 500
+
+@admin_bp.route("/fraud-alerts/<int:alert_id>/review", methods=["POST"])
+@token_required
+@admin_required
+def review_fraud_alert(alert_id):
+    """Marca um alerta de fraude como revisado, com a ação tomada (opcional)."""
+    data = request.get_json(silent=True) or {}
+    admin_id = request.token_payload["user_id"]
+
+    try:
+        if not FraudDetector.mark_alert_as_reviewed(alert_id, admin_id, data.get("action_taken")):
+            return jsonify({"error": "Fraud alert not found"}), 404
+
+        db.session.commit()
+        log_security_event("admin_action", f"Admin reviewed fraud alert (ID: {alert_id})", "info", user_id=admin_id)
+        return jsonify({"message": "Fraud alert reviewed"})
+    except Exception as e:
+        db.session.rollback()
+        log_security_event("admin_fraud_alerts_error", f"Error reviewing fraud alert (ID: {alert_id}): {e}", "error", user_id=admin_id)
+        return jsonify({"error": str(e)}), 500
+
 # --- AdSense Management (Admin) ---
 @admin_bp.route("/adsense/config", methods=["GET"])
 @token_required
@@ -881,7 +1075,9 @@ def update_player(player_id):
         player.level = data.get("level", player.level)
         player.health = data.get("health", player.health)
         player.power = data.get("power", player.power)
-        player.wallet_balance = str(data.get("wallet_balance", player.wallet_balance))
+        if "wallet_balance" in data:
+            # Ajuste lançado no livro-razão pela diferença em relação ao saldo atual
+            BalanceService.set_balance(player.id, str(data["wallet_balance"]), reference=f"admin:{request.token_payload['user_id']}")
         player.monsters_killed = data.get("monsters_killed", player.monsters_killed)
         player.players_killed = data.get("players_killed", player.players_killed)
         player.deaths = data.get("deaths", player.deaths)
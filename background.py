@@ -0,0 +1,80 @@
+import threading
+import atexit
+from database import db
+
+# Tarefas periódicas registradas (uma thread por tarefa)
+_tasks = []
+
+
+class PeriodicTask:
+    """Executa uma função periodicamente em uma thread de fundo, dentro do contexto da aplicação."""
+
+    def __init__(self, name, interval_seconds, func):
+        """
+        Args:
+            name: Nome da tarefa (usado nos logs e no nome da thread)
+            interval_seconds: Intervalo entre execuções em segundos, ou função sem
+                              argumentos que retorna a espera até a próxima execução
+            func: Função sem argumentos a ser executada a cada ciclo
+        """
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self._app = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, app):
+        """Inicia a thread da tarefa, se ainda não estiver em execução."""
+        if self.is_running:
+            return
+
+        self._app = app
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f'periodic-{self.name}', daemon=True)
+        self._thread.start()
+
+        if self not in _tasks:
+            _tasks.append(self)
+
+    def stop(self, timeout=5):
+        """Sinaliza a parada da tarefa e aguarda o término do ciclo atual."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run_once(self):
+        """Executa um ciclo da tarefa no contexto da aplicação."""
+        with self._app.app_context():
+            try:
+                return self.func()
+            except Exception as e:
+                db.session.rollback()
+                # Importação tardia para evitar ciclo com utils.security
+                from utils.security import log_security_event
+                log_security_event(f'{self.name}_task_error', str(e), 'error')
+            finally:
+                db.session.remove()
+
+    def _next_wait(self):
+        if callable(self.interval_seconds):
+            return self.interval_seconds()
+        return self.interval_seconds
+
+    def _run(self):
+        while not self._stop_event.wait(self._next_wait()):
+            self.run_once()
+
+
+def stop_all_tasks():
+    """Para todas as tarefas periódicas (chamado no encerramento do processo)."""
+    for task in list(_tasks):
+        task.stop()
+
+
+atexit.register(stop_all_tasks)
@@ -0,0 +1,202 @@
+from database import db
+from models.player import Player
+from utils.ledger import Ledger
+from utils.money import encode_units, from_units, to_units
+
+
+class BalanceService:
+    """
+    Mutações de saldo executadas no próprio banco, com UPDATEs condicionais.
+
+    O saldo nunca é lido, alterado no Python e regravado: cada operação é um
+    único UPDATE (ou um par de UPDATEs, nas transferências), então requisições
+    concorrentes em vários workers não perdem atualizações. Cada alteração aplicada
+    também gera o diário correspondente no livro-razão (utils.ledger). Nenhum método
+    faz commit; o chamador confirma tudo em sua própria transação.
+    """
+
+    @staticmethod
+    def _update(player_id, balance, guard_units=None, values=None):
+        """
+        Executa o UPDATE de um jogador e sincroniza o objeto carregado na sessão.
+
+        Args:
+            player_id: ID do jogador
+            balance: Expressão SQL com o novo wallet_balance
+            guard_units: Saldo mínimo (em unidades) exigido para aplicar a alteração
+            values: Outras colunas atualizadas no mesmo comando (ex.: contadores)
+
+        Returns:
+            bool: True se a linha foi atualizada
+        """
+        statement = db.update(Player).where(Player.id == player_id).values(
+            wallet_balance=balance, **(values or {})
+        )
+        if guard_units is not None:
+            # Comparação direta com a coluna em ponto fixo (texto de largura fixa)
+            statement = statement.where(
+                db.type_coerce(Player.wallet_balance, db.String) >= encode_units(guard_units)
+            )
+
+        result = db.session.execute(statement, execution_options={'synchronize_session': 'fetch'})
+        return result.rowcount == 1
+
+    @staticmethod
+    def balance_units(player_id):
+        """Lê o saldo atual do jogador em unidades, sem carregar o objeto."""
+        balance = db.session.execute(
+            db.select(db.type_coerce(Player.wallet_balance, db.String)).where(Player.id == player_id)
+        ).scalar()
+        return int(balance) if balance else 0
+
+    @staticmethod
+    def credit(player_id, amount, values=None, reason='reward', reference=None):
+        """
+        Adiciona uma quantidade ao saldo do jogador.
+
+        Args:
+            player_id: ID do jogador
+            amount: Quantidade em DOOF (string decimal)
+            values: Colunas adicionais a atualizar no mesmo comando
+            reason: Motivo registrado no livro-razão
+            reference: Referência opcional registrada no livro-razão
+
+        Returns:
+            bool: True se o jogador existe e foi creditado
+        """
+        units = to_units(amount)
+        credited = BalanceService._update(
+            player_id,
+            db.func.doof_add(Player.wallet_balance, encode_units(units)),
+            values=values
+        )
+        if credited:
+            Ledger.post_credit(player_id, units, reason, reference)
+        return credited
+
+    @staticmethod
+    def debit(player_id, amount, values=None, reason='purchase', reference=None):
+        """
+        Remove uma quantidade do saldo, apenas se o saldo atual for suficiente.
+
+        Args:
+            player_id: ID do jogador
+            amount: Quantidade em DOOF (string decimal)
+            values: Colunas adicionais a atualizar no mesmo comando
+            reason: Motivo registrado no livro-razão
+            reference: Referência opcional registrada no livro-razão
+
+        Returns:
+            bool: True se o débito foi aplicado, False se o saldo for insuficiente
+        """
+        units = to_units(amount)
+        debited = BalanceService._update(
+            player_id,
+            db.func.doof_sub(Player.wallet_balance, encode_units(units)),
+            guard_units=units,
+            values=values
+        )
+        if debited:
+            Ledger.post_debit(player_id, units, reason, reference)
+        return debited
+
+    @staticmethod
+    def set_balance(player_id, amount, reason='adjustment', reference=None):
+        """
+        Ajusta o saldo para um valor absoluto (uso administrativo), lançando a diferença.
+
+        Returns:
+            bool: True se o ajuste foi aplicado
+        """
+        difference = to_units(amount) - BalanceService.balance_units(player_id)
+        if difference >= 0:
+            return BalanceService.credit(player_id, from_units(difference), reason=reason, reference=reference)
+        return BalanceService.debit(player_id, from_units(-difference), reason=reason, reference=reference)
+
+    @staticmethod
+    def die(player_id, loss_divisor=10, values=None, max_attempts=3):
+        """
+        Aplica a perda de saldo por morte em um único comando: remove
+        saldo / loss_divisor (10% por padrão).
+
+        A perda é calculada a partir do saldo lido e aplicada com a condição
+        saldo >= perda; se o saldo cair nesse intervalo, a leitura é refeita.
+
+        Args:
+            player_id: ID do jogador
+            loss_divisor: Fração perdida (saldo // loss_divisor)
+            values: Colunas adicionais a atualizar no mesmo comando
+
+        Returns:
+            bool: True se a perda foi aplicada
+        """
+        for _ in range(max_attempts):
+            loss = BalanceService.balance_units(player_id) // loss_divisor
+            applied = BalanceService._update(
+                player_id,
+                db.func.doof_sub(Player.wallet_balance, encode_units(loss)),
+                guard_units=loss,
+                values=values
+            )
+            if applied:
+                Ledger.post_debit(player_id, loss, 'death')
+                return True
+
+        return False
+
+    @staticmethod
+    def transfer_ratio(from_player_id, to_player_id, divisor, from_values=None, to_values=None, reason='pvp_kill'):
+        """
+        Transfere saldo / divisor de um jogador para outro (ex.: 20% no PvP com divisor 5).
+
+        A quantidade é calculada a partir de uma leitura do saldo da vítima e aplicada
+        com um par de UPDATEs sempre na ordem crescente de ID, para que transferências
+        cruzadas (A mata B enquanto B mata A) bloqueiem as linhas na mesma ordem.
+        O débito exige saldo >= quantidade; se o saldo da vítima caiu entre a leitura
+        e a escrita, a transferência não é confirmada.
+
+        Args:
+            from_player_id: Jogador que perde o saldo (vítima)
+            to_player_id: Jogador que recebe o saldo
+            divisor: Fração transferida (saldo // divisor)
+            from_values: Colunas adicionais atualizadas na linha da vítima
+            to_values: Colunas adicionais atualizadas na linha de quem recebe
+            reason: Motivo registrado no livro-razão
+
+        Returns:
+            str: Quantidade transferida em DOOF, ou None em caso de conflito
+                 (o chamador deve desfazer a transação com rollback)
+        """
+        if from_player_id == to_player_id:
+            # Transferência para si mesmo: saldo inalterado, apenas os contadores mudam
+            return BalanceService._transfer_to_self(from_player_id, divisor, {**(from_values or {}), **(to_values or {})})
+
+        taken = BalanceService.balance_units(from_player_id) // divisor
+        encoded = encode_units(taken)
+
+        steps = {
+            from_player_id: lambda: BalanceService._update(
+                from_player_id,
+                db.func.doof_sub(Player.wallet_balance, encoded),
+                guard_units=taken,
+                values=from_values
+            ),
+            to_player_id: lambda: BalanceService._update(
+                to_player_id,
+                db.func.doof_add(Player.wallet_balance, encoded),
+                values=to_values
+            )
+        }
+
+        for player_id in sorted(steps):
+            if not steps[player_id]():
+                return None
+
+        Ledger.post_transfer(from_player_id, to_player_id, taken, reason)
+        return from_units(taken)
+
+    @staticmethod
+    def _transfer_to_self(player_id, divisor, values):
+        player_units = BalanceService.balance_units(player_id)
+        BalanceService._update(player_id, Player.wallet_balance, values=values)
+        return from_units(player_units // divisor)
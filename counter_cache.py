@@ -0,0 +1,240 @@
+import atexit
+import signal
+import sys
+import threading
+from collections import defaultdict
+from sqlalchemy import bindparam, event
+from sqlalchemy.orm import Session
+from database import db
+from utils.background import PeriodicTask
+
+# Contadores de Player incrementados pelas ações do jogo. Os totais de PlayerLevel
+# (total_monsters_killed, total_players_killed) continuam gravados na transação da
+# rota: add_monster_kill/add_player_kill os atualizam junto com a subida de nível.
+DELTA_COLUMNS = ('monsters_killed', 'player_kills', 'deaths', 'self_eliminations', 'power')
+# Colunas gravadas por valor absoluto (a última escrita vence)
+SET_COLUMNS = ('health',)
+# Chave em session.info com as alterações da transação atual (aplicadas no commit)
+_STAGED_KEY = 'counter_cache_staged'
+
+_lock = threading.Lock()
+# Alterações ainda não gravadas: player_id -> {'deltas': {coluna: n}, 'sets': {coluna: valor}}
+_pending = {}
+# Lote sendo gravado no momento (continua visível nas leituras até o commit)
+_in_flight = {}
+
+
+def _empty_entry():
+    return {'deltas': defaultdict(int), 'sets': {}}
+
+
+class CounterCache:
+    """
+    Cache write-behind dos contadores quentes de Player.
+
+    As ações do jogo acumulam deltas na sessão; no commit eles passam para a fila
+    em memória (e são descartados se a transação for desfeita), e uma tarefa de
+    fundo grava tudo com um único UPDATE em lote (executemany) a cada poucas
+    centenas de milissegundos. As leituras feitas por to_dict() e value() somam os
+    deltas pendentes e os da transação atual. No encerramento do processo (atexit/SIGTERM) os deltas restantes
+    são gravados; uma queda abrupta perde no máximo um intervalo de gravação.
+    """
+
+    _app = None
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """Inicia a gravação periódica e a gravação final no encerramento."""
+        CounterCache._app = app
+
+        if CounterCache._task is None:
+            CounterCache._task = PeriodicTask(
+                'counter_cache_flush',
+                app.config.get('COUNTER_FLUSH_INTERVAL_SECONDS', 0.25),
+                CounterCache.flush
+            )
+            atexit.register(CounterCache.shutdown)
+            CounterCache._install_sigterm_handler()
+
+        CounterCache._task.start(app)
+
+    @staticmethod
+    def is_running():
+        return CounterCache._task is not None and CounterCache._task.is_running
+
+    @staticmethod
+    def _install_sigterm_handler():
+        # SIGTERM padrão encerra sem executar o atexit; convertê-lo em SystemExit
+        if threading.current_thread() is not threading.main_thread():
+            return
+        if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    @staticmethod
+    def increment(player_id, column, amount=1):
+        """Acumula um incremento em um contador do jogador."""
+        if column not in DELTA_COLUMNS:
+            raise ValueError(f'Unsupported counter: {column}')
+        if not CounterCache.is_running():
+            CounterCache._write_through(player_id, column, lambda current: current + amount)
+            return
+        staged = db.session.info.setdefault(_STAGED_KEY, {})
+        staged.setdefault(player_id, _empty_entry())['deltas'][column] += amount
+
+    @staticmethod
+    def set_value(player_id, column, value):
+        """Define o valor absoluto de uma coluna (ex.: health = 100)."""
+        if column not in SET_COLUMNS:
+            raise ValueError(f'Unsupported counter: {column}')
+        if not CounterCache.is_running():
+            CounterCache._write_through(player_id, column, lambda current: value)
+            return
+        staged = db.session.info.setdefault(_STAGED_KEY, {})
+        staged.setdefault(player_id, _empty_entry())['sets'][column] = value
+
+    @staticmethod
+    def _write_through(player_id, column, expression):
+        """Sem a tarefa de gravação (ex.: scripts), aplica a alteração na transação atual."""
+        from models.player import Player
+        db.session.execute(
+            db.update(Player).where(Player.id == player_id).values({column: expression(getattr(Player, column))}),
+            execution_options={'synchronize_session': 'fetch'}
+        )
+
+    @staticmethod
+    def pending_for(player_id):
+        """
+        Retorna as alterações ainda não gravadas do jogador, incluindo as da transação atual.
+
+        Returns:
+            tuple: (deltas por coluna, valores absolutos por coluna)
+        """
+        deltas = defaultdict(int)
+        sets = {}
+        with _lock:
+            entries = [_in_flight.get(player_id), _pending.get(player_id)]
+        entries.append(db.session.info.get(_STAGED_KEY, {}).get(player_id))
+
+        for entry in entries:
+            if entry:
+                for column, amount in entry['deltas'].items():
+                    deltas[column] += amount
+                sets.update(entry['sets'])
+        return deltas, sets
+
+    @staticmethod
+    def value(player, column):
+        """Valor atual de uma coluna do jogador, incluindo as alterações pendentes."""
+        deltas, sets = CounterCache.pending_for(player.id)
+        if column in sets:
+            return sets[column]
+        return (getattr(player, column) or 0) + deltas.get(column, 0)
+
+    @staticmethod
+    def overlay(player_id, data):
+        """Aplica as alterações pendentes a um dicionário serializado do jogador."""
+        deltas, sets = CounterCache.pending_for(player_id)
+        for column, amount in deltas.items():
+            if column in data:
+                data[column] = (data[column] or 0) + amount
+        for column, value in sets.items():
+            if column in data:
+                data[column] = value
+        return data
+
+    @staticmethod
+    def flush():
+        """
+        Grava todas as alterações pendentes com um único UPDATE em lote.
+
+        Returns:
+            int: Quantidade de jogadores atualizados
+        """
+        global _pending, _in_flight
+
+        with _lock:
+            if not _pending:
+                return 0
+            batch, _pending = _pending, {}
+            _in_flight = batch
+
+        table = db.metadata.tables['players']
+        values = {
+            column: table.c[column] + bindparam(f'd_{column}')
+            for column in DELTA_COLUMNS
+        }
+        values.update({
+            column: db.func.coalesce(bindparam(f's_{column}'), table.c[column])
+            for column in SET_COLUMNS
+        })
+        statement = table.update().where(table.c.id == bindparam('b_id')).values(values)
+
+        rows = []
+        for player_id, entry in batch.items():
+            row = {'b_id': player_id}
+            row.update({f'd_{column}': entry['deltas'].get(column, 0) for column in DELTA_COLUMNS})
+            row.update({f's_{column}': entry['sets'].get(column) for column in SET_COLUMNS})
+            rows.append(row)
+
+        try:
+            db.session.execute(statement, rows)
+            # Commit e limpeza do lote no mesmo passo sob o lock: pending_for vê o lote
+            # em _in_flight ou já gravado no banco, nunca os dois
+            with _lock:
+                db.session.commit()
+                _in_flight = {}
+        except Exception:
+            db.session.rollback()
+            with _lock:
+                CounterCache._requeue(batch)
+                _in_flight = {}
+            raise
+
+        return len(rows)
+
+    @staticmethod
+    def _enqueue(staged):
+        """Move para a fila as alterações de uma transação confirmada."""
+        with _lock:
+            for player_id, entry in staged.items():
+                current = _pending.setdefault(player_id, _empty_entry())
+                for column, amount in entry['deltas'].items():
+                    current['deltas'][column] += amount
+                current['sets'].update(entry['sets'])
+
+    @staticmethod
+    def _requeue(batch):
+        """Devolve um lote não gravado para a fila, preservando escritas mais recentes (com _lock)."""
+        for player_id, entry in batch.items():
+            current = _pending.setdefault(player_id, _empty_entry())
+            for column, amount in entry['deltas'].items():
+                current['deltas'][column] += amount
+            for column, value in entry['sets'].items():
+                current['sets'].setdefault(column, value)
+
+    @staticmethod
+    def shutdown():
+        """Para a tarefa e grava os deltas restantes (chamado no encerramento do processo)."""
+        if CounterCache._task is not None:
+            CounterCache._task.stop()
+        if CounterCache._app is None:
+            return
+
+        with CounterCache._app.app_context():
+            try:
+                CounterCache.flush()
+            finally:
+                db.session.remove()
+
+
+@event.listens_for(Session, 'after_commit')
+def _enqueue_staged_counters(session):
+    staged = session.info.pop(_STAGED_KEY, None)
+    if staged:
+        CounterCache._enqueue(staged)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_staged_counters(session, previous_transaction):
+    session.info.pop(_STAGED_KEY, None)
@@ -0,0 +1,155 @@
+import atexit
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from database import db
+from models.security_log import FraudAlert
+from utils.background import PeriodicTask
+from utils.pagination import keyset_page
+
+_lock = threading.Lock()
+# Alertas ainda não gravados (linhas prontas para o INSERT em lote)
+_pending = deque()
+
+
+class FraudAlertStore:
+    """
+    Alertas de fraude persistidos na tabela fraud_alerts, gravados em lote.
+
+    add() apenas acumula o alerta em memória; flush() grava todos os pendentes com
+    um único INSERT (executemany). Os workers do FraudPipeline chamam flush() ao
+    fim de cada lote e uma tarefa periódica grava o que foi criado fora deles. A
+    fila de pendentes é limitada: se o banco ficar indisponível, os alertas mais
+    antigos são descartados e contados em dropped.
+    """
+
+    max_pending = 10000
+
+    _app = None
+    _task = None
+    _dropped = 0
+
+    @staticmethod
+    def start(app):
+        """Inicia a gravação periódica e a gravação final no encerramento."""
+        FraudAlertStore._app = app
+        FraudAlertStore.max_pending = app.config.get('FRAUD_ALERT_MAX_PENDING', FraudAlertStore.max_pending)
+
+        if FraudAlertStore._task is None:
+            FraudAlertStore._task = PeriodicTask(
+                'fraud_alert_flush',
+                app.config.get('FRAUD_ALERT_FLUSH_SECONDS', 1.0),
+                FraudAlertStore.flush
+            )
+            atexit.register(FraudAlertStore.shutdown)
+
+        FraudAlertStore._task.start(app)
+
+    @staticmethod
+    def add(player_id, alert_type, details, risk_score=0.0):
+        """Agenda a gravação de um alerta no próximo lote."""
+        row = {
+            'timestamp': datetime.utcnow(),
+            'player_id': player_id,
+            'alert_type': alert_type,
+            'details': json.dumps(details, default=str),
+            'risk_score': risk_score,
+            'reviewed': False
+        }
+        with _lock:
+            if len(_pending) >= FraudAlertStore.max_pending:
+                _pending.popleft()
+                FraudAlertStore._dropped += 1
+            _pending.append(row)
+        return row
+
+    @staticmethod
+    def pending_count():
+        with _lock:
+            return len(_pending)
+
+    @staticmethod
+    def dropped_count():
+        with _lock:
+            return FraudAlertStore._dropped
+
+    @staticmethod
+    def flush():
+        """
+        Grava os alertas pendentes com um único INSERT em lote.
+
+        Returns:
+            int: Quantidade de alertas gravados
+        """
+        with _lock:
+            if not _pending:
+                return 0
+            rows = list(_pending)
+            _pending.clear()
+
+        try:
+            db.session.execute(FraudAlert.__table__.insert(), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with _lock:
+                # Devolve o lote na frente da fila, respeitando o limite
+                _pending.extendleft(reversed(rows))
+                while len(_pending) > FraudAlertStore.max_pending:
+                    _pending.popleft()
+                    FraudAlertStore._dropped += 1
+            raise
+
+        return len(rows)
+
+    @staticmethod
+    def shutdown():
+        """Para a tarefa e grava os alertas restantes (chamado no encerramento do processo)."""
+        if FraudAlertStore._task is not None:
+            FraudAlertStore._task.stop()
+        if FraudAlertStore._app is None:
+            return
+
+        with FraudAlertStore._app.app_context():
+            try:
+                FraudAlertStore.flush()
+            finally:
+                db.session.remove()
+
+    @staticmethod
+    def page(reviewed=None, player_id=None, after=None, limit=50):
+        """
+        Alertas mais recentes primeiro, paginados por cursor (timestamp, id).
+
+        Usa os índices (reviewed, timestamp), (player_id, timestamp) e, sem filtros, (timestamp).
+
+        Returns:
+            tuple: (alertas, próximo cursor ou None)
+        """
+        query = FraudAlert.query
+        if reviewed is not None:
+            query = query.filter(FraudAlert.reviewed == reviewed)
+        if player_id is not None:
+            query = query.filter(FraudAlert.player_id == player_id)
+
+        return keyset_page(query, FraudAlert.timestamp, FraudAlert.id, after, limit)
+
+    @staticmethod
+    def review(alert_id, admin_id, action_taken=None):
+        """
+        Marca um alerta como revisado (sem commit).
+
+        Returns:
+            FraudAlert: O alerta, ou None se não existir
+        """
+        alert = db.session.get(FraudAlert, alert_id)
+        if alert is None:
+            return None
+
+        alert.reviewed = True
+        alert.reviewed_by = admin_id
+        alert.review_timestamp = datetime.utcnow()
+        if action_taken:
+            alert.action_taken = action_taken
+        return alert
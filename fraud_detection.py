@@ -1,15 +1,206 @@
 import time
 import math
-from datetime import datetime, timedelta
+import logging
 from collections import defaultdict, deque
-from flask import current_app
+from flask import current_app, has_app_context
+from utils.fraud_alerts import FraudAlertStore
+from utils.fraud_pipeline import FraudPipeline
+from utils.fraud_state import FraudStateStore
+from utils.risk_score import RiskScoreService
+
+# Ações consecutivas analisadas na detecção de bots (intervalos = ações - 1)
+BOT_WINDOW_ACTIONS = 5
+# Ganhos de moedas recentes considerados no cálculo da taxa de ganho
+COIN_WINDOW = 20
+# Compras recentes consideradas na detecção de compras em sequência
+PURCHASE_WINDOW = 20
+# Intervalo mínimo esperado entre duas compras (segundos)
+RAPID_PURCHASE_SECONDS = 0.5
+# Pontuação de risco a partir da qual anúncios e mineração são bloqueados
+HIGH_RISK_SCORE = 80
+
+
+def _logger():
+    """Logger da aplicação (ou do módulo, fora do contexto da aplicação)."""
+    return current_app.logger if has_app_context() else logging.getLogger(__name__)
+
+
+class RunningStats:
+    """
+    Média e desvio padrão de uma sequência de valores.
+
+    Sem window, acumula todos os valores pelo método de Welford. Com window, mantém
+    apenas os últimos valores e recalcula média e desvio a partir deles a cada
+    inclusão (janelas pequenas, custo constante), sem acumular erro de
+    arredondamento de inclusões e remoções sucessivas.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'values')
+
+    def __init__(self, window=None):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.values = deque(maxlen=window) if window else None
+
+    def push(self, value):
+        if self.values is not None:
+            self.values.append(value)
+            self.count = len(self.values)
+            self.mean = sum(self.values) / self.count
+            self.m2 = sum((item - self.mean) ** 2 for item in self.values)
+            return
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    @property
+    def std_dev(self):
+        """Desvio padrão populacional."""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'window': self.values.maxlen if self.values is not None else None,
+            'values': list(self.values) if self.values is not None else None
+        }
+
+    @staticmethod
+    def from_dict(data):
+        stats = RunningStats(window=data.get('window'))
+        stats.count = data['count']
+        stats.mean = data['mean']
+        stats.m2 = data['m2']
+        if stats.values is not None:
+            stats.values.extend(data.get('values') or [])
+        return stats
+
+
+class PlayerFraudState:
+    """Estado incremental de detecção de fraude de um jogador."""
+
+    __slots__ = (
+        'action_counts', 'total_actions', 'last_actions', 'first_timestamp', 'last_timestamp',
+        'gap_stats', 'recent_gaps', 'recent_types', 'coin_events', 'coin_total',
+        'purchases', 'purchase_gaps', 'rapid_purchase_gaps',
+        'suspicious_activity', 'warnings_issued'
+    )
+
+    def __init__(self):
+        self.action_counts = defaultdict(int)
+        self.total_actions = 0
+        self.last_actions = {}
+        self.first_timestamp = None
+        self.last_timestamp = None
+        # Intervalos entre ações: histórico completo e janela usada na detecção de bots
+        self.gap_stats = RunningStats()
+        self.recent_gaps = RunningStats(window=BOT_WINDOW_ACTIONS - 1)
+        self.recent_types = deque(maxlen=BOT_WINDOW_ACTIONS)
+        # Ganhos de moedas recentes (timestamp, quantidade) e a soma das quantidades
+        self.coin_events = deque()
+        self.coin_total = 0.0
+        # Últimas 5 compras (item_id, preço), intervalos entre compras e quantos são rápidos demais
+        self.purchases = deque(maxlen=5)
+        self.purchase_gaps = deque()
+        self.rapid_purchase_gaps = 0
+        self.suspicious_activity = 0  # Pontuação de suspeita
+        self.warnings_issued = 0
+
+    def record(self, action_type, details, timestamp):
+        """
+        Atualiza o estado com uma ação, em O(1).
+
+        Apenas intervalos positivos entram nas estatísticas: ações com o mesmo
+        instante (ex.: um lote registrado de uma vez) ou fora de ordem não são
+        tratadas como ações instantâneas na detecção de bots.
+        """
+        if self.last_timestamp is not None and timestamp > self.last_timestamp:
+            gap = timestamp - self.last_timestamp
+            self.gap_stats.push(gap)
+            self.recent_gaps.push(gap)
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp if self.last_timestamp is None else max(self.last_timestamp, timestamp)
+
+        self.action_counts[action_type] += 1
+        self.total_actions += 1
+        self.recent_types.append(action_type)
+
+        if action_type == 'earn_coins':
+            self._record_coins(details, timestamp)
+        elif action_type == 'buy_item':
+            self._record_purchase(details, timestamp)
+
+        self.last_actions[action_type] = timestamp
+
+    def _record_coins(self, details, timestamp):
+        try:
+            amount = float(details.get('amount', 0))
+        except (TypeError, ValueError):
+            amount = 0.0
+
+        self.coin_events.append((timestamp, amount))
+        self.coin_total += amount
+        if len(self.coin_events) > COIN_WINDOW:
+            _, expired_amount = self.coin_events.popleft()
+            self.coin_total -= expired_amount
+
+    def _record_purchase(self, details, timestamp):
+        previous = self.last_actions.get('buy_item')
+        if previous is not None:
+            rapid = timestamp - previous < RAPID_PURCHASE_SECONDS
+            self.purchase_gaps.append(rapid)
+            self.rapid_purchase_gaps += rapid
+            if len(self.purchase_gaps) > PURCHASE_WINDOW - 1:
+                self.rapid_purchase_gaps -= self.purchase_gaps.popleft()
+
+        self.purchases.append((details.get('item_id'), details.get('price')))
+
+    def to_dict(self):
+        """Serializa o estado para os backends compartilhados (valores compatíveis com JSON)."""
+        return {
+            'action_counts': dict(self.action_counts),
+            'total_actions': self.total_actions,
+            'last_actions': self.last_actions,
+            'first_timestamp': self.first_timestamp,
+            'last_timestamp': self.last_timestamp,
+            'gap_stats': self.gap_stats.to_dict(),
+            'recent_gaps': self.recent_gaps.to_dict(),
+            'recent_types': list(self.recent_types),
+            'coin_events': [list(event) for event in self.coin_events],
+            'coin_total': self.coin_total,
+            'purchases': [list(purchase) for purchase in self.purchases],
+            'purchase_gaps': list(self.purchase_gaps),
+            'rapid_purchase_gaps': self.rapid_purchase_gaps,
+            'suspicious_activity': self.suspicious_activity,
+            'warnings_issued': self.warnings_issued
+        }
+
+    @staticmethod
+    def from_dict(data):
+        state = PlayerFraudState()
+        state.action_counts.update(data['action_counts'])
+        state.total_actions = data['total_actions']
+        state.last_actions = dict(data['last_actions'])
+        state.first_timestamp = data['first_timestamp']
+        state.last_timestamp = data['last_timestamp']
+        state.gap_stats = RunningStats.from_dict(data['gap_stats'])
+        state.recent_gaps = RunningStats.from_dict(data['recent_gaps'])
+        state.recent_types.extend(data['recent_types'])
+        state.coin_events.extend(tuple(event) for event in data['coin_events'])
+        state.coin_total = data['coin_total']
+        state.purchases.extend(tuple(purchase) for purchase in data['purchases'])
+        state.purchase_gaps.extend(data['purchase_gaps'])
+        state.rapid_purchase_gaps = data['rapid_purchase_gaps']
+        state.suspicious_activity = data['suspicious_activity']
+        state.warnings_issued = data['warnings_issued']
+        return state
 
-# Dicionário para armazenar ações dos jogadores para análise de padrões
-player_actions = defaultdict(lambda: deque(maxlen=100))
-# Dicionário para armazenar estatísticas de jogadores
-player_stats = {}
-# Dicionário para armazenar alertas de fraude
-fraud_alerts = []
 
 class FraudDetector:
     """Classe para detecção de fraudes no jogo."""
@@ -23,133 +214,156 @@ class FraudDetector:
             player_id: ID do jogador
             action_type: Tipo de ação (ex: 'kill_monster', 'self_eliminate', 'buy_item')
             details: Detalhes adicionais sobre a ação (opcional)
+        
+        Returns:
+            bool: True se a ação foi aceita para análise, False se foi descartada
         """
-        action = {
-            'timestamp': time.time(),
-            'datetime': datetime.utcnow().isoformat(),
-            'action_type': action_type,
-            'details': details or {}
-        }
+        return FraudDetector.record_player_actions(player_id, [(action_type, details, None)])
+    
+    @staticmethod
+    def record_player_actions(player_id, actions):
+        """
+        Registra um lote de ações do jogador; os padrões são verificados uma única vez.
         
-        player_actions[player_id].append(action)
+        Com o FraudPipeline em execução as ações apenas entram na fila e a análise
+        ocorre nos workers; sem ele (ex.: scripts), a análise é feita na hora.
         
-        # Atualizar estatísticas do jogador
-        if player_id not in player_stats:
-            player_stats[player_id] = {
-                'action_counts': defaultdict(int),
-                'last_actions': {},
-                'suspicious_activity': 0,  # Pontuação de suspeita
-                'warnings_issued': 0
-            }
+        Args:
+            player_id: ID do jogador
+            actions: Lista de tuplas (action_type, details, timestamp); timestamp é o
+                     instante da ação em segundos (epoch) ou None para o instante atual
+        
+        Returns:
+            bool: True se as ações foram aceitas para análise, False se foram descartadas
+        """
+        if not actions:
+            return False
+        
+        # O instante é fixado agora, não quando o worker processar o evento
+        now = time.time()
+        actions = [(action_type, details or {}, timestamp or now) for action_type, details, timestamp in actions]
+        
+        if FraudPipeline.is_running():
+            return FraudPipeline.submit(player_id, actions)
+        
+        FraudDetector.process_actions(player_id, actions)
+        return True
+    
+    @staticmethod
+    def process_actions(player_id, actions):
+        """
+        Aplica as ações ao estado do jogador e verifica os padrões uma vez.
+        
+        Returns:
+            bool: True se padrões suspeitos foram detectados, False caso contrário
+        """
+        for action_type, details, timestamp in actions:
+            FraudDetector._append_action(player_id, action_type, details, timestamp)
         
-        player_stats[player_id]['action_counts'][action_type] += 1
-        player_stats[player_id]['last_actions'][action_type] = time.time()
+        suspicious = FraudDetector.check_for_suspicious_patterns(player_id)
         
-        # Verificar se há padrões suspeitos após registrar a ação
-        FraudDetector.check_for_suspicious_patterns(player_id)
+        # Pontuação atualizada a cada lote, para consultas O(1) nas rotas
+        FraudDetector.compute_risk_score(player_id)
+        
+        return suspicious
+    
+    @staticmethod
+    def _append_action(player_id, action_type, details=None, timestamp=None):
+        """Atualiza o estado incremental do jogador com a ação, sem verificar padrões."""
+        FraudStateStore.record(player_id, action_type, details or {}, timestamp or time.time())
     
     @staticmethod
     def check_for_suspicious_patterns(player_id):
         """
         Verifica se há padrões suspeitos nas ações do jogador.
         
+        Usa apenas o estado incremental (estatísticas e janelas já atualizadas),
+        então o custo não depende do tamanho do histórico. O estado vem do
+        FraudStateStore (cache local sobre o backend compartilhado).
+        
         Args:
             player_id: ID do jogador a ser verificado
         
         Returns:
             bool: True se padrões suspeitos foram detectados, False caso contrário
         """
-        if player_id not in player_stats:
+        state = FraudStateStore.get(player_id)
+        if state is None:
             return False
         
         suspicious = False
-        stats = player_stats[player_id]
-        actions = list(player_actions[player_id])
+        # Qualquer alteração do estado (não só as suspeitas) precisa chegar ao backend
+        changed = False
         
         # Verificar frequência muito alta de ações (possível bot)
-        if len(actions) >= 5:
-            # Calcular o tempo médio entre as últimas 5 ações
-            recent_actions = actions[-5:]
-            timestamps = [a['timestamp'] for a in recent_actions]
-            
-            if len(timestamps) >= 2:
-                time_diffs = [timestamps[i] - timestamps[i-1] for i in range(1, len(timestamps))]
-                avg_time_diff = sum(time_diffs) / len(time_diffs)
-                
-                # Se o tempo médio entre ações for muito pequeno (menos de 1 segundo)
-                # e consistente (baixo desvio padrão), pode ser um bot
-                if avg_time_diff < 1.0:
-                    std_dev = math.sqrt(sum((x - avg_time_diff) ** 2 for x in time_diffs) / len(time_diffs))
-                    if std_dev < 0.2:  # Tempo muito consistente
-                        suspicious = True
-                        stats['suspicious_activity'] += 10
-                        FraudDetector.create_fraud_alert(player_id, 'bot_activity', {
-                            'avg_time_between_actions': avg_time_diff,
-                            'std_dev': std_dev,
-                            'action_types': [a['action_type'] for a in recent_actions]
-                        })
+        gaps = state.recent_gaps
+        if gaps.count == BOT_WINDOW_ACTIONS - 1:
+            # Se o tempo médio entre as últimas ações for muito pequeno (menos de 1 segundo)
+            # e consistente (baixo desvio padrão), pode ser um bot
+            if gaps.mean < 1.0 and gaps.std_dev < 0.2:  # Tempo muito consistente
+                suspicious = True
+                state.suspicious_activity += 10
+                FraudDetector.create_fraud_alert(player_id, 'bot_activity', {
+                    'avg_time_between_actions': gaps.mean,
+                    'std_dev': gaps.std_dev,
+                    'action_types': list(state.recent_types)
+                })
         
         # Verificar padrões específicos de fraude para diferentes tipos de ações
         
         # 1. Auto-eliminações muito frequentes
-        if stats['action_counts'].get('self_eliminate', 0) > 50:
+        self_eliminations = state.action_counts.get('self_eliminate', 0)
+        if self_eliminations > 50:
             # Verificar se as auto-eliminações são a maioria das ações
-            total_actions = sum(stats['action_counts'].values())
-            if stats['action_counts']['self_eliminate'] / total_actions > 0.8:
+            if self_eliminations / state.total_actions > 0.8:
                 suspicious = True
-                stats['suspicious_activity'] += 5
+                state.suspicious_activity += 5
                 FraudDetector.create_fraud_alert(player_id, 'excessive_self_elimination', {
-                    'count': stats['action_counts']['self_eliminate'],
-                    'percentage': stats['action_counts']['self_eliminate'] / total_actions
+                    'count': self_eliminations,
+                    'percentage': self_eliminations / state.total_actions
                 })
         
         # 2. Ganho de moedas muito rápido
-        if 'earn_coins' in stats['action_counts'] and stats['action_counts']['earn_coins'] > 20:
-            coin_actions = [a for a in actions if a['action_type'] == 'earn_coins']
-            if len(coin_actions) >= 10:
-                # Calcular a taxa de ganho de moedas
-                total_coins = sum(a['details'].get('amount', 0) for a in coin_actions)
-                time_span = coin_actions[-1]['timestamp'] - coin_actions[0]['timestamp']
-                if time_span > 0:
-                    coins_per_second = total_coins / time_span
-                    # Definir um limite razoável com base na mecânica do jogo
-                    if coins_per_second > 0.0000000001:  # Ajustar conforme necessário
-                        suspicious = True
-                        stats['suspicious_activity'] += 15
-                        FraudDetector.create_fraud_alert(player_id, 'abnormal_coin_gain', {
-                            'coins_per_second': coins_per_second,
-                            'total_coins': total_coins,
-                            'time_span_seconds': time_span
-                        })
-        
-        # 3. Padrão de compras suspeito
-        if 'buy_item' in stats['action_counts'] and stats['action_counts']['buy_item'] > 5:
-            buy_actions = [a for a in actions if a['action_type'] == 'buy_item']
-            if len(buy_actions) >= 5:
-                # Verificar compras em sequência muito rápida
-                buy_timestamps = [a['timestamp'] for a in buy_actions]
-                for i in range(1, len(buy_timestamps)):
-                    if buy_timestamps[i] - buy_timestamps[i-1] < 0.5:  # Menos de meio segundo entre compras
-                        suspicious = True
-                        stats['suspicious_activity'] += 8
-                        FraudDetector.create_fraud_alert(player_id, 'rapid_purchases', {
-                            'purchases': [(a['details'].get('item_id'), a['details'].get('price')) for a in buy_actions[-5:]]
-                        })
-                        break
+        if state.action_counts.get('earn_coins', 0) > 20 and len(state.coin_events) >= 10:
+            # Calcular a taxa de ganho de moedas na janela recente
+            time_span = state.coin_events[-1][0] - state.coin_events[0][0]
+            if time_span > 0:
+                coins_per_second = state.coin_total / time_span
+                # Definir um limite razoável com base na mecânica do jogo
+                if coins_per_second > 0.0000000001:  # Ajustar conforme necessário
+                    suspicious = True
+                    state.suspicious_activity += 15
+                    FraudDetector.create_fraud_alert(player_id, 'abnormal_coin_gain', {
+                        'coins_per_second': coins_per_second,
+                        'total_coins': state.coin_total,
+                        'time_span_seconds': time_span
+                    })
+        
+        # 3. Padrão de compras suspeito (compras em sequência muito rápida)
+        if state.action_counts.get('buy_item', 0) > 5 and state.rapid_purchase_gaps > 0:
+            suspicious = True
+            state.suspicious_activity += 8
+            FraudDetector.create_fraud_alert(player_id, 'rapid_purchases', {
+                'purchases': list(state.purchases)
+            })
         
         # Tomar ações com base na pontuação de suspeita
-        if stats['suspicious_activity'] >= 20 and stats['warnings_issued'] == 0:
+        if state.suspicious_activity >= 20 and state.warnings_issued == 0:
             # Primeira advertência
-            stats['warnings_issued'] += 1
+            state.warnings_issued += 1
+            changed = True
             # Em um sistema real, você poderia enviar uma mensagem ao jogador
-            print(f"WARNING: Player {player_id} has been flagged for suspicious activity.")
+            _logger().warning('Player %s has been flagged for suspicious activity.', player_id)
         
-        if stats['suspicious_activity'] >= 50:
+        if state.suspicious_activity >= 50:
             # Considerar ações mais severas, como suspensão temporária
-            print(f"CRITICAL: Player {player_id} has exceeded the fraud threshold and may be suspended.")
+            _logger().critical('Player %s has exceeded the fraud threshold and may be suspended.', player_id)
             # Em um sistema real, você poderia suspender a conta automaticamente
             # ou notificar um administrador para revisão manual
         
+        if suspicious or changed:
+            FraudStateStore.mark_dirty(player_id)
+        
         return suspicious
     
     @staticmethod
@@ -157,32 +371,31 @@ class FraudDetector:
         """
         Cria um alerta de fraude para revisão por administradores.
         
+        O alerta é gravado na tabela fraud_alerts pelo próximo lote do FraudAlertStore.
+        
         Args:
             player_id: ID do jogador
             alert_type: Tipo de alerta (ex: 'bot_activity', 'excessive_self_elimination')
             details: Detalhes específicos do alerta
         """
-        alert = {
-            'timestamp': time.time(),
-            'datetime': datetime.utcnow().isoformat(),
-            'player_id': player_id,
-            'alert_type': alert_type,
-            'details': details,
-            'reviewed': False
-        }
+        alert = FraudAlertStore.add(
+            player_id,
+            alert_type,
+            details,
+            risk_score=FraudDetector.compute_risk_score(player_id)
+        )
         
-        fraud_alerts.append(alert)
-        
-        # Em um ambiente de produção, você poderia salvar isso em um banco de dados
-        # e possivelmente enviar notificações para administradores
-        print(f"FRAUD ALERT: {alert}")
+        _logger().warning('Fraud alert for player %s: %s %s', player_id, alert_type, details)
         
         return alert
     
     @staticmethod
     def get_player_risk_score(player_id):
         """
-        Calcula uma pontuação de risco para um jogador com base em seu histórico.
+        Pontuação de risco do jogador, lida do RiskScoreService.
+        
+        A pontuação é atualizada sempre que um lote de ações do jogador é
+        analisado; só é recalculada aqui se estiver ausente ou expirada.
         
         Args:
             player_id: ID do jogador
@@ -190,27 +403,49 @@ class FraudDetector:
         Returns:
             float: Pontuação de risco (0-100, onde maior é mais arriscado)
         """
-        if player_id not in player_stats:
-            return 0
+        score = RiskScoreService.get(player_id)
+        if score is None:
+            score = FraudDetector.compute_risk_score(player_id)
+        return score
+    
+    @staticmethod
+    def calculate_fraud_score(player_id):
+        """Pontuação de risco usada nas verificações de anúncios e mineração (ver get_player_risk_score)."""
+        return FraudDetector.get_player_risk_score(player_id)
+    
+    @staticmethod
+    def compute_risk_score(player_id):
+        """
+        Calcula a pontuação de risco a partir do estado do jogador e a guarda no RiskScoreService.
         
-        stats = player_stats[player_id]
+        Args:
+            player_id: ID do jogador
         
+        Returns:
+            float: Pontuação de risco (0-100, onde maior é mais arriscado)
+        """
+        state = FraudStateStore.get(player_id)
+        score = FraudDetector._risk_score_from_state(state) if state is not None else 0
+        RiskScoreService.put(player_id, score)
+        return score
+    
+    @staticmethod
+    def _risk_score_from_state(state):
         # Iniciar com a pontuação de atividade suspeita
-        risk_score = min(stats['suspicious_activity'], 100)
+        risk_score = min(state.suspicious_activity, 100)
         
         # Considerar outros fatores que podem aumentar ou diminuir o risco
         
         # Fator 1: Tempo de jogo (jogadores mais antigos são geralmente mais confiáveis)
-        if player_actions[player_id]:
-            first_action_time = min(a['timestamp'] for a in player_actions[player_id])
-            account_age_days = (time.time() - first_action_time) / (24 * 3600)
+        if state.first_timestamp is not None:
+            account_age_days = (time.time() - state.first_timestamp) / (24 * 3600)
             if account_age_days > 30:  # Conta com mais de 30 dias
                 risk_score -= 10
             elif account_age_days < 1:  # Conta muito nova
                 risk_score += 10
         
         # Fator 2: Diversidade de ações (bots tendem a repetir as mesmas ações)
-        unique_actions = len(stats['action_counts'])
+        unique_actions = len(state.action_counts)
         if unique_actions <= 2:  # Muito poucas ações diferentes
             risk_score += 15
         elif unique_actions >= 8:  # Muitas ações diferentes
@@ -220,47 +455,33 @@ class FraudDetector:
         return max(0, min(100, risk_score))
     
     @staticmethod
-    def get_fraud_alerts(reviewed=None, limit=50):
+    def get_fraud_alerts(reviewed=None, limit=50, player_id=None, after=None):
         """
-        Obtém alertas de fraude para revisão.
+        Obtém alertas de fraude para revisão, mais recentes primeiro.
         
         Args:
             reviewed: Se True, retorna apenas alertas revisados. Se False, apenas não revisados.
                      Se None, retorna todos os alertas.
             limit: Número máximo de alertas a retornar
+            player_id: Filtra os alertas de um jogador (opcional)
+            after: Cursor (timestamp, id) do último alerta da página anterior (opcional)
         
         Returns:
-            list: Lista de alertas de fraude
+            tuple: (lista de alertas, próximo cursor ou None)
         """
-        if reviewed is None:
-            return sorted(fraud_alerts, key=lambda x: x['timestamp'], reverse=True)[:limit]
-        else:
-            return sorted([a for a in fraud_alerts if a['reviewed'] == reviewed], 
-                         key=lambda x: x['timestamp'], reverse=True)[:limit]
+        return FraudAlertStore.page(reviewed=reviewed, player_id=player_id, after=after, limit=limit)
     
     @staticmethod
     def mark_alert_as_reviewed(alert_id, admin_id, action_taken=None):
         """
-        Marca um alerta como revisado por um administrador.
+        Marca um alerta como revisado por um administrador (sem commit).
         
         Args:
-            alert_id: ID do alerta (índice na lista fraud_alerts)
+            alert_id: ID do alerta na tabela fraud_alerts
             admin_id: ID do administrador que revisou
             action_taken: Descrição da ação tomada (opcional)
         
         Returns:
             bool: True se o alerta foi encontrado e marcado, False caso contrário
         """
-        if 0 <= alert_id < len(fraud_alerts):
-            fraud_alerts[alert_id]['reviewed'] = True
-            fraud_alerts[alert_id]['reviewed_by'] = admin_id
-            fraud_alerts[alert_id]['review_time'] = time.time()
-            fraud_alerts[alert_id]['review_datetime'] = datetime.utcnow().isoformat()
-            
-            if action_taken:
-                fraud_alerts[alert_id]['action_taken'] = action_taken
-            
-            return True
-        
-        return False
-
+        return FraudAlertStore.review(alert_id, admin_id, action_taken) is not None
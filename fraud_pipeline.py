@@ -0,0 +1,232 @@
+import atexit
+import itertools
+import queue
+import threading
+import time
+from database import db
+
+# Ações nunca descartadas pela amostragem (apenas com a fila cheia)
+PRIORITY_ACTIONS = ('suspicious_ad_click',)
+
+
+class _Shard:
+    """Fila limitada e worker responsáveis por um subconjunto dos jogadores."""
+
+    def __init__(self, index, max_size):
+        self.index = index
+        self.queue = queue.Queue(maxsize=max_size)
+        self.thread = None
+        # Contador usado para aceitar 1 de cada sample_rate eventos em sobrecarga
+        # (itertools.count: next() é atômico, sem lock no caminho da requisição)
+        self.sample_counter = itertools.count(1)
+
+
+class FraudPipeline:
+    """
+    Análise de fraude fora da requisição.
+
+    record_player_action apenas enfileira o evento (sem bloquear) na fila do shard
+    do jogador (player_id % workers). Cada worker drena sua fila em lotes, agrupa
+    os eventos por jogador, aplica-os ao estado e verifica os padrões uma vez por
+    jogador no lote. Como um jogador sempre cai no mesmo shard, seus eventos são
+    processados em ordem e por uma única thread.
+
+    Em sobrecarga, acima de sample_threshold da capacidade da fila, apenas 1 de
+    cada sample_rate eventos é aceito (exceto PRIORITY_ACTIONS); com a fila cheia
+    o evento é descartado. Os dois casos são contados nas métricas.
+    """
+
+    workers = 2
+    queue_size = 10000
+    batch_size = 200
+    # Fração de ocupação da fila a partir da qual os eventos passam a ser amostrados
+    sample_threshold = 0.8
+    sample_rate = 10
+
+    _app = None
+    _shards = []
+    _stop_event = threading.Event()
+    _metrics_lock = threading.Lock()
+    _metrics = {}
+
+    @staticmethod
+    def start(app):
+        """Cria as filas e inicia os workers com os parâmetros da aplicação."""
+        if FraudPipeline.is_running():
+            return
+
+        FraudPipeline._app = app
+        FraudPipeline.workers = max(1, app.config.get('FRAUD_PIPELINE_WORKERS', FraudPipeline.workers))
+        FraudPipeline.queue_size = app.config.get('FRAUD_PIPELINE_QUEUE_SIZE', FraudPipeline.queue_size)
+        FraudPipeline.batch_size = app.config.get('FRAUD_PIPELINE_BATCH_SIZE', FraudPipeline.batch_size)
+        FraudPipeline.sample_threshold = app.config.get('FRAUD_PIPELINE_SAMPLE_THRESHOLD', FraudPipeline.sample_threshold)
+        FraudPipeline.sample_rate = max(1, app.config.get('FRAUD_PIPELINE_SAMPLE_RATE', FraudPipeline.sample_rate))
+
+        shard_size = max(1, FraudPipeline.queue_size // FraudPipeline.workers)
+        FraudPipeline._shards = [_Shard(index, shard_size) for index in range(FraudPipeline.workers)]
+        FraudPipeline._stop_event.clear()
+        FraudPipeline.reset_metrics()
+
+        for shard in FraudPipeline._shards:
+            shard.thread = threading.Thread(
+                target=FraudPipeline._run,
+                args=(shard,),
+                name=f'fraud-pipeline-{shard.index}',
+                daemon=True
+            )
+            shard.thread.start()
+
+        atexit.register(FraudPipeline.stop)
+
+    @staticmethod
+    def is_running():
+        return any(shard.thread is not None and shard.thread.is_alive() for shard in FraudPipeline._shards)
+
+    @staticmethod
+    def stop(timeout=5):
+        """Para os workers depois de processar o que ainda está na fila."""
+        FraudPipeline._stop_event.set()
+        for shard in FraudPipeline._shards:
+            if shard.thread is not None:
+                shard.thread.join(timeout)
+                shard.thread = None
+
+    @staticmethod
+    def _count(name, amount=1):
+        with FraudPipeline._metrics_lock:
+            FraudPipeline._metrics[name] = FraudPipeline._metrics.get(name, 0) + amount
+
+    @staticmethod
+    def submit(player_id, actions):
+        """
+        Enfileira ações de um jogador para análise, sem bloquear a requisição.
+
+        Args:
+            player_id: ID do jogador
+            actions: Lista de tuplas (action_type, details, timestamp) com timestamp já definido
+
+        Returns:
+            bool: True se as ações foram aceitas, False se foram descartadas ou amostradas
+        """
+        shard = FraudPipeline._shards[player_id % len(FraudPipeline._shards)]
+        depth = shard.queue.qsize()
+
+        priority = any(action_type in PRIORITY_ACTIONS for action_type, _, _ in actions)
+        if not priority and depth >= shard.queue.maxsize * FraudPipeline.sample_threshold:
+            if next(shard.sample_counter) % FraudPipeline.sample_rate:
+                FraudPipeline._count('sampled_out', len(actions))
+                return False
+
+        try:
+            shard.queue.put_nowait((player_id, actions, time.monotonic()))
+        except queue.Full:
+            FraudPipeline._count('dropped', len(actions))
+            return False
+
+        with FraudPipeline._metrics_lock:
+            metrics = FraudPipeline._metrics
+            metrics['enqueued'] = metrics.get('enqueued', 0) + len(actions)
+            metrics['max_queue_depth'] = max(metrics.get('max_queue_depth', 0), depth + 1)
+        return True
+
+    @staticmethod
+    def _run(shard):
+        while True:
+            try:
+                first = shard.queue.get(timeout=0.5)
+            except queue.Empty:
+                if FraudPipeline._stop_event.is_set():
+                    return
+                continue
+
+            batch = [first]
+            while len(batch) < FraudPipeline.batch_size:
+                try:
+                    batch.append(shard.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            FraudPipeline._process_batch(batch)
+
+    @staticmethod
+    def _process_batch(batch):
+        """Aplica um lote de eventos, com uma verificação de padrões por jogador."""
+        # Importação tardia para evitar ciclo com utils.fraud_detection
+        from utils.fraud_detection import FraudDetector
+        from utils.fraud_alerts import FraudAlertStore
+
+        started = time.monotonic()
+        by_player = {}
+        for player_id, actions, _ in batch:
+            by_player.setdefault(player_id, []).extend(actions)
+
+        failed = 0
+        with FraudPipeline._app.app_context():
+            try:
+                for player_id, actions in by_player.items():
+                    try:
+                        FraudDetector.process_actions(player_id, actions)
+                    except Exception as e:
+                        failed += len(actions)
+                        FraudPipeline._app.logger.exception('Fraud analysis failed for player %s: %s', player_id, e)
+
+                # Alertas do lote gravados com um único INSERT
+                try:
+                    FraudAlertStore.flush()
+                except Exception as e:
+                    FraudPipeline._app.logger.error('Failed to persist fraud alerts: %s', e)
+            finally:
+                db.session.remove()
+
+        finished = time.monotonic()
+        actions_count = sum(len(actions) for _, actions, _ in batch)
+        with FraudPipeline._metrics_lock:
+            metrics = FraudPipeline._metrics
+            metrics['processed'] = metrics.get('processed', 0) + actions_count - failed
+            metrics['failed'] = metrics.get('failed', 0) + failed
+            metrics['batches'] = metrics.get('batches', 0) + 1
+            metrics['processing_seconds'] = metrics.get('processing_seconds', 0.0) + finished - started
+            # Atraso entre o enfileiramento e o fim da análise do evento mais antigo do lote
+            lag = finished - min(enqueued_at for _, _, enqueued_at in batch)
+            metrics['last_lag_seconds'] = lag
+            metrics['max_lag_seconds'] = max(metrics.get('max_lag_seconds', 0.0), lag)
+
+    @staticmethod
+    def metrics():
+        """
+        Métricas de vazão e de pressão das filas.
+
+        Returns:
+            dict: Contadores desde o início (ou o último reset) e a ocupação atual de cada shard
+        """
+        with FraudPipeline._metrics_lock:
+            metrics = dict(FraudPipeline._metrics)
+
+        batches = metrics.get('batches', 0)
+        depths = [shard.queue.qsize() for shard in FraudPipeline._shards]
+        capacity = sum(shard.queue.maxsize for shard in FraudPipeline._shards)
+        return {
+            'running': FraudPipeline.is_running(),
+            'workers': len(FraudPipeline._shards),
+            'queue_capacity': capacity,
+            'queue_depth': sum(depths),
+            'shard_depths': depths,
+            'queue_utilization': round(sum(depths) / capacity, 4) if capacity else 0.0,
+            'enqueued': metrics.get('enqueued', 0),
+            'processed': metrics.get('processed', 0),
+            'failed': metrics.get('failed', 0),
+            'sampled_out': metrics.get('sampled_out', 0),
+            'dropped': metrics.get('dropped', 0),
+            'batches': batches,
+            'avg_batch_ms': round(metrics.get('processing_seconds', 0.0) * 1000 / batches, 3) if batches else 0.0,
+            'max_queue_depth': metrics.get('max_queue_depth', 0),
+            'last_lag_ms': round(metrics.get('last_lag_seconds', 0.0) * 1000, 3),
+            'max_lag_ms': round(metrics.get('max_lag_seconds', 0.0) * 1000, 3),
+            'sample_threshold': FraudPipeline.sample_threshold,
+            'sample_rate': FraudPipeline.sample_rate
+        }
+
+    @staticmethod
+    def reset_metrics():
+        with FraudPipeline._metrics_lock:
+            FraudPipeline._metrics = {}
@@ -0,0 +1,769 @@
+import abc
+import atexit
+import json
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlparse
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database import db
+from utils.background import PeriodicTask
+
+# Prefixo das chaves de estado no servidor Redis
+REDIS_KEY_PREFIX = 'dooficoin:fraud:state:'
+
+_lock = threading.Lock()
+# Serializa as gravações (a tarefa periódica e a gravação final no encerramento)
+_flush_lock = threading.Lock()
+# player_id -> _CachedState, em ordem de uso (LRU)
+_cache = OrderedDict()
+# Jogadores com alterações ainda não gravadas no backend
+_dirty = set()
+# Jogadores do lote sendo gravado: tratados como pendentes até o fim da gravação
+_flushing = set()
+
+
+def _is_pending(player_id):
+    # Chamado com _lock adquirido
+    return player_id in _dirty or player_id in _flushing
+
+
+def _state_class():
+    # Importação tardia para evitar ciclo com utils.fraud_detection
+    from utils.fraud_detection import PlayerFraudState
+    return PlayerFraudState
+
+
+def encode_state(state):
+    return json.dumps(state.to_dict(), separators=(',', ':'), default=str)
+
+
+def decode_state(payload):
+    return _state_class().from_dict(json.loads(payload))
+
+
+def _copy_state(state):
+    return _state_class().from_dict(state.to_dict())
+
+
+def _counters(state):
+    # Campos somados entre workers na mesclagem (os demais vêm da reaplicação das ações)
+    return state.suspicious_activity, state.warnings_issued
+
+
+class FraudStateBackend(abc.ABC):
+    """
+    Interface de armazenamento do estado de detecção de fraude dos jogadores.
+
+    Backends compartilhados (SQLite, Redis) permitem que todos os workers vejam o
+    mesmo histórico de cada jogador e que o estado sobreviva a reinícios. Cada
+    estado tem uma versão, incrementada a cada gravação; save_many só grava um
+    estado se a versão no backend ainda for a lida (compare-and-set).
+    """
+
+    # False quando o estado só existe neste processo (não há o que gravar)
+    shared = True
+
+    @abc.abstractmethod
+    def load_many(self, player_ids):
+        """
+        Carrega o estado de vários jogadores.
+
+        Returns:
+            dict: player_id -> (versão, PlayerFraudState) (jogadores sem estado ficam de fora)
+        """
+
+    @abc.abstractmethod
+    def save_many(self, states):
+        """
+        Grava o estado de vários jogadores em lote, com comparação de versão.
+
+        Args:
+            states: Dict player_id -> (versão lida, ou None para um estado novo, PlayerFraudState)
+
+        Returns:
+            dict: player_id -> nova versão dos estados gravados; os que foram alterados
+                  por outro processo desde a leitura (conflito) ficam de fora
+        """
+
+
+class MemoryBackend(FraudStateBackend):
+    """Estado apenas no processo atual (comportamento original, sem persistência)."""
+
+    shared = False
+
+    def __init__(self):
+        self.states = {}
+
+    def load_many(self, player_ids):
+        return {player_id: self.states[player_id] for player_id in player_ids if player_id in self.states}
+
+    def save_many(self, states):
+        saved = {}
+        for player_id, (version, state) in states.items():
+            current = self.states.get(player_id)
+            if (current[0] if current else None) == version:
+                saved[player_id] = (version or 0) + 1
+                self.states[player_id] = (saved[player_id], state)
+        return saved
+
+
+class SQLiteBackend(FraudStateBackend):
+    """Estado gravado como JSON na tabela fraud_player_states do banco da aplicação."""
+
+    def load_many(self, player_ids):
+        from models.security_log import FraudPlayerState
+        rows = db.session.query(FraudPlayerState.player_id, FraudPlayerState.version, FraudPlayerState.state).filter(
+            FraudPlayerState.player_id.in_(list(player_ids))
+        ).all()
+        return {player_id: (version, decode_state(payload)) for player_id, version, payload in rows}
+
+    def save_many(self, states):
+        from models.security_log import FraudPlayerState
+        table = FraudPlayerState.__table__
+        now = datetime.utcnow()
+        saved = {}
+        try:
+            # Um comando por jogador (o rowcount indica conflito), todos na mesma transação
+            for player_id, (version, state) in states.items():
+                if version is None:
+                    statement = sqlite_insert(table).values(
+                        player_id=player_id, version=1, state=encode_state(state), updated_at=now
+                    ).on_conflict_do_nothing(index_elements=[table.c.player_id])
+                else:
+                    statement = table.update().where(
+                        table.c.player_id == player_id,
+                        table.c.version == version
+                    ).values(version=version + 1, state=encode_state(state), updated_at=now)
+
+                if db.session.execute(statement).rowcount == 1:
+                    saved[player_id] = (version or 0) + 1
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return saved
+
+
+class RespError(Exception):
+    """Erro devolvido pelo servidor (resposta '-ERR ...')."""
+
+
+class RespClient:
+    """Cliente mínimo do protocolo Redis (RESP2) sobre um socket, com pipeline."""
+
+    def __init__(self, url, timeout=2.0):
+        """
+        Args:
+            url: redis://[:senha@]host[:porta][/db]
+            timeout: Tempo limite de conexão e leitura em segundos
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.database = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), self.timeout)
+        self._reader = self._sock.makefile('rb')
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.database:
+            setup.append(('SELECT', self.database))
+        if setup:
+            self._send(setup)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._reader = None
+
+    @staticmethod
+    def _encode(command):
+        parts = [f'*{len(command)}\r\n'.encode()]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f'${len(data)}\r\n'.encode())
+            parts.append(data)
+            parts.append(b'\r\n')
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError('Connection closed by the state server')
+
+        kind, body = line[:1], line[1:-2]
+        if kind == b'+':
+            return body.decode()
+        if kind == b'-':
+            return RespError(body.decode())
+        if kind == b':':
+            return int(body)
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b'*':
+            length = int(body)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f'Invalid reply from the state server: {line!r}')
+
+    def _send(self, commands):
+        self._sock.sendall(b''.join(self._encode(command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def pipeline(self, commands):
+        """
+        Envia vários comandos em uma única escrita e lê as respostas na ordem.
+
+        Returns:
+            list: Resposta de cada comando
+        """
+        if not commands:
+            return []
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._send(commands)
+            except (OSError, ConnectionError, RespError):
+                # Conexão quebrada ou recusada: a próxima chamada reconecta
+                self.close()
+                raise
+
+    def execute(self, *command):
+        return self.pipeline([command])[0]
+
+    def transaction(self, keys, reads, build):
+        """
+        Transação otimista (WATCH/MULTI/EXEC) em uma única conexão.
+
+        Observa keys, envia os comandos de leitura e, dentro de MULTI/EXEC, os
+        comandos de escrita que build monta a partir das respostas das leituras.
+
+        Returns:
+            list: Respostas do EXEC, ou None se uma chave observada mudou (nada foi gravado)
+        """
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                replies = self._send([('WATCH', *keys), *reads])[1:]
+                writes = build(replies)
+                if not writes:
+                    self._send([('UNWATCH',)])
+                    return []
+                return self._send([('MULTI',), *writes, ('EXEC',)])[-1]
+            except (OSError, ConnectionError, RespError):
+                self.close()
+                raise
+
+
+class RedisBackend(FraudStateBackend):
+    """
+    Estado gravado como JSON em um servidor compatível com Redis.
+
+    Cada jogador tem a chave do estado e uma chave com a versão; a gravação observa
+    as chaves de versão (WATCH) e grava os estados sem conflito em um MULTI/EXEC.
+    """
+
+    def __init__(self, url, ttl_seconds=None):
+        """
+        Args:
+            url: URL do servidor (redis://host:porta/db)
+            ttl_seconds: Expiração das chaves sem atividade (None = sem expiração)
+        """
+        self.client = RespClient(url)
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def _version_key(player_id):
+        return f'{REDIS_KEY_PREFIX}{player_id}:version'
+
+    @staticmethod
+    def _version(raw):
+        return int(raw) if raw is not None else None
+
+    def load_many(self, player_ids):
+        player_ids = list(player_ids)
+        if not player_ids:
+            return {}
+        # Estados e versões em um único MGET (leitura atômica do par)
+        replies = self.client.execute(
+            'MGET',
+            *[f'{REDIS_KEY_PREFIX}{player_id}' for player_id in player_ids],
+            *[self._version_key(player_id) for player_id in player_ids]
+        )
+        payloads, versions = replies[:len(player_ids)], replies[len(player_ids):]
+        return {
+            player_id: (self._version(version), decode_state(payload))
+            for player_id, payload, version in zip(player_ids, payloads, versions)
+            if payload is not None
+        }
+
+    def save_many(self, states):
+        player_ids = list(states)
+        if not player_ids:
+            return {}
+        version_keys = [self._version_key(player_id) for player_id in player_ids]
+        expiration = ['EX', int(self.ttl_seconds)] if self.ttl_seconds else []
+        saved = {}
+
+        def build(replies):
+            commands = []
+            for player_id, current in zip(player_ids, replies[0]):
+                version, state = states[player_id]
+                if self._version(current) != version:
+                    continue
+                saved[player_id] = (version or 0) + 1
+                commands.append(['SET', f'{REDIS_KEY_PREFIX}{player_id}', encode_state(state), *expiration])
+                commands.append(['SET', self._version_key(player_id), saved[player_id], *expiration])
+            return commands
+
+        if self.client.transaction(version_keys, [('MGET', *version_keys)], build) is None:
+            # Uma chave observada mudou durante a transação: nada foi gravado
+            return {}
+        return saved
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        # Estado da transação da conexão: revisões observadas (WATCH) e comandos enfileirados (MULTI)
+        self.watched = {}
+        self.queued = None
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b'*'):
+                continue
+            command = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                command.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.dispatch(command, self))
+
+
+class LocalRespServer(socketserver.ThreadingTCPServer):
+    """
+    Servidor local compatível com o subconjunto do protocolo Redis usado pelo RedisBackend.
+
+    Para desenvolvimento e testes: atende PING, GET, SET (com EX), MGET, DEL,
+    SELECT, AUTH e transações (WATCH, UNWATCH, MULTI, EXEC, DISCARD), com os
+    dados em memória.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _RespHandler)
+        # chave -> (valor, expira_em ou None)
+        self.data = {}
+        # chave -> contador de alterações, usado pelo WATCH
+        self.revisions = {}
+        self._data_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        """Atende conexões em uma thread de fundo."""
+        self._thread = threading.Thread(target=self.serve_forever, name='local-resp-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    @staticmethod
+    def _bulk(value):
+        if value is None:
+            return b'$-1\r\n'
+        return b'$%d\r\n%s\r\n' % (len(value), value)
+
+    def _get(self, key, now):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            self._delete(key)
+            return None
+        return value
+
+    def _delete(self, key):
+        if self.data.pop(key, None) is None:
+            return False
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+        return True
+
+    def dispatch(self, command, connection):
+        if not command:
+            return b'-ERR empty command\r\n'
+
+        name = command[0].upper()
+        args = command[1:]
+
+        if connection.queued is not None and name not in (b'EXEC', b'DISCARD', b'MULTI', b'WATCH'):
+            connection.queued.append((name, args))
+            return b'+QUEUED\r\n'
+
+        with self._data_lock:
+            if name == b'WATCH' and args:
+                for key in args:
+                    connection.watched.setdefault(key, self.revisions.get(key, 0))
+                return b'+OK\r\n'
+            if name == b'UNWATCH':
+                connection.watched = {}
+                return b'+OK\r\n'
+            if name == b'MULTI':
+                if connection.queued is not None:
+                    return b'-ERR MULTI calls can not be nested\r\n'
+                connection.queued = []
+                return b'+OK\r\n'
+            if name == b'DISCARD':
+                connection.queued = None
+                connection.watched = {}
+                return b'+OK\r\n'
+            if name == b'EXEC':
+                if connection.queued is None:
+                    return b'-ERR EXEC without MULTI\r\n'
+                queued, watched = connection.queued, connection.watched
+                connection.queued = None
+                connection.watched = {}
+                if any(self.revisions.get(key, 0) != revision for key, revision in watched.items()):
+                    return b'*-1\r\n'
+                now = time.monotonic()
+                return b'*%d\r\n' % len(queued) + b''.join(self._execute(*item, now) for item in queued)
+
+            return self._execute(name, args, time.monotonic())
+
+    def _execute(self, name, args, now):
+        # Chamado com _data_lock adquirido
+        if name == b'PING':
+            return b'+PONG\r\n'
+        if name in (b'SELECT', b'AUTH'):
+            return b'+OK\r\n'
+        if name == b'GET' and len(args) == 1:
+            return self._bulk(self._get(args[0], now))
+        if name == b'MGET' and args:
+            return b'*%d\r\n' % len(args) + b''.join(self._bulk(self._get(key, now)) for key in args)
+        if name == b'SET' and len(args) in (2, 4):
+            expires_at = None
+            if len(args) == 4:
+                if args[2].upper() != b'EX':
+                    return b'-ERR syntax error\r\n'
+                expires_at = now + int(args[3])
+            self.data[args[0]] = (args[1], expires_at)
+            self.revisions[args[0]] = self.revisions.get(args[0], 0) + 1
+            return b'+OK\r\n'
+        if name == b'DEL' and args:
+            removed = sum(1 for key in args if self._delete(key))
+            return b':%d\r\n' % removed
+
+        return b"-ERR unknown command '%s'\r\n" % name.decode(errors='replace').encode()
+
+
+class _CachedState:
+    """Estado em cache, com a versão lida do backend e as alterações locais ainda não gravadas."""
+
+    __slots__ = ('loaded_at', 'version', 'state', 'base_counters', 'actions')
+
+    def __init__(self, loaded_at, version, state):
+        self.loaded_at = loaded_at
+        self.version = version
+        self.state = state
+        # Contadores na versão lida e ações aplicadas localmente desde então
+        self.base_counters = _counters(state)
+        self.actions = []
+
+    def has_changes(self):
+        return bool(self.actions) or _counters(self.state) != self.base_counters
+
+
+class FraudStateStore:
+    """
+    Acesso ao estado de fraude dos jogadores através de um backend plugável.
+
+    As leituras passam por um cache local LRU com TTL curto; as alterações marcam o
+    jogador como pendente e uma tarefa de fundo grava os pendentes em lote a cada
+    flush_interval_seconds (e uma última vez no encerramento do processo).
+
+    A gravação compara a versão lida com a do backend. Se outro worker gravou o
+    jogador nesse meio tempo, o estado remoto é recarregado, as ações registradas
+    localmente desde a leitura são reaplicadas sobre ele e os contadores
+    (suspicious_activity, warnings_issued) recebem a diferença local; o resultado
+    é gravado na próxima passagem. Assim nenhum worker descarta a contribuição de
+    outro.
+    """
+
+    # Tempo que um estado lido do backend compartilhado é reutilizado sem recarregar
+    cache_ttl_seconds = 2.0
+    # Estados mantidos no cache local (os pendentes nunca são descartados)
+    max_cached = 10000
+
+    _backend = MemoryBackend()
+    _app = None
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """Configura o backend da aplicação e inicia a gravação periódica em lote."""
+        FraudStateStore._app = app
+        FraudStateStore.cache_ttl_seconds = app.config.get('FRAUD_STATE_CACHE_SECONDS', FraudStateStore.cache_ttl_seconds)
+        FraudStateStore.max_cached = app.config.get('FRAUD_STATE_CACHE_SIZE', FraudStateStore.max_cached)
+
+        backend = app.config.get('FRAUD_STATE_BACKEND', 'memory')
+        if backend == 'sqlite':
+            FraudStateStore.set_backend(SQLiteBackend())
+        elif backend == 'redis':
+            FraudStateStore.set_backend(RedisBackend(
+                app.config['FRAUD_STATE_REDIS_URL'],
+                ttl_seconds=app.config.get('FRAUD_STATE_TTL_SECONDS')
+            ))
+        elif backend != 'memory':
+            raise ValueError(f'Unsupported fraud state backend: {backend}')
+
+        if not FraudStateStore._backend.shared:
+            return
+
+        if FraudStateStore._task is None:
+            FraudStateStore._task = PeriodicTask(
+                'fraud_state_flush',
+                app.config.get('FRAUD_STATE_FLUSH_SECONDS', 1.0),
+                FraudStateStore.flush
+            )
+            atexit.register(FraudStateStore.shutdown)
+
+        FraudStateStore._task.start(app)
+
+    @staticmethod
+    def set_backend(backend):
+        """Troca o backend, descartando o cache local."""
+        with _lock:
+            FraudStateStore._backend = backend
+            _cache.clear()
+            _dirty.clear()
+            _flushing.clear()
+
+    @staticmethod
+    def get_backend():
+        return FraudStateStore._backend
+
+    @staticmethod
+    def get(player_id, create=False):
+        """
+        Estado do jogador, do cache local ou do backend.
+
+        Args:
+            player_id: ID do jogador
+            create: Cria um estado vazio se o jogador ainda não tiver um
+
+        Returns:
+            PlayerFraudState: O estado, ou None se não existir e create for False
+        """
+        entry = FraudStateStore._entry(player_id, create)
+        return entry.state if entry is not None else None
+
+    @staticmethod
+    def _entry(player_id, create):
+        backend = FraudStateStore._backend
+        now = time.monotonic()
+
+        with _lock:
+            entry = _cache.get(player_id)
+            if entry is not None:
+                # Pendentes não são recarregados: as alterações locais são mescladas na gravação
+                if not backend.shared or _is_pending(player_id) or now - entry.loaded_at < FraudStateStore.cache_ttl_seconds:
+                    _cache.move_to_end(player_id)
+                    return entry
+
+        version, state = backend.load_many([player_id]).get(player_id, (None, None))
+        if state is None and create:
+            state = _state_class()()
+            if not backend.shared:
+                version = backend.save_many({player_id: (None, state)}).get(player_id)
+        if state is None:
+            return None
+
+        with _lock:
+            entry = _cache.get(player_id)
+            if entry is not None and (_is_pending(player_id) or entry.loaded_at >= now):
+                # Outra thread carregou ou alterou o jogador enquanto o backend era lido
+                return entry
+            entry = _CachedState(now, version, state)
+            _cache[player_id] = entry
+            _cache.move_to_end(player_id)
+            FraudStateStore._evict()
+        return entry
+
+    @staticmethod
+    def _evict():
+        # Chamado com _lock adquirido; remove os menos usados que não estão pendentes
+        excess = len(_cache) - FraudStateStore.max_cached
+        if excess <= 0:
+            return
+        for player_id in list(_cache):
+            if excess <= 0:
+                break
+            if not _is_pending(player_id):
+                del _cache[player_id]
+                excess -= 1
+
+    @staticmethod
+    def record(player_id, action_type, details, timestamp):
+        """
+        Aplica uma ação ao estado do jogador e agenda sua gravação.
+
+        Com um backend compartilhado a ação também é guardada até a gravação, para
+        ser reaplicada caso outro worker tenha alterado o jogador.
+        """
+        entry = FraudStateStore._entry(player_id, create=True)
+        with _lock:
+            entry.state.record(action_type, details, timestamp)
+            if FraudStateStore._backend.shared:
+                entry.actions.append((action_type, details, timestamp))
+                _dirty.add(player_id)
+                if _cache.get(player_id) is not entry:
+                    # Removido do cache entre a leitura e a alteração
+                    _cache[player_id] = entry
+        return entry.state
+
+    @staticmethod
+    def mark_dirty(player_id):
+        """Agenda a gravação do estado do jogador no próximo lote (ex.: contadores alterados)."""
+        if FraudStateStore._backend.shared:
+            with _lock:
+                _dirty.add(player_id)
+
+    @staticmethod
+    def pending_count():
+        with _lock:
+            return len(_dirty)
+
+    @staticmethod
+    def flush():
+        """
+        Grava em lote os estados pendentes no backend, mesclando os que tiveram conflito.
+
+        Returns:
+            int: Quantidade de jogadores gravados
+        """
+        backend = FraudStateStore._backend
+        with _flush_lock:
+            with _lock:
+                if not _dirty:
+                    return 0
+                # Cópias: os workers podem continuar alterando os estados durante a gravação
+                batch = {}
+                for player_id in _dirty:
+                    entry = _cache.get(player_id)
+                    if entry is not None:
+                        batch[player_id] = (entry, entry.version, _copy_state(entry.state), len(entry.actions))
+                _dirty.clear()
+                # Sem isso, _entry poderia recarregar do backend um jogador cujo TTL venceu
+                # durante a gravação, e as ações registradas na entrada nova se perderiam
+                # quando a entrada do lote voltasse ao cache
+                _flushing.update(batch)
+
+            try:
+                saved = backend.save_many({player_id: (version, state) for player_id, (_, version, state, _) in batch.items()})
+                conflicts = [player_id for player_id in batch if player_id not in saved]
+                remote = backend.load_many(conflicts) if conflicts else {}
+            except Exception:
+                with _lock:
+                    _dirty.update(batch)
+                    _flushing.difference_update(batch)
+                raise
+
+            now = time.monotonic()
+            with _lock:
+                for player_id, (entry, _, snapshot, action_count) in batch.items():
+                    if player_id in saved:
+                        # Gravado: a cópia passa a ser a versão de referência
+                        entry.version = saved[player_id]
+                        entry.base_counters = _counters(snapshot)
+                        del entry.actions[:action_count]
+                    else:
+                        FraudStateStore._merge(entry, remote.get(player_id))
+                    entry.loaded_at = now
+
+                    if entry.has_changes():
+                        # Conflito mesclado ou alterações feitas durante a gravação
+                        _dirty.add(player_id)
+                    if _cache.get(player_id) is not entry:
+                        _cache[player_id] = entry
+                _flushing.difference_update(batch)
+
+        return len(saved)
+
+    @staticmethod
+    def _merge(entry, remote):
+        """Reaplica as alterações locais sobre o estado atual do backend (chamado com _lock)."""
+        version, merged = remote if remote is not None else (None, _state_class()())
+        base_counters = _counters(merged)
+
+        for action_type, details, timestamp in entry.actions:
+            merged.record(action_type, details, timestamp)
+        local_counters = _counters(entry.state)
+        merged.suspicious_activity += local_counters[0] - entry.base_counters[0]
+        merged.warnings_issued += local_counters[1] - entry.base_counters[1]
+
+        # Atualiza o objeto existente, que pode estar em uso por um worker
+        for name in type(merged).__slots__:
+            setattr(entry.state, name, getattr(merged, name))
+        entry.version = version
+        entry.base_counters = base_counters
+
+    @staticmethod
+    def clear():
+        """Descarta o cache local (os pendentes são perdidos)."""
+        with _lock:
+            _cache.clear()
+            _dirty.clear()
+            _flushing.clear()
+
+    @staticmethod
+    def shutdown():
+        """Para a tarefa e grava os estados pendentes (chamado no encerramento do processo)."""
+        if FraudStateStore._task is not None:
+            FraudStateStore._task.stop()
+        if FraudStateStore._app is None:
+            return
+
+        with FraudStateStore._app.app_context():
+            try:
+                FraudStateStore.flush()
+            finally:
+                db.session.remove()
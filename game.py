@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from models.user import db, User
 from models.player import Player
+from utils.balance import BalanceService
+from utils.counter_cache import CounterCache
 
 game_bp = Blueprint('game', __name__)
 
@@ -42,12 +44,12 @@ def kill_monster(player_id):
     if not player:
         return jsonify({'error': 'Player not found'}), 404
     
-    player.monsters_killed += 1
+    CounterCache.increment(player.id, 'monsters_killed')
     
     # A cada 100 monstros, restaurar vida e poder
-    if player.monsters_killed % 100 == 0:
-        player.health = 100
-        player.power += 10
+    if CounterCache.value(player, 'monsters_killed') % 100 == 0:
+        CounterCache.set_value(player.id, 'health', 100)
+        CounterCache.increment(player.id, 'power', 10)
     
     db.session.commit()
     return jsonify({'player': player.to_dict()})
@@ -59,8 +61,8 @@ def self_eliminate(player_id):
         return jsonify({'error': 'Player not found'}), 404
     
     # Ganhar 0.00000000000001 DOOF por auto-eliminação
-    player.dooficoin_balance += 0.00000000000001
-    player.self_eliminations += 1
+    BalanceService.credit(player.id, '0.00000000000001', reason='self_eliminate')
+    CounterCache.increment(player.id, 'self_eliminations')
     
     db.session.commit()
     return jsonify({'player': player.to_dict()})
@@ -73,7 +75,7 @@ def player_die(player_id):
     
     # Perder todas as moedas da partida
     player.dooficoin_balance = 0.0
-    player.health = 100  # Respawn com vida cheia
+    CounterCache.set_value(player.id, 'health', 100)  # Respawn com vida cheia
     
     db.session.commit()
     return jsonify({'player': player.to_dict()})
@@ -0,0 +1,92 @@
+from database import db
+from datetime import datetime
+from utils.money import FixedPoint
+
+class LeaderboardSnapshot(db.Model):
+    """Ranking pré-calculado de uma janela de tempo (diária, semanal ou temporada)."""
+
+    __tablename__ = 'leaderboard_snapshots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    board = db.Column(db.String(20), nullable=False)  # mining, monsters, players, experience
+    window = db.Column(db.String(10), nullable=False)  # daily, weekly, season
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    entry_count = db.Column(db.Integer, nullable=False, default=0)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Snapshot mais recente (e o anterior) de cada ranking
+        db.Index('ix_leaderboard_snapshots_board_window', 'board', 'window', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<LeaderboardSnapshot {self.board}/{self.window} {self.window_start}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'board': self.board,
+            'window': self.window,
+            'window_start': self.window_start.isoformat(),
+            'window_end': self.window_end.isoformat(),
+            'entry_count': self.entry_count,
+            'taken_at': self.taken_at.isoformat()
+        }
+
+
+class LeaderboardSnapshotEntry(db.Model):
+    """Posição de um jogador em um snapshot de ranking."""
+
+    __tablename__ = 'leaderboard_snapshot_entries'
+
+    snapshot_id = db.Column(db.Integer, db.ForeignKey('leaderboard_snapshots.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    score_units = db.Column(FixedPoint, nullable=False, default=0)
+    previous_rank = db.Column(db.Integer, nullable=True)  # Posição no snapshot anterior do mesmo ranking
+
+    __table_args__ = (
+        db.Index('ix_leaderboard_snapshot_entries_player', 'snapshot_id', 'player_id'),
+    )
+
+    def __repr__(self):
+        return f'<LeaderboardSnapshotEntry snapshot={self.snapshot_id} rank={self.rank} player={self.player_id}>'
+
+
+class LeaderboardBaseline(db.Model):
+    """
+    Total acumulado de um contador no início da janela atual.
+
+    Os contadores de PlayerLevel só guardam o total geral; a pontuação na janela é
+    o total atual menos esta linha de base. É gravada junto com o snapshot de
+    fechamento da janela anterior, a partir dos mesmos totais.
+    """
+
+    __tablename__ = 'leaderboard_baselines'
+
+    board = db.Column(db.String(20), primary_key=True)
+    window = db.Column(db.String(10), primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    window_start = db.Column(db.DateTime, nullable=False)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<LeaderboardBaseline {self.board}/{self.window} player={self.player_id}>'
+
+
+class LeaderboardSnapshotRun(db.Model):
+    """
+    Passagem de geração de snapshots reivindicada por um worker.
+
+    Cada intervalo tem uma única linha (inserida com OR IGNORE), então apenas um
+    worker gera os snapshots e as linhas de base daquele intervalo.
+    """
+
+    __tablename__ = 'leaderboard_snapshot_runs'
+
+    slot_start = db.Column(db.DateTime, primary_key=True)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<LeaderboardSnapshotRun {self.slot_start}>'
@@ -0,0 +1,327 @@
+from datetime import datetime, timedelta
+from database import db
+from models.player import Player
+from models.level import PlayerLevel
+from models.mining_rollup import MiningRollup
+from models.leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshotEntry, LeaderboardBaseline, LeaderboardSnapshotRun
+from utils.background import PeriodicTask
+from utils.money import from_units
+
+# Rankings por janela: coluna de PlayerLevel acumulada (None = mineração, somada dos rollups diários)
+BOARDS = {
+    'mining': None,
+    'monsters': 'total_monsters_killed',
+    'players': 'total_players_killed',
+    'experience': 'experience_points'
+}
+WINDOWS = ('daily', 'weekly', 'season')
+# Atraso da passagem em relação ao início do intervalo (ou à virada de uma janela), em segundos
+BOUNDARY_DELAY_SECONDS = 1
+
+
+class WindowedLeaderboards:
+    """
+    Rankings diários, semanais e da temporada, pré-calculados em snapshots.
+
+    Uma tarefa periódica grava, para cada ranking e janela, um snapshot compacto
+    (no máximo snapshot_size posições) com a posição anterior de cada jogador. As
+    rotas apenas leem o snapshot mais recente pela chave (snapshot_id, rank); o
+    snapshot anterior é mantido para o cálculo da variação de posição.
+
+    A pontuação de mineração vem dos rollups diários. Os contadores de PlayerLevel
+    só têm o total geral, então a pontuação na janela é medida a partir de uma linha
+    de base. Na primeira passagem depois de uma virada, cada ranking grava o snapshot
+    de fechamento da janela anterior (que continua sendo o servido até a passagem
+    seguinte, em vez de um ranking vazio da janela nova), e os mesmos totais lidos
+    para esse fechamento viram a linha de base da janela nova: nada fica sem contar
+    nem é contado nas duas janelas.
+
+    As passagens acontecem no início de intervalos de interval_seconds contados a
+    partir da virada de janela mais recente (meia-noite, segunda-feira ou início de
+    temporada, a partir de season_anchor), então toda virada começa um intervalo.
+    Todos os workers executam a tarefa, mas cada intervalo é reivindicado por um
+    único deles (LeaderboardSnapshotRun), então o snapshot anterior e a linha de
+    base vêm sempre de uma sequência de passagens sem concorrência.
+    """
+
+    # Intervalo entre passagens (segundos)
+    interval_seconds = 300
+    # Posições gravadas por snapshot
+    snapshot_size = 1000
+    # Snapshots mantidos por ranking e janela (atual e anterior)
+    keep_snapshots = 2
+    # Início da primeira temporada e duração de cada uma
+    season_anchor = datetime(2025, 1, 1)
+    season_days = 91
+
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """Inicia a geração periódica de snapshots com os parâmetros da aplicação."""
+        WindowedLeaderboards.interval_seconds = app.config.get('LEADERBOARD_SNAPSHOT_SECONDS', WindowedLeaderboards.interval_seconds)
+        WindowedLeaderboards.snapshot_size = app.config.get('LEADERBOARD_SNAPSHOT_SIZE', WindowedLeaderboards.snapshot_size)
+        WindowedLeaderboards.season_days = app.config.get('LEADERBOARD_SEASON_DAYS', WindowedLeaderboards.season_days)
+        if app.config.get('LEADERBOARD_SEASON_ANCHOR'):
+            WindowedLeaderboards.season_anchor = datetime.fromisoformat(app.config['LEADERBOARD_SEASON_ANCHOR'])
+
+        if WindowedLeaderboards._task is None:
+            WindowedLeaderboards._task = PeriodicTask(
+                'leaderboard_snapshots',
+                WindowedLeaderboards.seconds_until_next_run,
+                WindowedLeaderboards.run_once
+            )
+
+        WindowedLeaderboards._task.start(app)
+
+    @staticmethod
+    def window_bounds(window, now):
+        """
+        Calcula o início e o fim (exclusivo) da janela que contém o instante informado.
+
+        Returns:
+            tuple: (início, fim)
+        """
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        if window == 'daily':
+            return today, today + timedelta(days=1)
+
+        if window == 'weekly':
+            # Semanas começam na segunda-feira
+            start = today - timedelta(days=today.weekday())
+            return start, start + timedelta(days=7)
+
+        length = timedelta(days=WindowedLeaderboards.season_days)
+        seasons = (now - WindowedLeaderboards.season_anchor) // length
+        start = WindowedLeaderboards.season_anchor + seasons * length
+        return start, start + length
+
+    @staticmethod
+    def seconds_until_next_run(now=None):
+        """Espera até logo após o início do próximo intervalo de passagens (ou a próxima virada, se vier antes)."""
+        now = now or datetime.utcnow()
+        next_slot = WindowedLeaderboards.slot_start(now) + timedelta(seconds=WindowedLeaderboards.interval_seconds)
+        next_boundary = min(WindowedLeaderboards.window_bounds(window, now)[1] for window in WINDOWS)
+        return max((min(next_slot, next_boundary) - now).total_seconds(), 0) + BOUNDARY_DELAY_SECONDS
+
+    @staticmethod
+    def slot_start(now):
+        """Início do intervalo de passagens que contém o instante (a grade recomeça em cada virada de janela)."""
+        last_boundary = max(WindowedLeaderboards.window_bounds(window, now)[0] for window in WINDOWS)
+        interval = timedelta(seconds=WindowedLeaderboards.interval_seconds)
+        return last_boundary + ((now - last_boundary) // interval) * interval
+
+    @staticmethod
+    def _claim(now):
+        """Reivindica o intervalo atual para este worker (primeira escrita da transação)."""
+        table = LeaderboardSnapshotRun.__table__
+        claimed = db.session.execute(table.insert().prefix_with('OR IGNORE').values(
+            slot_start=WindowedLeaderboards.slot_start(now),
+            taken_at=now
+        )).rowcount == 1
+
+        if claimed:
+            db.session.execute(table.delete().where(table.c.slot_start < now - timedelta(days=1)))
+        return claimed
+
+    @staticmethod
+    def run_once(now=None):
+        """
+        Gera um snapshot de cada ranking em cada janela, com um único commit.
+
+        Não faz nada se outro worker já gerou os snapshots do intervalo atual.
+
+        Returns:
+            int: Quantidade de snapshots gerados
+        """
+        now = now or datetime.utcnow()
+
+        if not WindowedLeaderboards._claim(now):
+            db.session.rollback()
+            return 0
+
+        # Totais atuais dos contadores: uma consulta para todos os rankings de PlayerLevel
+        counter_columns = [column for column in BOARDS.values() if column]
+        totals = {
+            row.player_id: row
+            for row in db.session.query(
+                PlayerLevel.player_id,
+                *[getattr(PlayerLevel, column) for column in counter_columns]
+            ).all()
+        }
+
+        built = 0
+        for window in WINDOWS:
+            window_start, window_end = WindowedLeaderboards.window_bounds(window, now)
+
+            for board, column in BOARDS.items():
+                if column is None:
+                    bounds, scores = WindowedLeaderboards._mining_scores(board, window, window_start, window_end)
+                else:
+                    bounds, scores = WindowedLeaderboards._counter_scores(board, window, window_start, window_end, column, totals)
+
+                WindowedLeaderboards._write_snapshot(board, window, bounds[0], bounds[1], scores, now)
+                built += 1
+
+        db.session.commit()
+        return built
+
+    @staticmethod
+    def _mining_scores(board, window, window_start, window_end):
+        """
+        Total minerado por jogador, a partir dos rollups diários.
+
+        Returns:
+            tuple: ((início, fim) da janela pontuada, pontuações); a janela anterior
+            se esta é a passagem de fechamento dela
+        """
+        previous = WindowedLeaderboards.latest(board, window)
+        if previous is not None and previous.window_start < window_start and previous.taken_at < window_start:
+            window_start, window_end = previous.window_start, previous.window_end
+
+        rows = db.session.query(
+            MiningRollup.player_id,
+            db.func.doof_sum(MiningRollup.amount_mined_units)
+        ).filter(
+            MiningRollup.period == 'day',
+            MiningRollup.player_id != MiningRollup.GLOBAL,
+            MiningRollup.bucket_start >= window_start,
+            MiningRollup.bucket_start < window_end
+        ).group_by(MiningRollup.player_id).all()
+
+        return (window_start, window_end), {player_id: int(total) for player_id, total in rows if total}
+
+    @staticmethod
+    def _counter_scores(board, window, window_start, window_end, column, totals):
+        """
+        Crescimento de um contador de PlayerLevel desde a linha de base da janela.
+
+        Returns:
+            tuple: ((início, fim) da janela pontuada, pontuações); a janela anterior
+            se esta é a passagem de fechamento dela
+        """
+        baseline_start = db.session.query(LeaderboardBaseline.window_start).filter_by(
+            board=board,
+            window=window
+        ).limit(1).scalar()
+
+        scores = {}
+        if baseline_start is not None:
+            baselines = dict(db.session.query(LeaderboardBaseline.player_id, LeaderboardBaseline.value).filter_by(
+                board=board,
+                window=window
+            ).all())
+            for player_id, row in totals.items():
+                score = (getattr(row, column) or 0) - baselines.get(player_id, 0)
+                if score > 0:
+                    scores[player_id] = score
+
+            if baseline_start == window_start:
+                return (window_start, window_end), scores
+
+        # Virada (ou primeira passagem): os totais lidos agora fecham a janela anterior
+        # e são a linha de base da nova
+        LeaderboardBaseline.query.filter_by(board=board, window=window).delete(synchronize_session=False)
+        if totals:
+            db.session.execute(LeaderboardBaseline.__table__.insert(), [{
+                'board': board,
+                'window': window,
+                'player_id': player_id,
+                'window_start': window_start,
+                'value': getattr(row, column) or 0
+            } for player_id, row in totals.items()])
+
+        if baseline_start is None:
+            return (window_start, window_end), {}
+        return WindowedLeaderboards.window_bounds(window, baseline_start), scores
+
+    @staticmethod
+    def _write_snapshot(board, window, window_start, window_end, scores, now):
+        """Grava o snapshot ordenado e remove os snapshots que saíram da retenção."""
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:WindowedLeaderboards.snapshot_size]
+
+        previous = LeaderboardSnapshot.query.filter_by(
+            board=board,
+            window=window
+        ).order_by(LeaderboardSnapshot.id.desc()).first()
+        previous_ranks = {}
+        if previous:
+            previous_ranks = dict(db.session.query(
+                LeaderboardSnapshotEntry.player_id,
+                LeaderboardSnapshotEntry.rank
+            ).filter(LeaderboardSnapshotEntry.snapshot_id == previous.id).all())
+
+        snapshot = LeaderboardSnapshot(
+            board=board,
+            window=window,
+            window_start=window_start,
+            window_end=window_end,
+            entry_count=len(ranked),
+            taken_at=now
+        )
+        db.session.add(snapshot)
+        db.session.flush()
+
+        if ranked:
+            db.session.execute(LeaderboardSnapshotEntry.__table__.insert(), [{
+                'snapshot_id': snapshot.id,
+                'rank': rank,
+                'player_id': player_id,
+                'score_units': score,
+                'previous_rank': previous_ranks.get(player_id)
+            } for rank, (player_id, score) in enumerate(ranked, start=1)])
+
+        expired = [snapshot_id for (snapshot_id,) in db.session.query(LeaderboardSnapshot.id).filter_by(
+            board=board,
+            window=window
+        ).order_by(LeaderboardSnapshot.id.desc()).offset(WindowedLeaderboards.keep_snapshots).all()]
+
+        if expired:
+            LeaderboardSnapshotEntry.query.filter(
+                LeaderboardSnapshotEntry.snapshot_id.in_(expired)
+            ).delete(synchronize_session=False)
+            LeaderboardSnapshot.query.filter(
+                LeaderboardSnapshot.id.in_(expired)
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def latest(board, window):
+        """Snapshot mais recente de um ranking, ou None se ainda não foi gerado."""
+        return LeaderboardSnapshot.query.filter_by(
+            board=board,
+            window=window
+        ).order_by(LeaderboardSnapshot.id.desc()).first()
+
+    @staticmethod
+    def _format_entry(board, entry, player_name):
+        return {
+            'rank': entry.rank,
+            'player_id': entry.player_id,
+            'player_name': player_name,
+            'score': from_units(entry.score_units) if BOARDS[board] is None else entry.score_units,
+            'previous_rank': entry.previous_rank,
+            # Positivo quando o jogador subiu em relação ao snapshot anterior
+            'rank_change': entry.previous_rank - entry.rank if entry.previous_rank else None
+        }
+
+    @staticmethod
+    def page(snapshot, offset, limit):
+        """Retorna uma faixa de posições do snapshot (busca pela chave snapshot_id, rank)."""
+        rows = db.session.query(LeaderboardSnapshotEntry, Player.username).join(
+            Player, Player.id == LeaderboardSnapshotEntry.player_id
+        ).filter(
+            LeaderboardSnapshotEntry.snapshot_id == snapshot.id,
+            LeaderboardSnapshotEntry.rank > offset,
+            LeaderboardSnapshotEntry.rank <= offset + limit
+        ).order_by(LeaderboardSnapshotEntry.rank).all()
+
+        return [WindowedLeaderboards._format_entry(snapshot.board, entry, player_name) for entry, player_name in rows]
+
+    @staticmethod
+    def entry_for(snapshot, player):
+        """Posição do jogador no snapshot, ou None se ele não pontuou na janela."""
+        entry = LeaderboardSnapshotEntry.query.filter_by(snapshot_id=snapshot.id, player_id=player.id).first()
+        if not entry:
+            return None
+        return WindowedLeaderboards._format_entry(snapshot.board, entry, player.username)
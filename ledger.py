@@ -0,0 +1,285 @@
+import uuid
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from models.user import db
+from models.player import Player
+from models.ledger_entry import LedgerEntry, BalanceSnapshot
+from utils.background import PeriodicTask
+from utils.money import from_units, to_units
+
+# Contrapartida no sistema de cada motivo de movimentação
+SYSTEM_ACCOUNTS = {
+    'mining': 'system:mining',
+    'reward': 'system:rewards',
+    'self_eliminate': 'system:rewards',
+    'purchase': 'system:shop',
+    'death': 'system:burn',
+    'withdrawal': 'system:withdrawals',
+    'withdrawal_refund': 'system:withdrawals',
+    'deposit': 'system:deposits'
+}
+DEFAULT_SYSTEM_ACCOUNT = 'system:adjustment'
+
+# Chave em Session.info onde os lançamentos aguardam o commit
+_PENDING_KEY = 'ledger_pending_entries'
+
+
+class Ledger:
+    """
+    Livro-razão de partidas dobradas das carteiras dos jogadores.
+
+    Os lançamentos são acumulados na sessão e gravados com um único INSERT em lote
+    no commit da transação que alterou os saldos, então nunca divergem dela.
+    Snapshots periódicos consolidam o saldo de cada jogador, e o saldo segundo o
+    livro-razão é o snapshot mais a soma dos lançamentos posteriores.
+    """
+
+    # Jogadores por lote nas consultas de snapshot e reconciliação
+    batch_size = 500
+
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """Inicia a tarefa periódica de snapshots de saldo."""
+        if Ledger._task is None:
+            Ledger._task = PeriodicTask(
+                'ledger_snapshots',
+                app.config.get('LEDGER_SNAPSHOT_INTERVAL_SECONDS', 3600),
+                Ledger.take_snapshots
+            )
+
+        Ledger._task.start(app)
+
+    @staticmethod
+    def _system_account(reason):
+        return SYSTEM_ACCOUNTS.get(reason, DEFAULT_SYSTEM_ACCOUNT)
+
+    @staticmethod
+    def _stage(reason, reference, debit, credit, units):
+        """
+        Acumula um diário (débito + crédito de mesmo valor) para gravação no commit.
+
+        Args:
+            reason: Motivo da movimentação
+            reference: Referência opcional (ex.: mining_session:12)
+            debit: Tupla (conta, player_id) debitada
+            credit: Tupla (conta, player_id) creditada
+            units: Quantidade em unidades de ponto fixo
+        """
+        if units <= 0:
+            return
+
+        journal_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        pending = db.session.info.setdefault(_PENDING_KEY, [])
+
+        for direction, (account, player_id) in ((LedgerEntry.DEBIT, debit), (LedgerEntry.CREDIT, credit)):
+            pending.append({
+                'journal_id': journal_id,
+                'account': account,
+                'player_id': player_id,
+                'direction': direction,
+                'amount_units': units,
+                'reason': reason,
+                'reference': reference,
+                'created_at': now
+            })
+
+    @staticmethod
+    def post_credit(player_id, units, reason, reference=None):
+        """Registra um crédito na carteira do jogador contra a conta do sistema do motivo."""
+        Ledger._stage(
+            reason, reference,
+            (Ledger._system_account(reason), None),
+            (LedgerEntry.PLAYER_ACCOUNT, player_id),
+            units
+        )
+
+    @staticmethod
+    def post_debit(player_id, units, reason, reference=None):
+        """Registra um débito na carteira do jogador a favor da conta do sistema do motivo."""
+        Ledger._stage(
+            reason, reference,
+            (LedgerEntry.PLAYER_ACCOUNT, player_id),
+            (Ledger._system_account(reason), None),
+            units
+        )
+
+    @staticmethod
+    def post_transfer(from_player_id, to_player_id, units, reason, reference=None):
+        """Registra uma transferência entre as carteiras de dois jogadores."""
+        Ledger._stage(
+            reason, reference,
+            (LedgerEntry.PLAYER_ACCOUNT, from_player_id),
+            (LedgerEntry.PLAYER_ACCOUNT, to_player_id),
+            units
+        )
+
+    @staticmethod
+    def flush_pending(session):
+        """Grava em lote os lançamentos acumulados na sessão (chamado antes do commit)."""
+        pending = session.info.pop(_PENDING_KEY, None)
+        if pending:
+            session.execute(LedgerEntry.__table__.insert(), pending)
+
+    @staticmethod
+    def discard_pending(session):
+        """Descarta os lançamentos de uma transação desfeita."""
+        session.info.pop(_PENDING_KEY, None)
+
+    @staticmethod
+    def balances(player_ids):
+        """
+        Calcula o saldo segundo o livro-razão: snapshot + lançamentos posteriores.
+
+        Args:
+            player_ids: IDs dos jogadores
+
+        Returns:
+            dict: player_id -> saldo em unidades de ponto fixo
+        """
+        player_ids = list(player_ids)
+        if not player_ids:
+            return {}
+
+        snapshots = {
+            snapshot.player_id: snapshot
+            for snapshot in BalanceSnapshot.query.filter(BalanceSnapshot.player_id.in_(player_ids)).all()
+        }
+        result = {
+            player_id: snapshots[player_id].balance_units if player_id in snapshots else 0
+            for player_id in player_ids
+        }
+
+        # Apenas os lançamentos posteriores ao snapshot de cada jogador (índice player_id, id)
+        entries = LedgerEntry.__table__
+        snapshot_table = BalanceSnapshot.__table__
+        deltas = db.session.execute(db.select(
+            entries.c.player_id,
+            entries.c.direction,
+            db.func.doof_sum(entries.c.amount_units)
+        ).select_from(
+            entries.outerjoin(snapshot_table, snapshot_table.c.player_id == entries.c.player_id)
+        ).where(
+            entries.c.player_id.in_(player_ids),
+            entries.c.account == LedgerEntry.PLAYER_ACCOUNT,
+            entries.c.id > db.func.coalesce(snapshot_table.c.last_entry_id, 0)
+        ).group_by(entries.c.player_id, entries.c.direction)).all()
+
+        for player_id, direction, total in deltas:
+            units = int(total)
+            result[player_id] += units if direction == LedgerEntry.CREDIT else -units
+
+        return result
+
+    @staticmethod
+    def balance_of(player_id):
+        """Saldo do jogador segundo o livro-razão, em unidades de ponto fixo."""
+        return Ledger.balances([player_id])[player_id]
+
+    @staticmethod
+    def take_snapshots():
+        """
+        Consolida os lançamentos novos nos snapshots de saldo dos jogadores afetados.
+
+        Lê apenas os lançamentos após a última marca (faixa da chave primária) e grava
+        todos os snapshots em uma única transação, para que a marca seja consistente.
+
+        Returns:
+            int: Quantidade de snapshots atualizados
+        """
+        entries = LedgerEntry.__table__
+        watermark = db.session.query(db.func.coalesce(db.func.max(BalanceSnapshot.last_entry_id), 0)).scalar()
+        last_entry_id = db.session.query(db.func.coalesce(db.func.max(LedgerEntry.id), 0)).scalar()
+
+        if last_entry_id <= watermark:
+            return 0
+
+        deltas = {}
+        for player_id, direction, total in db.session.execute(db.select(
+            entries.c.player_id,
+            entries.c.direction,
+            db.func.doof_sum(entries.c.amount_units)
+        ).where(
+            entries.c.id > watermark,
+            entries.c.id <= last_entry_id,
+            entries.c.account == LedgerEntry.PLAYER_ACCOUNT
+        ).group_by(entries.c.player_id, entries.c.direction)).all():
+            units = int(total)
+            deltas[player_id] = deltas.get(player_id, 0) + (units if direction == LedgerEntry.CREDIT else -units)
+
+        player_ids = list(deltas)
+        table = BalanceSnapshot.__table__
+        now = datetime.utcnow()
+
+        for start in range(0, len(player_ids), Ledger.batch_size):
+            chunk = player_ids[start:start + Ledger.batch_size]
+            previous = dict(db.session.query(BalanceSnapshot.player_id, BalanceSnapshot.balance_units).filter(
+                BalanceSnapshot.player_id.in_(chunk)
+            ).all())
+
+            statement = sqlite_insert(table).values([{
+                'player_id': player_id,
+                'balance_units': previous.get(player_id, 0) + deltas[player_id],
+                'last_entry_id': last_entry_id,
+                'taken_at': now
+            } for player_id in chunk])
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.player_id],
+                set_={
+                    'balance_units': statement.excluded.balance_units,
+                    'last_entry_id': statement.excluded.last_entry_id,
+                    'taken_at': statement.excluded.taken_at
+                }
+            )
+            db.session.execute(statement)
+
+        db.session.commit()
+        return len(player_ids)
+
+    @staticmethod
+    def reconcile(after_player_id=0, limit=100):
+        """
+        Compara o saldo das carteiras com o saldo segundo o livro-razão.
+
+        Args:
+            after_player_id: Continuar a partir deste ID de jogador (paginação por chave)
+            limit: Quantidade de jogadores verificados
+
+        Returns:
+            dict: Jogadores verificados, divergências e cursor da próxima página
+        """
+        players = db.session.query(Player.id, Player.wallet_balance).filter(
+            Player.id > after_player_id
+        ).order_by(Player.id).limit(limit).all()
+
+        ledger_balances = Ledger.balances(player_id for player_id, _ in players)
+
+        mismatches = []
+        for player_id, wallet_balance in players:
+            ledger_units = ledger_balances[player_id]
+            if to_units(wallet_balance) != ledger_units:
+                mismatches.append({
+                    'player_id': player_id,
+                    'wallet_balance': wallet_balance,
+                    'ledger_balance': from_units(ledger_units)
+                })
+
+        return {
+            'checked': len(players),
+            'mismatches': mismatches,
+            'next_after': players[-1][0] if len(players) == limit else None
+        }
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_pending_entries(session):
+    Ledger.flush_pending(session)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending_entries(session, previous_transaction):
+    Ledger.discard_pending(session)
@@ -0,0 +1,106 @@
+from database import db
+from datetime import datetime
+from utils.money import FixedPoint, encode_units, from_units
+from utils.schema import register_migration
+
+class LedgerEntry(db.Model):
+    """
+    Lançamento do livro-razão de partidas dobradas (somente inserção).
+
+    Cada movimentação gera um diário (journal_id) com um débito e um crédito de
+    mesmo valor: uma das contas é a carteira do jogador e a outra é uma conta do
+    sistema (ex.: system:mining) ou a carteira de outro jogador (PvP).
+    """
+
+    __tablename__ = 'ledger_entries'
+
+    # Conta das carteiras de jogadores (as demais são contas do sistema)
+    PLAYER_ACCOUNT = 'player'
+    CREDIT = 'credit'
+    DEBIT = 'debit'
+
+    id = db.Column(db.Integer, primary_key=True)
+    journal_id = db.Column(db.String(40), nullable=False, index=True)
+    account = db.Column(db.String(50), nullable=False)  # player, system:mining, system:shop...
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=True)  # Apenas para a conta player
+    direction = db.Column(db.String(6), nullable=False)  # credit, debit
+    amount_units = db.Column(FixedPoint, nullable=False)
+    reason = db.Column(db.String(30), nullable=False)  # mining, pvp_kill, death, purchase, reward...
+    reference = db.Column(db.String(100), nullable=True)  # ex.: mining_session:12
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Varredura do delta de um jogador a partir do último snapshot
+        db.Index('ix_ledger_entries_player_id', 'player_id', 'id'),
+    )
+
+    def __repr__(self):
+        return f'<LedgerEntry {self.id}: {self.direction} {self.account} ({self.reason})>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'journal_id': self.journal_id,
+            'account': self.account,
+            'player_id': self.player_id,
+            'direction': self.direction,
+            'amount': from_units(self.amount_units),
+            'reason': self.reason,
+            'reference': self.reference,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class BalanceSnapshot(db.Model):
+    """Saldo de um jogador segundo o livro-razão, consolidado até o lançamento last_entry_id."""
+
+    __tablename__ = 'balance_snapshots'
+
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    balance_units = db.Column(FixedPoint, nullable=False, default=0)
+    last_entry_id = db.Column(db.Integer, nullable=False, default=0)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<BalanceSnapshot player={self.player_id} entry={self.last_entry_id}>'
+
+    def to_dict(self):
+        return {
+            'player_id': self.player_id,
+            'balance': from_units(self.balance_units),
+            'last_entry_id': self.last_entry_id,
+            'taken_at': self.taken_at.isoformat()
+        }
+
+
+@register_migration
+def protect_ledger_entries():
+    """Impede UPDATE e DELETE em ledger_entries diretamente no banco."""
+    for operation in ('UPDATE', 'DELETE'):
+        db.session.execute(db.text(
+            f'CREATE TRIGGER IF NOT EXISTS trg_ledger_entries_no_{operation.lower()} '
+            f'BEFORE {operation} ON ledger_entries '
+            "BEGIN SELECT RAISE(ABORT, 'ledger_entries is append-only'); END"
+        ))
+
+
+@register_migration
+def open_ledger_balances():
+    """Lança o saldo de abertura dos jogadores que ainda não têm lançamentos no livro-razão."""
+    zero = encode_units(0)
+    pending = (
+        'FROM players p WHERE p.wallet_balance > :zero '
+        'AND NOT EXISTS (SELECT 1 FROM ledger_entries e WHERE e.player_id = p.id)'
+    )
+
+    # Contrapartida no sistema antes do crédito, que marca o jogador como migrado
+    db.session.execute(db.text(
+        'INSERT INTO ledger_entries (journal_id, account, player_id, direction, amount_units, reason, reference, created_at) '
+        "SELECT 'opening-' || p.id, 'system:opening', NULL, 'debit', p.wallet_balance, 'opening', 'player:' || p.id, CURRENT_TIMESTAMP "
+        + pending
+    ), {'zero': zero})
+    db.session.execute(db.text(
+        'INSERT INTO ledger_entries (journal_id, account, player_id, direction, amount_units, reason, reference, created_at) '
+        "SELECT 'opening-' || p.id, 'player', p.id, 'credit', p.wallet_balance, 'opening', NULL, CURRENT_TIMESTAMP "
+        + pending
+    ), {'zero': zero})
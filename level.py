@@ -1,3 +1,4 @@
+from collections import defaultdict
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 from decimal import Decimal
@@ -5,21 +6,27 @@ from models.user import db
 from models.player import Player
 from models.level import PlayerLevel, LevelReward, PhaseProgress
 from models.scenario import PlayerScenarioProgress, Scenario
-from utils.security import token_required, log_security_event
+from utils.counter_cache import CounterCache
+from utils.principal import current_player
+from utils.security import token_required, rate_limit, log_security_event
 from utils.fraud_detection import FraudDetector
+from utils.ranking import LeaderboardEngine, RANKING_TYPES
+from utils.leaderboard_windows import WindowedLeaderboards, BOARDS, WINDOWS
 
 level_bp = Blueprint('level', __name__)
 
+# Limite de eventos por chamada de /kill-monsters
+MAX_KILLS_PER_BATCH = 200
+# Limite de posições acima/abaixo do jogador em /leaderboard/around
+MAX_LEADERBOARD_RADIUS = 25
+
 @level_bp.route('/status', methods=['GET'])
 @token_required
 def get_level_status():
     """Obtém o status de nível e progressão do jogador."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -55,11 +62,8 @@ def get_level_status():
 def kill_monster():
     """Registra a morte de um monstro e atualiza a progressão."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -82,8 +86,8 @@ def kill_monster():
         # Registrar a morte do monstro
         player_level.add_monster_kill()
         
-        # Atualizar estatísticas do jogador
-        player.monsters_killed += 1
+        # Atualizar estatísticas do jogador (gravadas em lote pelo cache de contadores)
+        CounterCache.increment(player.id, 'monsters_killed')
         
         # Atualizar progresso do cenário
         scenario_progress = PlayerScenarioProgress.query.filter_by(
@@ -98,7 +102,7 @@ def kill_monster():
         FraudDetector.record_player_action(player.id, 'kill_monster', {
             'monster_id': monster_id,
             'scenario_id': scenario_id,
-            'total_monsters_killed': player.monsters_killed
+            'total_monsters_killed': CounterCache.value(player, 'monsters_killed')
         })
         
         # Verificar se houve mudança de nível
@@ -111,7 +115,7 @@ def kill_monster():
         log_security_event('monster_killed', 
                           f'Player {player.id} killed monster in scenario {scenario_id}', 
                           'info',
-                          user_id=user_id)
+                          user_id=player.user_id)
         
         return jsonify({
             'message': 'Monster kill registered successfully',
@@ -125,16 +129,120 @@ def kill_monster():
         log_security_event('kill_monster_error', str(e), 'error')
         return jsonify({'error': 'An error occurred while registering monster kill'}), 500
 
+@level_bp.route('/kill-monsters', methods=['POST'])
+@token_required
+@rate_limit(max_requests=30, window_seconds=60)
+def kill_monsters():
+    """
+    Registra um lote de mortes de monstros com um único commit.
+
+    Corpo: {"kills": [{"monster_id": 1, "scenario_id": 2}, ...]}
+    A detecção de fraudes recebe as mortes com o instante de chegada do lote no
+    servidor; instantes informados pelo cliente são ignorados.
+    """
+    try:
+        # Buscar o jogador
+        player = current_player()
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
+        
+        # Obter dados da requisição
+        data = request.get_json() or {}
+        kills = data.get('kills')
+        
+        if not isinstance(kills, list) or not kills:
+            return jsonify({'error': 'A non-empty list of kills is required'}), 400
+        if len(kills) > MAX_KILLS_PER_BATCH:
+            return jsonify({'error': f'At most {MAX_KILLS_PER_BATCH} kills per batch'}), 400
+        if not all(isinstance(kill, dict) for kill in kills):
+            return jsonify({'error': 'Each kill must be an object'}), 400
+        
+        events = []
+        for kill in kills:
+            try:
+                scenario_id = int(kill.get('scenario_id', player.current_phase))
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid scenario ID'}), 400
+            events.append((kill.get('monster_id'), scenario_id))
+        
+        # Buscar ou criar o registro de nível do jogador
+        player_level = PlayerLevel.query.filter_by(player_id=player.id).first()
+        if not player_level:
+            player_level = PlayerLevel(
+                player_id=player.id,
+                current_level=player.level,
+                current_phase=player.current_phase
+            )
+            db.session.add(player_level)
+            db.session.flush()
+        
+        # Registrar as mortes dos monstros (em memória; gravadas no commit único)
+        for _ in events:
+            player_level.add_monster_kill()
+        
+        # Atualizar estatísticas do jogador (gravadas em lote pelo cache de contadores)
+        CounterCache.increment(player.id, 'monsters_killed', len(events))
+        
+        # Atualizar o progresso de todos os cenários do lote com uma única consulta
+        kills_by_scenario = defaultdict(int)
+        for _, scenario_id in events:
+            kills_by_scenario[scenario_id] += 1
+        
+        scenario_progress = PlayerScenarioProgress.query.filter(
+            PlayerScenarioProgress.player_id == player.id,
+            PlayerScenarioProgress.scenario_id.in_(list(kills_by_scenario))
+        ).all()
+        
+        for progress in scenario_progress:
+            for _ in range(kills_by_scenario[progress.scenario_id]):
+                progress.defeat_monster()
+        
+        # Verificar se houve mudança de nível
+        level_changed = player_level.current_level > player.level
+        if level_changed:
+            player.level = player_level.current_level
+        
+        db.session.commit()
+        
+        # Registrar para detecção de fraudes (uma verificação de padrões por lote).
+        # Todas as mortes recebem o mesmo instante do servidor, então apenas o intervalo
+        # desde o lote anterior entra nas estatísticas de intervalos entre ações.
+        total_monsters_killed = CounterCache.value(player, 'monsters_killed')
+        FraudDetector.record_player_actions(player.id, [
+            ('kill_monster', {
+                'monster_id': monster_id,
+                'scenario_id': scenario_id,
+                'total_monsters_killed': total_monsters_killed
+            }, None)
+            for monster_id, scenario_id in events
+        ])
+        
+        log_security_event('monsters_killed', 
+                          f'Player {player.id} killed {len(events)} monsters in scenarios {sorted(kills_by_scenario)}', 
+                          'info',
+                          user_id=player.user_id)
+        
+        return jsonify({
+            'message': 'Monster kills registered successfully',
+            'kills_registered': len(events),
+            'player_level': player_level.to_dict(),
+            'level_changed': level_changed,
+            'new_level': player_level.current_level if level_changed else None,
+            'scenario_progress': [progress.to_dict() for progress in scenario_progress]
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        log_security_event('kill_monsters_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while registering monster kills'}), 500
+
 @level_bp.route('/kill-player', methods=['POST'])
 @token_required
 def kill_player():
     """Registra a morte de outro jogador e atualiza a progressão."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -164,14 +272,17 @@ def kill_player():
         # Registrar a morte do jogador
         player_level.add_player_kill()
         
-        # Transferir 20% das moedas do alvo
+        # Transferir 20% das moedas do alvo (UPDATEs atômicos no banco)
         coins_gained = player.kill_player(target_player)
+        if coins_gained is None:
+            db.session.rollback()
+            return jsonify({'error': 'Target balance changed during the kill, please retry'}), 409
         
         # Registrar para detecção de fraudes
         FraudDetector.record_player_action(player.id, 'kill_player', {
             'target_player_id': target_player_id,
             'coins_gained': coins_gained,
-            'total_player_kills': player.player_kills
+            'total_player_kills': CounterCache.value(player, 'player_kills')
         })
         
         # Verificar se houve mudança de nível
@@ -184,7 +295,7 @@ def kill_player():
         log_security_event('player_killed', 
                           f'Player {player.id} killed player {target_player_id}', 
                           'info',
-                          user_id=user_id)
+                          user_id=player.user_id)
         
         return jsonify({
             'message': 'Player kill registered successfully',
@@ -203,11 +314,8 @@ def kill_player():
 def claim_reward(reward_id):
     """Reivindica uma recompensa de nível."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -242,7 +350,7 @@ def claim_reward(reward_id):
         log_security_event('reward_claimed', 
                           f'Player {player.id} claimed reward {reward_id}', 
                           'info',
-                          user_id=user_id)
+                          user_id=player.user_id)
         
         return jsonify({
             'message': 'Reward claimed successfully',
@@ -254,78 +362,65 @@ def claim_reward(reward_id):
         log_security_event('claim_reward_error', str(e), 'error')
         return jsonify({'error': 'An error occurred while claiming reward'}), 500
 
+def _leaderboard_entries(ranking_type, ranked):
+    """
+    Formata linhas do ranking em memória, buscando os nomes com uma única consulta.
+    
+    Args:
+        ranking_type: Tipo de ranking (level, monsters, players)
+        ranked: Tuplas (posição, player_id, estatísticas) do LeaderboardEngine
+    """
+    player_ids = [player_id for _, player_id, _ in ranked]
+    names = dict(db.session.query(Player.id, Player.username).filter(Player.id.in_(player_ids)).all()) if player_ids else {}
+    primary, secondary = RANKING_TYPES[ranking_type]
+    
+    leaderboard = []
+    for rank, player_id, stats in ranked:
+        leaderboard.append({
+            'rank': rank,
+            'player_id': player_id,
+            'player_name': names.get(player_id),
+            'current_level': stats['current_level'],
+            'current_phase': stats['current_phase'],
+            'experience_points': stats['experience_points'],
+            'total_monsters_killed': stats['total_monsters_killed'],
+            'total_players_killed': stats['total_players_killed'],
+            'last_level_up': stats['last_level_up'].isoformat() if stats['last_level_up'] else None,
+            # Estatísticas específicas do tipo de ranking
+            'primary_stat': stats[primary],
+            'secondary_stat': stats[secondary]
+        })
+    
+    return leaderboard
+
 @level_bp.route('/leaderboard', methods=['GET'])
 def get_leaderboard():
     """Obtém o ranking dos jogadores por nível."""
     try:
         # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 50)
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), 50)
         
         # Tipo de ranking
         ranking_type = request.args.get('type', 'level')  # level, monsters, players
-        
-        if ranking_type == 'level':
-            # Ranking por nível e experiência
-            query = PlayerLevel.query.join(Player).order_by(
-                PlayerLevel.current_level.desc(),
-                PlayerLevel.experience_points.desc()
-            )
-        elif ranking_type == 'monsters':
-            # Ranking por monstros mortos
-            query = PlayerLevel.query.join(Player).order_by(
-                PlayerLevel.total_monsters_killed.desc()
-            )
-        elif ranking_type == 'players':
-            # Ranking por jogadores mortos
-            query = PlayerLevel.query.join(Player).order_by(
-                PlayerLevel.total_players_killed.desc()
-            )
-        else:
+        if ranking_type not in RANKING_TYPES:
             return jsonify({'error': 'Invalid ranking type'}), 400
         
-        # Paginar os resultados
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        player_levels = pagination.items
-        
-        # Formatar o leaderboard
-        leaderboard = []
-        for i, player_level in enumerate(player_levels, start=(page - 1) * per_page + 1):
-            player_data = {
-                'rank': i,
-                'player_id': player_level.player_id,
-                'player_name': player_level.player.username,
-                'current_level': player_level.current_level,
-                'current_phase': player_level.current_phase,
-                'experience_points': player_level.experience_points,
-                'total_monsters_killed': player_level.total_monsters_killed,
-                'total_players_killed': player_level.total_players_killed,
-                'last_level_up': player_level.last_level_up.isoformat() if player_level.last_level_up else None
-            }
-            
-            # Adicionar estatística específica baseada no tipo de ranking
-            if ranking_type == 'level':
-                player_data['primary_stat'] = player_level.current_level
-                player_data['secondary_stat'] = player_level.experience_points
-            elif ranking_type == 'monsters':
-                player_data['primary_stat'] = player_level.total_monsters_killed
-                player_data['secondary_stat'] = player_level.current_level
-            elif ranking_type == 'players':
-                player_data['primary_stat'] = player_level.total_players_killed
-                player_data['secondary_stat'] = player_level.current_level
-            
-            leaderboard.append(player_data)
+        # Página servida pelo ranking em memória (sem ORDER BY/OFFSET/COUNT no banco)
+        total_items = LeaderboardEngine.size(ranking_type)
+        total_pages = (total_items + per_page - 1) // per_page
+        ranked = LeaderboardEngine.page(ranking_type, (page - 1) * per_page, per_page)
         
         return jsonify({
-            'leaderboard': leaderboard,
+            'leaderboard': _leaderboard_entries(ranking_type, ranked),
             'ranking_type': ranking_type,
             'pagination': {
-                'total_items': pagination.total,
-                'total_pages': pagination.pages,
+                'total_items': total_items,
+                'total_pages': total_pages,
                 'current_page': page,
                 'per_page': per_page,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
+                'has_next': page < total_pages,
+                'has_prev': page > 1
             }
         })
     
@@ -333,16 +428,138 @@ def get_leaderboard():
         log_security_event('leaderboard_error', str(e), 'error')
         return jsonify({'error': 'An error occurred while retrieving leaderboard'}), 500
 
+@level_bp.route('/leaderboard/me', methods=['GET'])
+@token_required
+def get_my_rank():
+    """Obtém a posição do jogador autenticado no ranking."""
+    try:
+        # Buscar o jogador
+        player = current_player()
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
+        
+        ranking_type = request.args.get('type', 'level')  # level, monsters, players
+        if ranking_type not in RANKING_TYPES:
+            return jsonify({'error': 'Invalid ranking type'}), 400
+        
+        rank = LeaderboardEngine.rank_of(ranking_type, player.id)
+        stats = LeaderboardEngine.stats_of(player.id)
+        primary, secondary = RANKING_TYPES[ranking_type]
+        
+        return jsonify({
+            'player_id': player.id,
+            'player_name': player.username,
+            'ranking_type': ranking_type,
+            'rank': rank,
+            'total_ranked': LeaderboardEngine.size(ranking_type),
+            'primary_stat': stats[primary] if stats else None,
+            'secondary_stat': stats[secondary] if stats else None
+        })
+    
+    except Exception as e:
+        log_security_event('leaderboard_rank_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while retrieving leaderboard rank'}), 500
+
+@level_bp.route('/leaderboard/around', methods=['GET'])
+@token_required
+def get_leaderboard_around_me():
+    """Obtém os jogadores imediatamente acima e abaixo do jogador autenticado."""
+    try:
+        # Buscar o jogador
+        player = current_player()
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
+        
+        ranking_type = request.args.get('type', 'level')  # level, monsters, players
+        if ranking_type not in RANKING_TYPES:
+            return jsonify({'error': 'Invalid ranking type'}), 400
+        
+        # Quantidade de posições acima e abaixo do jogador
+        radius = min(max(request.args.get('radius', 5, type=int), 0), MAX_LEADERBOARD_RADIUS)
+        
+        ranked = LeaderboardEngine.around(ranking_type, player.id, radius)
+        
+        return jsonify({
+            'player_id': player.id,
+            'ranking_type': ranking_type,
+            'rank': LeaderboardEngine.rank_of(ranking_type, player.id),
+            'leaderboard': _leaderboard_entries(ranking_type, ranked)
+        })
+    
+    except Exception as e:
+        log_security_event('leaderboard_around_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while retrieving leaderboard'}), 500
+
+@level_bp.route('/leaderboard/windows/<window>', methods=['GET'])
+def get_windowed_leaderboard(window):
+    """Obtém o ranking diário, semanal ou da temporada a partir do último snapshot."""
+    try:
+        board = request.args.get('board', 'monsters')  # mining, monsters, players, experience
+        if window not in WINDOWS or board not in BOARDS:
+            return jsonify({'error': 'Invalid leaderboard window or board'}), 400
+        
+        # Parâmetros de paginação
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 10, type=int), 1), 50)
+        
+        snapshot = WindowedLeaderboards.latest(board, window)
+        if not snapshot:
+            return jsonify({'error': 'Leaderboard snapshot not available yet'}), 404
+        
+        total_pages = (snapshot.entry_count + per_page - 1) // per_page
+        
+        return jsonify({
+            'leaderboard': WindowedLeaderboards.page(snapshot, (page - 1) * per_page, per_page),
+            'snapshot': snapshot.to_dict(),
+            'pagination': {
+                'total_items': snapshot.entry_count,
+                'total_pages': total_pages,
+                'current_page': page,
+                'per_page': per_page,
+                'has_next': page < total_pages,
+                'has_prev': page > 1
+            }
+        })
+    
+    except Exception as e:
+        log_security_event('windowed_leaderboard_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while retrieving leaderboard'}), 500
+
+@level_bp.route('/leaderboard/windows/<window>/me', methods=['GET'])
+@token_required
+def get_my_windowed_rank(window):
+    """Obtém a posição do jogador autenticado no último snapshot de uma janela."""
+    try:
+        board = request.args.get('board', 'monsters')  # mining, monsters, players, experience
+        if window not in WINDOWS or board not in BOARDS:
+            return jsonify({'error': 'Invalid leaderboard window or board'}), 400
+        
+        # Buscar o jogador
+        player = current_player()
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
+        
+        snapshot = WindowedLeaderboards.latest(board, window)
+        if not snapshot:
+            return jsonify({'error': 'Leaderboard snapshot not available yet'}), 404
+        
+        return jsonify({
+            'player_id': player.id,
+            'entry': WindowedLeaderboards.entry_for(snapshot, player),
+            'snapshot': snapshot.to_dict()
+        })
+    
+    except Exception as e:
+        log_security_event('windowed_leaderboard_rank_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while retrieving leaderboard rank'}), 500
+
 @level_bp.route('/phase-progress', methods=['GET'])
 @token_required
 def get_phase_progress():
     """Obtém o progresso do jogador nas fases."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -369,11 +586,8 @@ def get_phase_progress():
 def advance_phase():
     """Avança o jogador para a próxima fase."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -432,7 +646,7 @@ def advance_phase():
         log_security_event('phase_advanced', 
                           f'Player {player.id} advanced from phase {old_phase} to {target_phase}', 
                           'info',
-                          user_id=user_id)
+                          user_id=player.user_id)
         
         return jsonify({
             'message': 'Phase advanced successfully',
@@ -28,22 +28,148 @@ app.register_blueprint(ad_status_bp, url_prefix="/api/ads")
 app.register_blueprint(level_bp, url_prefix="/api/level")
 app.register_blueprint(scenario_bp, url_prefix="/api/scenarios")
 app.register_blueprint(admin_bp, url_prefix="/api/admin")
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}")
+# Saldos em ponto fixo são somados e comparados por funções SQL registradas nas conexões SQLite
+# (utils.money); em outros bancos elas não existem e toda alteração de saldo falharia
+if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite:'):
+    raise RuntimeError('DATABASE_URL must be a SQLite URL: fixed-point balance arithmetic relies on SQLite functions')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Agendador de recompensas de mineração (ativar apenas com processo persistente; no deploy serverless
+# a thread fica congelada entre invocações e /status credita as recompensas sob demanda)
+app.config['MINING_SCHEDULER_ENABLED'] = os.environ.get('MINING_SCHEDULER_ENABLED', '0') == '1'
+app.config['MINING_TICK_SECONDS'] = float(os.environ.get('MINING_TICK_SECONDS', '5'))
+app.config['MINING_SCHEDULER_BATCH_SIZE'] = int(os.environ.get('MINING_SCHEDULER_BATCH_SIZE', '500'))
+# Stream SSE de mineração: cada conexão ocupa uma thread do worker enquanto aberta (usar workers
+# gevent/eventlet em produção); duração máxima por conexão e limite de conexões por processo
+app.config['MINING_STREAM_HEARTBEAT_SECONDS'] = int(os.environ.get('MINING_STREAM_HEARTBEAT_SECONDS', '15'))
+app.config['MINING_STREAM_MAX_SECONDS'] = int(os.environ.get('MINING_STREAM_MAX_SECONDS', '300'))
+app.config['MINING_STREAM_MAX_CONNECTIONS'] = int(os.environ.get('MINING_STREAM_MAX_CONNECTIONS', '200'))
+# Retenção de histórico de mineração (recompensas compactadas e sessões arquivadas)
+app.config['MINING_RETENTION_ENABLED'] = os.environ.get('MINING_RETENTION_ENABLED', '1') == '1'
+app.config['MINING_REWARD_RETENTION_DAYS'] = int(os.environ.get('MINING_REWARD_RETENTION_DAYS', '30'))
+app.config['MINING_SESSION_RETENTION_DAYS'] = int(os.environ.get('MINING_SESSION_RETENTION_DAYS', '30'))
+# Snapshots periódicos de saldo do livro-razão
+app.config['LEDGER_SNAPSHOTS_ENABLED'] = os.environ.get('LEDGER_SNAPSHOTS_ENABLED', '1') == '1'
+app.config['LEDGER_SNAPSHOT_INTERVAL_SECONDS'] = int(os.environ.get('LEDGER_SNAPSHOT_INTERVAL_SECONDS', '3600'))
+# Liquidação em lote da fila de saques (adaptador: caminho de importação de uma classe ChainAdapter;
+# utils.withdrawal_queue.LocalStubChainAdapter apenas em desenvolvimento e testes). Sem adaptador a
+# liquidação fica desligada por padrão e os saques aguardam em pending; ativá-la explicitamente sem
+# adaptador impede a inicialização
+app.config['WITHDRAWAL_CHAIN_ADAPTER'] = os.environ.get('WITHDRAWAL_CHAIN_ADAPTER')
+app.config['WITHDRAWAL_QUEUE_ENABLED'] = os.environ.get('WITHDRAWAL_QUEUE_ENABLED', '1' if app.config['WITHDRAWAL_CHAIN_ADAPTER'] else '0') == '1'
+app.config['WITHDRAWAL_SETTLE_SECONDS'] = float(os.environ.get('WITHDRAWAL_SETTLE_SECONDS', '10'))
+app.config['WITHDRAWAL_BATCH_SIZE'] = int(os.environ.get('WITHDRAWAL_BATCH_SIZE', '100'))
+# Cache write-behind dos contadores de Player (intervalo de gravação em segundos)
+app.config['COUNTER_CACHE_ENABLED'] = os.environ.get('COUNTER_CACHE_ENABLED', '1') == '1'
+app.config['COUNTER_FLUSH_INTERVAL_SECONDS'] = float(os.environ.get('COUNTER_FLUSH_INTERVAL_SECONDS', '0.25'))
+# Rankings de nível em memória (reconstrução periódica a partir do banco, em segundos)
+app.config['LEADERBOARD_ENGINE_ENABLED'] = os.environ.get('LEADERBOARD_ENGINE_ENABLED', '1') == '1'
+app.config['LEADERBOARD_REBUILD_SECONDS'] = int(os.environ.get('LEADERBOARD_REBUILD_SECONDS', '300'))
+# Snapshots dos rankings diário, semanal e da temporada (início da primeira temporada em ISO)
+app.config['LEADERBOARD_SNAPSHOTS_ENABLED'] = os.environ.get('LEADERBOARD_SNAPSHOTS_ENABLED', '1') == '1'
+app.config['LEADERBOARD_SNAPSHOT_SECONDS'] = int(os.environ.get('LEADERBOARD_SNAPSHOT_SECONDS', '300'))
+app.config['LEADERBOARD_SNAPSHOT_SIZE'] = int(os.environ.get('LEADERBOARD_SNAPSHOT_SIZE', '1000'))
+app.config['LEADERBOARD_SEASON_ANCHOR'] = os.environ.get('LEADERBOARD_SEASON_ANCHOR', '2025-01-01')
+app.config['LEADERBOARD_SEASON_DAYS'] = int(os.environ.get('LEADERBOARD_SEASON_DAYS', '91'))
+# Contagem de consultas SQL por requisição (cabeçalhos X-Query-* sempre em modo debug, ou se habilitados)
+app.config['QUERY_PROFILER_ENABLED'] = os.environ.get('QUERY_PROFILER_ENABLED', '1') == '1'
+app.config['QUERY_PROFILER_HEADERS'] = os.environ.get('QUERY_PROFILER_HEADERS', '0') == '1'
+app.config['QUERY_N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('QUERY_N_PLUS_ONE_THRESHOLD', '10'))
+# Cache em processo da identidade autenticada (usuário + jogador) por token
+app.config['AUTH_PRINCIPAL_TTL_SECONDS'] = int(os.environ.get('AUTH_PRINCIPAL_TTL_SECONDS', '30'))
+app.config['AUTH_PRINCIPAL_CACHE_SIZE'] = int(os.environ.get('AUTH_PRINCIPAL_CACHE_SIZE', '10000'))
+# Estado da detecção de fraudes: memory (por processo), sqlite ou redis (compartilhado entre workers)
+app.config['FRAUD_STATE_BACKEND'] = os.environ.get('FRAUD_STATE_BACKEND', 'memory')
+app.config['FRAUD_STATE_REDIS_URL'] = os.environ.get('FRAUD_STATE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+app.config['FRAUD_STATE_TTL_SECONDS'] = int(os.environ.get('FRAUD_STATE_TTL_SECONDS', '0')) or None
+app.config['FRAUD_STATE_FLUSH_SECONDS'] = float(os.environ.get('FRAUD_STATE_FLUSH_SECONDS', '1'))
+app.config['FRAUD_STATE_CACHE_SECONDS'] = float(os.environ.get('FRAUD_STATE_CACHE_SECONDS', '2'))
+app.config['FRAUD_STATE_CACHE_SIZE'] = int(os.environ.get('FRAUD_STATE_CACHE_SIZE', '10000'))
+# Análise de fraude fora da requisição (workers, fila limitada e amostragem em sobrecarga)
+app.config['FRAUD_PIPELINE_ENABLED'] = os.environ.get('FRAUD_PIPELINE_ENABLED', '1') == '1'
+app.config['FRAUD_PIPELINE_WORKERS'] = int(os.environ.get('FRAUD_PIPELINE_WORKERS', '2'))
+app.config['FRAUD_PIPELINE_QUEUE_SIZE'] = int(os.environ.get('FRAUD_PIPELINE_QUEUE_SIZE', '10000'))
+app.config['FRAUD_PIPELINE_BATCH_SIZE'] = int(os.environ.get('FRAUD_PIPELINE_BATCH_SIZE', '200'))
+app.config['FRAUD_PIPELINE_SAMPLE_THRESHOLD'] = float(os.environ.get('FRAUD_PIPELINE_SAMPLE_THRESHOLD', '0.8'))
+app.config['FRAUD_PIPELINE_SAMPLE_RATE'] = int(os.environ.get('FRAUD_PIPELINE_SAMPLE_RATE', '10'))
+# Gravação em lote dos alertas de fraude na tabela fraud_alerts
+app.config['FRAUD_ALERT_FLUSH_SECONDS'] = float(os.environ.get('FRAUD_ALERT_FLUSH_SECONDS', '1'))
+app.config['FRAUD_ALERT_MAX_PENDING'] = int(os.environ.get('FRAUD_ALERT_MAX_PENDING', '10000'))
+# Cache das pontuações de risco de fraude (TTL em segundos)
+app.config['FRAUD_RISK_SCORE_TTL_SECONDS'] = int(os.environ.get('FRAUD_RISK_SCORE_TTL_SECONDS', '60'))
+app.config['FRAUD_RISK_SCORE_CACHE_SIZE'] = int(os.environ.get('FRAUD_RISK_SCORE_CACHE_SIZE', '100000'))
+# Bloqueio de anúncios e mineração acima de HIGH_RISK_SCORE (desligado: apenas registra até a pontuação ser calibrada)
+app.config['FRAUD_RISK_SCORE_ENFORCE'] = os.environ.get('FRAUD_RISK_SCORE_ENFORCE', '0') == '1'
 db.init_app(app)
 
 # Importar todos os modelos para garantir que sejam registrados
 from models.user import User
 from models.player import Player
-from models.security_log import SecurityLog, FraudAlert, LoginAttempt, BlockedIP
+from models.security_log import SecurityLog, FraudAlert, FraudPlayerState, LoginAttempt, BlockedIP
 from models.mining import MiningSession, MiningReward, MiningStatistics
+from models.mining_leaderboard import MiningLeaderboardEntry
+from models.mining_rollup import MiningRollup
+from models.mining_archive import MiningRewardSummary, MiningSessionArchive
+from models.ledger_entry import LedgerEntry, BalanceSnapshot
+from models.withdrawal import WithdrawalRequest
+from models.leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshotEntry, LeaderboardBaseline, LeaderboardSnapshotRun
 from models.adsense import AdSenseConfig, AdUnit, AdDisplay, AdRevenue
 from models.item import Item, InventoryItem, ShopItem, CollectibleCard, PlayerCollectibleCard, ItemDrop
 from models.level import PlayerLevel, LevelReward, PhaseProgress
 from models.scenario import Scenario, Monster, ScenarioReward, PlayerScenarioProgress
+from utils.schema import apply_schema_updates
+from utils.mining_scheduler import MiningScheduler
+from utils.mining_retention import MiningRetention
+from utils.ledger import Ledger
+from utils.withdrawal_queue import WithdrawalQueue
+from utils.counter_cache import CounterCache
+from utils.ranking import LeaderboardEngine
+from utils.leaderboard_windows import WindowedLeaderboards
+from utils.query_profiler import QueryProfiler
+from utils.principal import PrincipalCache
+from utils.fraud_state import FraudStateStore
+from utils.fraud_pipeline import FraudPipeline
+from utils.fraud_alerts import FraudAlertStore
+from utils.risk_score import RiskScoreService
+
+if app.config['QUERY_PROFILER_ENABLED']:
+    QueryProfiler.init_app(app)
+
+PrincipalCache.configure(app)
+RiskScoreService.configure(app)
 
 with app.app_context():
     db.create_all()
+    apply_schema_updates()
+
+if app.config['MINING_SCHEDULER_ENABLED']:
+    MiningScheduler.start(app)
+
+if app.config['MINING_RETENTION_ENABLED']:
+    MiningRetention.start(app)
+
+if app.config['LEDGER_SNAPSHOTS_ENABLED']:
+    Ledger.start(app)
+
+if app.config['WITHDRAWAL_QUEUE_ENABLED']:
+    WithdrawalQueue.start(app)
+elif not app.config['WITHDRAWAL_CHAIN_ADAPTER']:
+    app.logger.warning('Withdrawal settlement disabled: WITHDRAWAL_CHAIN_ADAPTER is not configured')
+
+if app.config['COUNTER_CACHE_ENABLED']:
+    CounterCache.start(app)
+
+if app.config['LEADERBOARD_ENGINE_ENABLED']:
+    LeaderboardEngine.start(app)
+
+if app.config['LEADERBOARD_SNAPSHOTS_ENABLED']:
+    WindowedLeaderboards.start(app)
+
+FraudStateStore.start(app)
+FraudAlertStore.start(app)
+
+if app.config['FRAUD_PIPELINE_ENABLED']:
+    FraudPipeline.start(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
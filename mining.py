@@ -1,14 +1,53 @@
-from flask import Blueprint, request, jsonify, current_app
+import queue
+import time
+from flask import Blueprint, Response, request, jsonify, current_app
 from datetime import datetime, timedelta
 from decimal import Decimal
+from sqlalchemy.exc import IntegrityError
 from models.user import db
 from models.player import Player
 from models.mining import MiningSession, MiningReward, MiningStatistics
-from utils.security import token_required, rate_limit, log_security_event
-from utils.fraud_detection import FraudDetector
+from models.mining_leaderboard import MiningLeaderboardEntry
+from models.mining_rollup import MiningRollup
+from utils.principal import current_player
+from utils.ranking import MiningRanking
+from utils.security import token_required, rate_limit, log_security_event, verify_token, generate_scoped_token, verify_scoped_token
+from utils.fraud_detection import FraudDetector, HIGH_RISK_SCORE
+from utils.risk_score import RiskScoreService
+from utils.mining_accrual import MiningAccrual
+from utils.mining_events import MiningEventHub, format_sse
+from utils.pagination import keyset_page, parse_cursor, parse_bool_arg
+from utils.schema import register_index, register_migration
+from utils.money import from_units
 
 mining_bp = Blueprint('mining', __name__)
 
+# Índices compostos usados pela paginação por cursor do histórico
+register_index(db.Index('ix_mining_sessions_player_start', MiningSession.__table__.c.player_id, MiningSession.__table__.c.start_time))
+register_index(db.Index('ix_mining_rewards_player_timestamp', MiningReward.__table__.c.player_id, MiningReward.__table__.c.timestamp))
+# No máximo uma sessão ativa por jogador (índice único parcial)
+register_index(db.Index(
+    'ux_mining_sessions_one_active',
+    MiningSession.__table__.c.player_id,
+    unique=True,
+    sqlite_where=MiningSession.__table__.c.is_active == True
+))
+
+def _is_active_session_conflict(error):
+    """Indica se a violação de integridade veio do índice ux_mining_sessions_one_active."""
+    # O SQLite informa as colunas do índice único (ou o nome do índice, em outros bancos)
+    message = str(error.orig)
+    return 'ux_mining_sessions_one_active' in message or 'mining_sessions.player_id' in message
+
+@register_migration
+def close_duplicate_active_sessions():
+    """Encerra sessões ativas duplicadas (mantendo a mais recente) antes de criar o índice único."""
+    db.session.execute(db.text(
+        'UPDATE mining_sessions SET is_active = 0, end_time = CURRENT_TIMESTAMP '
+        'WHERE is_active = 1 AND id NOT IN ('
+        'SELECT MAX(id) FROM mining_sessions WHERE is_active = 1 GROUP BY player_id)'
+    ))
+
 @mining_bp.route('/start', methods=['POST'])
 @token_required
 @rate_limit(max_requests=5, window_seconds=60)
@@ -19,19 +58,23 @@ def start_mining():
         user_id = request.token_payload.get('user_id')
         
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
-        # Verificar se o jogador já tem uma sessão de mineração ativa
-        active_session = MiningSession.query.filter_by(player_id=player.id, is_active=True).first()
-        if active_session:
-            return jsonify({
-                'error': 'Player already has an active mining session',
-                'session': active_session.to_dict()
-            }), 400
+        # Pontuação de risco alta é registrada (consulta O(1) em cache); só bloqueia com
+        # FRAUD_RISK_SCORE_ENFORCE, pois a pontuação ainda não decai com o tempo
+        fraud_score = FraudDetector.calculate_fraud_score(player.id)
+        if fraud_score > HIGH_RISK_SCORE:
+            log_security_event('mining_high_fraud_score',
+                              f'Player {player.id} started mining with risk score {fraud_score}',
+                              'warning',
+                              user_id=user_id)
+            if RiskScoreService.enforce:
+                return jsonify({'error': 'Mining is temporarily unavailable for this account'}), 403
         
-        # Criar uma nova sessão de mineração
+        # Criar uma nova sessão de mineração; o índice único parcial garante
+        # no máximo uma sessão ativa por jogador, sem leitura prévia
         now = datetime.utcnow()
         new_session = MiningSession(
             player_id=player.id,
@@ -40,8 +83,20 @@ def start_mining():
             current_rate="0.00000000000000000000000000000000001"  # Taxa inicial de mineração
         )
         
-        db.session.add(new_session)
-        db.session.commit()
+        try:
+            db.session.add(new_session)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not _is_active_session_conflict(e):
+                raise
+            active_session = MiningSession.query.filter_by(player_id=player.id, is_active=True).first()
+            return jsonify({
+                'error': 'Player already has an active mining session',
+                'session': active_session.to_dict() if active_session else None
+            }), 400
+        
+        MiningEventHub.publish(player.id, 'session_started', {'session': new_session.to_dict()})
         
         # Registrar a ação para detecção de fraudes
         FraudDetector.record_player_action(player.id, 'start_mining', {
@@ -71,7 +126,7 @@ def get_mining_status():
         user_id = request.token_payload.get('user_id')
         
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -84,29 +139,24 @@ def get_mining_status():
                 'message': 'No active mining session'
             })
         
-        # Verificar se é hora de gerar uma recompensa
-        reward = active_session.process_mining_reward()
+        # Sempre pagar sob demanda os intervalos vencidos desde a última consulta: o agendador
+        # pode não estar rodando (ou estar congelado, no serverless) e claim_intervals garante
+        # que um intervalo já pago por ele não é pago de novo
+        reward, intervals = MiningAccrual.catch_up(active_session, player)
         
-        # Se uma recompensa foi gerada, atualizar o saldo do jogador
         if reward:
-            # Converter a recompensa de string para Decimal
-            reward_amount = Decimal(reward.amount)
-            
-            # Converter o saldo atual do jogador de string para Decimal
-            current_balance = Decimal(player.wallet_balance)
-            
-            # Adicionar a recompensa ao saldo
-            new_balance = current_balance + reward_amount
-            
-            # Atualizar o saldo do jogador
-            player.wallet_balance = str(new_balance)
+            db.session.flush()
+            event = MiningAccrual.reward_event(player, active_session, reward)
             db.session.commit()
             
+            MiningEventHub.publish(player.id, 'reward', event)
+            
             # Registrar a ação para detecção de fraudes
             FraudDetector.record_player_action(player.id, 'earn_coins', {
                 'amount': reward.amount,
                 'source': 'mining',
-                'session_id': active_session.id
+                'session_id': active_session.id,
+                'intervals': intervals
             })
             
             log_security_event('mining_reward_generated', 
@@ -114,6 +164,10 @@ def get_mining_status():
                               'info',
                               user_id=user_id)
         
+        if reward is None:
+            # Última recompensa já creditada (pelo agendador ou por outra requisição)
+            reward = MiningReward.query.filter_by(session_id=active_session.id).order_by(MiningReward.id.desc()).first()
+        
         # Obter as estatísticas de mineração do jogador
         mining_stats = MiningStatistics.query.filter_by(player_id=player.id).first()
         
@@ -147,7 +201,7 @@ def stop_mining():
         user_id = request.token_payload.get('user_id')
         
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -159,25 +213,25 @@ def stop_mining():
                 'error': 'No active mining session to stop'
             }), 400
         
-        # Verificar se há uma recompensa final para processar
-        reward = active_session.process_mining_reward()
-        
-        # Se uma recompensa foi gerada, atualizar o saldo do jogador
-        if reward:
-            # Converter a recompensa de string para Decimal
-            reward_amount = Decimal(reward.amount)
-            
-            # Converter o saldo atual do jogador de string para Decimal
-            current_balance = Decimal(player.wallet_balance)
-            
-            # Adicionar a recompensa ao saldo
-            new_balance = current_balance + reward_amount
-            
-            # Atualizar o saldo do jogador
-            player.wallet_balance = str(new_balance)
-            db.session.commit()
+        # Pagar todos os intervalos vencidos antes de encerrar a sessão
+        # (intervalos já reivindicados pelo agendador não são pagos de novo)
+        reward, intervals = MiningAccrual.catch_up(active_session, player)
+        
+        # Encerrar a sessão apenas uma vez, mesmo com /stop concorrentes
+        sessions_table = MiningSession.__table__
+        closed = db.session.execute(
+            sessions_table.update().where(
+                sessions_table.c.id == active_session.id,
+                sessions_table.c.is_active == True
+            ).values(is_active=False)
+        ).rowcount == 1
+        
+        if not closed:
+            db.session.rollback()
+            return jsonify({
+                'error': 'No active mining session to stop'
+            }), 400
         
-        # Encerrar a sessão
         active_session.end_session()
         
         # Atualizar as estatísticas de mineração
@@ -192,6 +246,16 @@ def stop_mining():
         # Atualizar as estatísticas com base na sessão encerrada
         mining_stats.update_stats_from_session(active_session)
         
+        # Manter a chave numérica do ranking sincronizada com o total minerado
+        MiningLeaderboardEntry.sync(player.id, mining_stats.total_mined_lifetime)
+        db.session.commit()
+        
+        MiningEventHub.publish(player.id, 'session_stopped', {
+            'session': active_session.to_dict(),
+            'mining_stats': mining_stats.to_dict(),
+            'player_balance': player.wallet_balance
+        })
+        
         # Registrar a ação para detecção de fraudes
         FraudDetector.record_player_action(player.id, 'stop_mining', {
             'session_id': active_session.id,
@@ -215,36 +279,148 @@ def stop_mining():
         log_security_event('mining_stop_error', str(e), 'error')
         return jsonify({'error': 'An error occurred while stopping the mining session'}), 500
 
-@mining_bp.route('/history', methods=['GET'])
+# Escopo e validade do token usado na URL do stream SSE
+STREAM_TOKEN_SCOPE = 'mining_stream'
+STREAM_TOKEN_SECONDS = 60
+
+@mining_bp.route('/stream-token', methods=['POST'])
 @token_required
-def get_mining_history():
-    """Obtém o histórico de mineração do jogador."""
+@rate_limit(max_requests=10, window_seconds=60)
+def create_stream_token():
+    """
+    Emite um token de curta duração, válido apenas para abrir o stream de mineração.
+    
+    EventSource não permite headers, então o cliente passa este token em
+    ?stream_token= em vez do token principal (que ficaria em logs de acesso).
+    """
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
+        token = generate_scoped_token(request.token_payload['user_id'], STREAM_TOKEN_SCOPE, STREAM_TOKEN_SECONDS)
+        return jsonify({
+            'stream_token': token,
+            'expires_in': STREAM_TOKEN_SECONDS
+        })
+    except Exception as e:
+        log_security_event('mining_stream_token_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while creating the stream token'}), 500
+
+@mining_bp.route('/stream', methods=['GET'])
+def stream_mining_events():
+    """
+    Stream SSE com as atualizações da sessão de mineração do jogador.
+    
+    Envia um evento 'snapshot' na conexão e depois apenas eventos 'reward',
+    'session_started' e 'session_stopped' quando algo muda. Autenticação pelo
+    header Authorization ou, para EventSource, por ?stream_token= obtido em
+    POST /stream-token (o token principal não é aceito na URL).
+    
+    Cada conexão ocupa uma thread do servidor enquanto estiver aberta: com workers
+    síncronos, servir esta rota por workers gevent/eventlet (ex.: gunicorn -k gevent).
+    A conexão é encerrada com um evento 'reconnect' após MINING_STREAM_MAX_SECONDS,
+    e com MINING_STREAM_MAX_CONNECTIONS conexões abertas no processo novas conexões
+    recebem 503; nos dois casos o cliente obtém um novo stream token ou volta a
+    consultar /status.
+    """
+    try:
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            payload = verify_token(auth_header.split(' ')[1])
+        elif request.args.get('stream_token'):
+            payload = verify_scoped_token(request.args['stream_token'], STREAM_TOKEN_SCOPE)
+        else:
+            return jsonify({'error': 'Token is missing'}), 401
         
-        # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 50)  # Limitar a 50 por página
+        if not payload:
+            return jsonify({'error': 'Token is invalid or expired'}), 401
         
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        request.token_payload = payload
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
-        # Buscar as sessões de mineração do jogador (ordenadas por data, mais recentes primeiro)
-        sessions_query = MiningSession.query.filter_by(player_id=player.id).order_by(MiningSession.start_time.desc())
+        # Estado inicial montado uma única vez; depois disso a conexão não consulta o banco
+        active_session = MiningSession.query.filter_by(player_id=player.id, is_active=True).first()
+        snapshot = {
+            'mining_active': active_session is not None,
+            'session': active_session.to_dict() if active_session else None,
+            'player_balance': player.wallet_balance
+        }
+        player_id = player.id
+        heartbeat_seconds = current_app.config.get('MINING_STREAM_HEARTBEAT_SECONDS', 15)
+        max_seconds = current_app.config.get('MINING_STREAM_MAX_SECONDS', 300)
+        
+        events = MiningEventHub.subscribe(player_id, current_app.config.get('MINING_STREAM_MAX_CONNECTIONS', 200))
+        db.session.remove()
+        if events is None:
+            response = jsonify({'error': 'Too many open streams, poll /api/mining/status instead'})
+            response.headers['Retry-After'] = str(heartbeat_seconds)
+            return response, 503
+        
+        def generate():
+            try:
+                yield format_sse('snapshot', snapshot)
+                # Conexão com duração limitada para não prender o worker indefinidamente
+                deadline = time.monotonic() + max_seconds
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        yield format_sse('reconnect', {'reason': 'max_lifetime'})
+                        return
+                    try:
+                        event, data = events.get(timeout=min(heartbeat_seconds, remaining))
+                    except queue.Empty:
+                        # Comentário SSE mantém a conexão aberta em proxies
+                        yield ': keep-alive\n\n'
+                        continue
+                    yield format_sse(event, data)
+            finally:
+                MiningEventHub.unsubscribe(player_id, events)
+        
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    
+    except Exception as e:
+        log_security_event('mining_stream_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while opening the mining stream'}), 500
+
+@mining_bp.route('/history', methods=['GET'])
+@token_required
+def get_mining_history():
+    """
+    Obtém o histórico de mineração do jogador.
+    
+    Paginação por cursor: ?after=<timestamp,id> (ou sessions_after / rewards_after para
+    cada lista). O total de itens só é calculado com ?include_total=1.
+    """
+    try:
+        # Parâmetros de paginação
+        per_page = max(1, min(request.args.get('per_page', 10, type=int), 50))  # Entre 1 e 50 por página
+        include_total = parse_bool_arg(request.args.get('include_total'))
+        
+        try:
+            after = request.args.get('after')
+            sessions_after = parse_cursor(request.args.get('sessions_after', after))
+            rewards_after = parse_cursor(request.args.get('rewards_after', after))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
         
-        # Paginar os resultados
-        sessions_pagination = sessions_query.paginate(page=page, per_page=per_page, error_out=False)
-        sessions = sessions_pagination.items
+        # Buscar o jogador
+        player = current_player()
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
         
-        # Buscar as recompensas de mineração do jogador (ordenadas por data, mais recentes primeiro)
-        rewards_query = MiningReward.query.filter_by(player_id=player.id).order_by(MiningReward.timestamp.desc())
+        # Sessões e recompensas, mais recentes primeiro, usando os índices (player_id, data)
+        sessions_query = MiningSession.query.filter_by(player_id=player.id)
+        sessions, sessions_next = keyset_page(
+            sessions_query, MiningSession.start_time, MiningSession.id, sessions_after, per_page
+        )
         
-        # Paginar os resultados
-        rewards_pagination = rewards_query.paginate(page=page, per_page=per_page, error_out=False)
-        rewards = rewards_pagination.items
+        rewards_query = MiningReward.query.filter_by(player_id=player.id)
+        rewards, rewards_next = keyset_page(
+            rewards_query, MiningReward.timestamp, MiningReward.id, rewards_after, per_page
+        )
         
         # Buscar as estatísticas de mineração do jogador
         mining_stats = MiningStatistics.query.filter_by(player_id=player.id).first()
@@ -255,30 +431,35 @@ def get_mining_history():
             db.session.add(mining_stats)
             db.session.commit()
         
+        sessions_pagination = {
+            'per_page': per_page,
+            'has_next': sessions_next is not None,
+            'next_cursor': sessions_next
+        }
+        rewards_pagination = {
+            'per_page': per_page,
+            'has_next': rewards_next is not None,
+            'next_cursor': rewards_next
+        }
+        
+        if include_total:
+            sessions_pagination['total_items'] = sessions_query.count()
+            rewards_pagination['total_items'] = rewards_query.count()
+        
+        # Totais diários lidos dos agregados, sem varrer mining_rewards
+        daily_totals = MiningRollup.recent(player.id, 'day', limit=7)
+        
         # Formatar a resposta
         response = {
             'mining_stats': mining_stats.to_dict(),
+            'daily_totals': [rollup.to_dict() for rollup in daily_totals],
             'sessions': {
                 'items': [session.to_dict() for session in sessions],
-                'pagination': {
-                    'total_items': sessions_pagination.total,
-                    'total_pages': sessions_pagination.pages,
-                    'current_page': page,
-                    'per_page': per_page,
-                    'has_next': sessions_pagination.has_next,
-                    'has_prev': sessions_pagination.has_prev
-                }
+                'pagination': sessions_pagination
             },
             'rewards': {
                 'items': [reward.to_dict() for reward in rewards],
-                'pagination': {
-                    'total_items': rewards_pagination.total,
-                    'total_pages': rewards_pagination.pages,
-                    'current_page': page,
-                    'per_page': per_page,
-                    'has_next': rewards_pagination.has_next,
-                    'has_prev': rewards_pagination.has_prev
-                }
+                'pagination': rewards_pagination
             }
         }
         
@@ -288,51 +469,117 @@ def get_mining_history():
         log_security_event('mining_history_error', str(e), 'error')
         return jsonify({'error': 'An error occurred while retrieving mining history'}), 500
 
+@mining_bp.route('/stats', methods=['GET'])
+@token_required
+def get_mining_stats():
+    """Obtém os totais de mineração do jogador por hora ou por dia, a partir dos agregados."""
+    try:
+        period = request.args.get('period', 'day')
+        limit = max(1, min(request.args.get('limit', 24 if period == 'hour' else 30, type=int), 168))
+        
+        if period not in MiningRollup.PERIODS:
+            return jsonify({'error': 'Invalid period'}), 400
+        
+        # Buscar o jogador
+        player = current_player()
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
+        
+        buckets = MiningRollup.recent(player.id, period, limit=limit)
+        totals = MiningRollup.totals(player.id)
+        
+        return jsonify({
+            'period': period,
+            'buckets': [rollup.to_dict() for rollup in buckets],
+            'totals': {
+                'amount_mined': from_units(totals['amount_mined_units']),
+                'reward_count': totals['reward_count'],
+                'active_seconds': totals['active_seconds']
+            }
+        })
+    
+    except Exception as e:
+        log_security_event('mining_stats_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while retrieving mining stats'}), 500
+
 @mining_bp.route('/leaderboard', methods=['GET'])
 def get_mining_leaderboard():
-    """Obtém o ranking dos jogadores com mais Dooficoin minerado."""
+    """
+    Obtém o ranking dos jogadores com mais Dooficoin minerado.
+    
+    Paginação por cursor: ?after=<next_cursor da página anterior>, sem OFFSET nem COUNT.
+    """
     try:
-        # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 10, type=int), 50)  # Limitar a 50 por página
-        
-        # Buscar as estatísticas de mineração ordenadas por total minerado (decrescente)
-        stats_query = MiningStatistics.query.order_by(MiningStatistics.total_mined_lifetime.desc())
+        per_page = max(1, min(request.args.get('per_page', 10, type=int), 50))  # Entre 1 e 50 por página
+        
+        try:
+            after = parse_cursor(request.args.get('after'), parse_value=int)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        
+        # Uma única consulta com jogador e estatísticas, ordenada pelo índice numérico de ranking
+        query = db.session.query(
+            MiningLeaderboardEntry.player_id,
+            MiningLeaderboardEntry.total_mined_units,
+            Player.username,
+            MiningStatistics.current_mining_level,
+            MiningStatistics.total_sessions
+        ).join(
+            Player, Player.id == MiningLeaderboardEntry.player_id
+        ).outerjoin(
+            MiningStatistics, MiningStatistics.player_id == MiningLeaderboardEntry.player_id
+        )
+        rows, next_cursor = keyset_page(
+            query, MiningLeaderboardEntry.total_mined_units, MiningLeaderboardEntry.player_id, after, per_page
+        )
         
-        # Paginar os resultados
-        pagination = stats_query.paginate(page=page, per_page=per_page, error_out=False)
-        stats = pagination.items
+        # As posições da página são consecutivas a partir da do primeiro jogador
+        first_rank = MiningRanking.rank_of(rows[0].player_id) if rows else None
         
-        # Formatar a resposta
         leaderboard = []
-        for i, stat in enumerate(stats, start=(page - 1) * per_page + 1):
-            # Buscar o jogador
-            player = Player.query.get(stat.player_id)
-            if player:
-                leaderboard.append({
-                    'rank': i,
-                    'player_id': stat.player_id,
-                    'player_name': player.username,
-                    'total_mined': stat.total_mined_lifetime,
-                    'mining_level': stat.current_mining_level,
-                    'total_sessions': stat.total_sessions
-                })
+        for i, row in enumerate(rows):
+            leaderboard.append({
+                'rank': first_rank + i if first_rank else None,
+                'player_id': row.player_id,
+                'player_name': row.username,
+                'total_mined': from_units(row.total_mined_units),
+                'mining_level': row.current_mining_level or 1,
+                'total_sessions': row.total_sessions or 0
+            })
         
-        response = {
+        return jsonify({
             'leaderboard': leaderboard,
             'pagination': {
-                'total_items': pagination.total,
-                'total_pages': pagination.pages,
-                'current_page': page,
                 'per_page': per_page,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
+                'has_next': next_cursor is not None,
+                'next_cursor': next_cursor
             }
-        }
-        
-        return jsonify(response)
+        })
     
     except Exception as e:
         log_security_event('mining_leaderboard_error', str(e), 'error')
         return jsonify({'error': 'An error occurred while retrieving mining leaderboard'}), 500
 
+@mining_bp.route('/leaderboard/me', methods=['GET'])
+@token_required
+def get_my_mining_rank():
+    """Obtém a posição do jogador autenticado no ranking de mineração."""
+    try:
+        # Buscar o jogador
+        player = current_player()
+        if not player:
+            return jsonify({'error': 'Player not found'}), 404
+        
+        # Posição lida do ranking em memória (O(log n)), total da chave de ranking
+        entry = db.session.get(MiningLeaderboardEntry, player.id)
+        
+        return jsonify({
+            'player_id': player.id,
+            'player_name': player.username,
+            'rank': MiningRanking.rank_of(player.id) if entry else None,
+            'total_mined': from_units(entry.total_mined_units) if entry else '0'
+        })
+    
+    except Exception as e:
+        log_security_event('mining_rank_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while retrieving mining rank'}), 500
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm.attributes import set_committed_value
+from models.mining import MiningSession, MiningReward
+from models.mining_leaderboard import MiningLeaderboardEntry
+from models.mining_rollup import MiningRollup
+from models.user import db
+from utils.money import from_units, to_units
+
+# Intervalo padrão entre recompensas quando a sessão não define um
+DEFAULT_INTERVAL_SECONDS = 600
+
+
+class MiningAccrual:
+    """Cálculo em forma fechada das recompensas acumuladas por uma sessão de mineração."""
+
+    @staticmethod
+    def missed_intervals(session, now=None):
+        """
+        Calcula quantos intervalos de recompensa venceram e ainda não foram pagos.
+
+        A grade de recompensas é ancorada em start_time: a k-ésima recompensa vence em
+        start_time + k * mining_interval_seconds. O cálculo é O(1), independente do
+        tempo em que o jogador ficou desconectado.
+
+        Args:
+            session: MiningSession ativa
+            now: Instante de referência (padrão: datetime.utcnow())
+
+        Returns:
+            tuple: (intervalos não pagos, próximo next_reward_time)
+        """
+        now = now or datetime.utcnow()
+        interval = session.mining_interval_seconds or DEFAULT_INTERVAL_SECONDS
+
+        if now < session.next_reward_time:
+            return 0, session.next_reward_time
+
+        # Intervalos completos desde o início da sessão
+        due_total = int((now - session.start_time).total_seconds() // interval)
+        # Intervalos já pagos: o próximo vencimento é o intervalo (pagos + 1)
+        already_paid = int((session.next_reward_time - session.start_time).total_seconds() // interval) - 1
+
+        missed = max(1, due_total - already_paid)
+        next_reward_time = session.start_time + timedelta(seconds=(already_paid + missed + 1) * interval)
+
+        return missed, next_reward_time
+
+    @staticmethod
+    def catch_up(session, player, now=None):
+        """
+        Credita de uma só vez todas as recompensas vencidas de uma sessão.
+
+        Gera uma única MiningReward agregada, atualiza o total minerado da sessão, a
+        chave de ranking e o saldo do jogador. Não faz commit: o chamador confirma tudo em uma única transação.
+
+        Os intervalos são reivindicados antes do crédito com um UPDATE condicional em
+        next_reward_time; se outro processo (agendador, /status ou /stop) já os pagou,
+        nada é creditado e a sessão é recarregada do banco.
+
+        Args:
+            session: MiningSession ativa
+            player: Jogador dono da sessão
+            now: Instante de referência (padrão: datetime.utcnow())
+
+        Returns:
+            tuple: (MiningReward agregada ou None, quantidade de intervalos pagos)
+        """
+        now = now or datetime.utcnow()
+        missed, next_reward_time = MiningAccrual.missed_intervals(session, now)
+
+        if missed == 0:
+            return None, 0
+        # Vencimento do primeiro intervalo pago (antes de claim_intervals avançá-lo)
+        first_due = session.next_reward_time
+
+        # Aritmética exata em unidades de ponto fixo
+        amount = to_units(session.current_rate) * missed
+        total_mined = from_units(to_units(session.total_mined) + amount)
+
+        if not MiningAccrual.claim_intervals(session, next_reward_time, total_mined):
+            return None, 0
+
+        reward = MiningReward(
+            session_id=session.id,
+            player_id=player.id,
+            amount=from_units(amount),
+            timestamp=now
+        )
+        db.session.add(reward)
+
+        # Atualizar os agregados horários/diários na mesma transação, cada intervalo no seu balde
+        MiningRollup.record_intervals(
+            player.id,
+            to_units(session.current_rate),
+            first_due,
+            session.mining_interval_seconds or DEFAULT_INTERVAL_SECONDS,
+            missed,
+            now
+        )
+
+        # Jogadores minerando sobem no ranking a cada pagamento, não só ao fim da sessão
+        MiningLeaderboardEntry.add(player.id, amount)
+
+        MiningAccrual.credit_reward(player, reward)
+
+        return reward, missed
+
+    @staticmethod
+    def claim_intervals(session, next_reward_time, total_mined):
+        """
+        Avança next_reward_time apenas se ainda for o valor lido (sem commit).
+
+        Returns:
+            bool: True se os intervalos foram reivindicados por esta transação
+        """
+        table = MiningSession.__table__
+        result = db.session.execute(
+            table.update().where(
+                table.c.id == session.id,
+                table.c.is_active == True,
+                table.c.next_reward_time == session.next_reward_time
+            ).values(next_reward_time=next_reward_time, total_mined=total_mined)
+        )
+
+        if result.rowcount != 1:
+            # Outro processo pagou (ou encerrou) a sessão: usar o estado atual do banco
+            db.session.refresh(session)
+            return False
+
+        set_committed_value(session, 'next_reward_time', next_reward_time)
+        set_committed_value(session, 'total_mined', total_mined)
+        return True
+
+    @staticmethod
+    def credit_reward(player, reward):
+        """
+        Adiciona uma recompensa de mineração ao saldo do jogador (sem commit).
+
+        Args:
+            player: Jogador que receberá a recompensa
+            reward: MiningReward a ser creditada
+        """
+        player.add_coins(reward.amount, reason='mining', reference=f'mining_session:{reward.session_id}')
+
+    @staticmethod
+    def reward_event(player, session, reward):
+        """Monta os dados do evento 'reward' enviado pelo stream de mineração."""
+        return {
+            'session': session.to_dict(),
+            'reward': reward.to_dict(),
+            'player_balance': player.wallet_balance
+        }
@@ -0,0 +1,71 @@
+from database import db
+from datetime import datetime
+from utils.money import FixedPoint, from_units
+
+class MiningRewardSummary(db.Model):
+    """Resumo por sessão das recompensas de mineração compactadas pela rotina de retenção."""
+
+    __tablename__ = 'mining_reward_summaries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Sem chave estrangeira: a sessão pode ter sido movida para mining_sessions_archive
+    session_id = db.Column(db.Integer, nullable=False, unique=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    reward_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_units = db.Column(FixedPoint, nullable=False, default=0)
+    first_timestamp = db.Column(db.DateTime, nullable=False)
+    last_timestamp = db.Column(db.DateTime, nullable=False)
+    compacted_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_mining_reward_summaries_player_last', 'player_id', 'last_timestamp'),
+    )
+
+    def __repr__(self):
+        return f'<MiningRewardSummary session={self.session_id} rewards={self.reward_count}>'
+
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'player_id': self.player_id,
+            'reward_count': self.reward_count,
+            'amount': from_units(self.amount_units),
+            'first_timestamp': self.first_timestamp.isoformat(),
+            'last_timestamp': self.last_timestamp.isoformat()
+        }
+
+
+class MiningSessionArchive(db.Model):
+    """Sessões de mineração encerradas, movidas para fora da tabela quente mining_sessions."""
+
+    __tablename__ = 'mining_sessions_archive'
+
+    # Mesmo id da sessão original
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime)
+    current_rate = db.Column(db.String(100))
+    mining_interval_seconds = db.Column(db.Integer)
+    total_mined = db.Column(db.String(100))
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_mining_sessions_archive_player_start', 'player_id', 'start_time'),
+    )
+
+    def __repr__(self):
+        return f'<MiningSessionArchive {self.id} player={self.player_id}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'player_id': self.player_id,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'is_active': False,
+            'current_rate': self.current_rate,
+            'mining_interval_seconds': self.mining_interval_seconds,
+            'total_mined': self.total_mined,
+            'archived': True
+        }
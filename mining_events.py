@@ -0,0 +1,93 @@
+import json
+import queue
+import threading
+from collections import defaultdict
+
+# Assinantes conectados por jogador: player_id -> conjunto de filas (uma por conexão)
+_subscribers = defaultdict(set)
+_lock = threading.Lock()
+# Total de conexões abertas no processo (todas as filas de _subscribers)
+_connections = 0
+
+
+def format_sse(event, data):
+    """Formata um evento no protocolo Server-Sent Events."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+class MiningEventHub:
+    """Distribuidor em processo de eventos de mineração para as conexões SSE abertas."""
+
+    # Eventos pendentes por conexão; ao lotar, os mais antigos são descartados
+    queue_size = 50
+
+    @staticmethod
+    def subscribe(player_id, max_connections=None):
+        """
+        Registra uma nova conexão para receber os eventos do jogador.
+
+        Args:
+            player_id: ID do jogador
+            max_connections: Limite de conexões abertas no processo (None: sem limite)
+
+        Returns:
+            queue.Queue: Fila de tuplas (evento, dados) exclusiva da conexão, ou None se o limite foi atingido
+        """
+        global _connections
+        events = queue.Queue(maxsize=MiningEventHub.queue_size)
+        with _lock:
+            if max_connections is not None and _connections >= max_connections:
+                return None
+            _subscribers[player_id].add(events)
+            _connections += 1
+        return events
+
+    @staticmethod
+    def unsubscribe(player_id, events):
+        """Remove a conexão do jogador (chamado quando o cliente desconecta)."""
+        global _connections
+        with _lock:
+            player_queues = _subscribers.get(player_id)
+            if player_queues is None or events not in player_queues:
+                return
+            player_queues.discard(events)
+            _connections -= 1
+            if not player_queues:
+                del _subscribers[player_id]
+
+    @staticmethod
+    def has_subscribers(player_id):
+        """Permite evitar montar o payload de eventos que ninguém vai receber."""
+        return player_id in _subscribers
+
+    @staticmethod
+    def subscriber_count():
+        with _lock:
+            return _connections
+
+    @staticmethod
+    def publish(player_id, event, data):
+        """
+        Envia um evento para todas as conexões abertas do jogador.
+
+        Args:
+            player_id: ID do jogador
+            event: Nome do evento (ex.: 'reward', 'session_started')
+            data: Dados serializáveis em JSON
+        """
+        with _lock:
+            player_queues = list(_subscribers.get(player_id, ()))
+
+        for events in player_queues:
+            try:
+                events.put_nowait((event, data))
+            except queue.Full:
+                # Cliente lento: descartar o evento mais antigo em vez de bloquear quem publica
+                try:
+                    events.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    events.put_nowait((event, data))
+                except queue.Full:
+                    pass
@@ -0,0 +1,87 @@
+from database import db
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from utils.money import FixedPoint, encode_units, to_units
+from utils.schema import register_migration
+
+# Chave em session.info com os novos totais da transação atual (aplicados ao ranking
+# em memória, utils.ranking.MiningRanking, após o commit)
+RANK_PENDING_KEY = 'mining_rank_pending'
+
+class MiningLeaderboardEntry(db.Model):
+    """Chave numérica de ranking de mineração por jogador (total minerado em ponto fixo)."""
+
+    __tablename__ = 'mining_leaderboard'
+
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    total_mined_units = db.Column(FixedPoint, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_mining_leaderboard_rank', 'total_mined_units', 'player_id'),
+    )
+
+    def __repr__(self):
+        return f'<MiningLeaderboardEntry player={self.player_id} units={self.total_mined_units}>'
+
+    @staticmethod
+    def sync(player_id, total_mined_lifetime):
+        """
+        Atualiza (ou cria) a chave de ranking do jogador a partir do total minerado.
+
+        Args:
+            player_id: ID do jogador
+            total_mined_lifetime: Total minerado como string decimal
+        """
+        units = to_units(total_mined_lifetime)
+        MiningLeaderboardEntry._upsert(player_id, units, lambda excluded: excluded.total_mined_units)
+
+    @staticmethod
+    def add(player_id, units):
+        """
+        Soma unidades mineradas à chave de ranking do jogador (sem commit).
+
+        Chamado a cada recompensa creditada, para que jogadores minerando subam no
+        ranking sem esperar o fim da sessão.
+
+        Args:
+            player_id: ID do jogador
+            units: Quantidade em unidades de ponto fixo
+        """
+        table = MiningLeaderboardEntry.__table__
+        MiningLeaderboardEntry._upsert(
+            player_id,
+            units,
+            lambda excluded: db.func.doof_add(table.c.total_mined_units, encode_units(units))
+        )
+
+    @staticmethod
+    def _upsert(player_id, units, on_conflict_value):
+        table = MiningLeaderboardEntry.__table__
+        statement = sqlite_insert(table).values(
+            player_id=player_id,
+            total_mined_units=units,
+            updated_at=datetime.utcnow()
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.player_id],
+            set_={
+                'total_mined_units': on_conflict_value(statement.excluded),
+                'updated_at': statement.excluded.updated_at
+            }
+        ).returning(table.c.total_mined_units)
+        total = db.session.execute(statement).scalar_one()
+        db.session.info.setdefault(RANK_PENDING_KEY, {})[player_id] = total
+
+
+@register_migration
+def backfill_mining_leaderboard():
+    """Cria as chaves de ranking para estatísticas que ainda não possuem uma."""
+    rows = db.session.execute(db.text(
+        'SELECT s.player_id, s.total_mined_lifetime FROM mining_statistics s '
+        'LEFT JOIN mining_leaderboard l ON l.player_id = s.player_id '
+        'WHERE l.player_id IS NULL'
+    )).all()
+
+    for player_id, total_mined_lifetime in rows:
+        MiningLeaderboardEntry.sync(player_id, total_mined_lifetime or '0')
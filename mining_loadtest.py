@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Teste de carga dos endpoints de mineração.
+
+Cria N jogadores em um banco SQLite descartável e simula ciclos realistas de
+start -> status (várias vezes) -> stop, a partir de um pool de threads, usando o
+test client do Flask ou um servidor WSGI local. Ao final, reporta por endpoint:
+vazão, latência p50/p95/p99, consultas SQL por requisição e erros de lock do SQLite.
+
+Uso:
+    python mining_loadtest.py --players 1000 --workers 32 --cycles 3
+    python mining_loadtest.py --mode wsgi --players 200 --workers 16 --json report.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import tempfile
+import threading
+import urllib.request
+import urllib.error
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Load test for the mining endpoints')
+    parser.add_argument('--players', type=int, default=500, help='Number of simulated miners')
+    parser.add_argument('--workers', type=int, default=16, help='Size of the thread pool')
+    parser.add_argument('--cycles', type=int, default=2, help='start/status/stop cycles per miner')
+    parser.add_argument('--polls', type=int, default=5, help='status calls per cycle')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='Pause between calls of the same miner')
+    parser.add_argument('--mode', choices=('client', 'wsgi'), default='client',
+                        help='Flask test client or a local threaded WSGI server')
+    parser.add_argument('--scheduler', action='store_true', help='Run the background mining scheduler during the test')
+    parser.add_argument('--database', help='SQLite file to use (default: temporary file)')
+    parser.add_argument('--json', dest='json_path', help='Also write the report as JSON to this path')
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# O banco e o agendador precisam ser configurados antes de importar a aplicação
+database_path = args.database or os.path.join(tempfile.mkdtemp(prefix='dooficoin-loadtest-'), 'loadtest.db')
+os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+os.environ['MINING_SCHEDULER_ENABLED'] = '1' if args.scheduler else '0'
+os.environ['MINING_RETENTION_ENABLED'] = '0'
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from main import app
+from database import db
+from models.user import User
+from models.player import Player
+from utils.security import generate_token
+
+if not app.config.get('SECRET_KEY'):
+    app.config['SECRET_KEY'] = 'loadtest-secret'
+
+# Métricas coletadas pelos hooks do SQLAlchemy
+_metrics_lock = threading.Lock()
+lock_errors = defaultdict(int)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.loadtest_queries = g.get('loadtest_queries', 0) + 1
+
+
+def _handle_error(exception_context):
+    message = str(exception_context.original_exception or '')
+    if 'database is locked' in message or 'database table is locked' in message:
+        endpoint = request.endpoint if has_request_context() else 'background'
+        with _metrics_lock:
+            lock_errors[endpoint] += 1
+
+
+@app.after_request
+def _expose_query_count(response):
+    response.headers['X-Loadtest-Queries'] = str(g.get('loadtest_queries', 0))
+    return response
+
+
+def seed_players(count):
+    """Cria os usuários e jogadores do teste e retorna os tokens de cada um."""
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(db.engine, 'handle_error', _handle_error)
+
+        existing = User.query.filter(User.username.like('loadtest_%')).count()
+        users = [
+            User(username=f'loadtest_{i}', email=f'loadtest_{i}@example.com')
+            for i in range(existing, count)
+        ]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all([Player(user_id=user.id, username=user.username) for user in users])
+        db.session.commit()
+
+        users = User.query.filter(User.username.like('loadtest_%')).order_by(User.id).limit(count).all()
+        return [generate_token(user.id) for user in users]
+
+
+class ClientTransport:
+    """Envia requisições pelo test client do Flask (uma instância por thread)."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, token, client_ip):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = app.test_client()
+
+        response = client.open(
+            path,
+            method=method,
+            headers={'Authorization': f'Bearer {token}'},
+            environ_base={'REMOTE_ADDR': client_ip}
+        )
+        return response.status_code, int(response.headers.get('X-Loadtest-Queries', 0))
+
+
+class WSGITransport:
+    """Envia requisições HTTP reais para um servidor WSGI local com threads."""
+
+    def __init__(self):
+        from werkzeug.serving import make_server
+
+        def forwarded_ip(environ, start_response):
+            # Cada minerador simulado tem seu próprio IP, para não esbarrar no rate limit
+            environ['REMOTE_ADDR'] = environ.get('HTTP_X_LOADTEST_CLIENT', environ['REMOTE_ADDR'])
+            return app(environ, start_response)
+
+        self.server = make_server('127.0.0.1', 0, forwarded_ip, threaded=True)
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def request(self, method, path, token, client_ip):
+        http_request = urllib.request.Request(
+            self.base_url + path,
+            method=method,
+            data=b'' if method == 'POST' else None,
+            headers={'Authorization': f'Bearer {token}', 'X-Loadtest-Client': client_ip}
+        )
+        try:
+            with urllib.request.urlopen(http_request, timeout=30) as response:
+                return response.status, int(response.headers.get('X-Loadtest-Queries', 0))
+        except urllib.error.HTTPError as e:
+            return e.code, int(e.headers.get('X-Loadtest-Queries', 0))
+
+
+class Recorder:
+    """Acumula latência, status e consultas por endpoint."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.queries = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, latency, status, queries):
+        with self._lock:
+            self.samples[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            self.queries[endpoint] += queries
+
+
+def run_miner(transport, recorder, token, index):
+    client_ip = f'10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}'
+    think = args.think_ms / 1000.0
+    plan = []
+    for _ in range(args.cycles):
+        plan.append(('POST', '/api/mining/start', 'start'))
+        plan.extend([('GET', '/api/mining/status', 'status')] * args.polls)
+        plan.append(('POST', '/api/mining/stop', 'stop'))
+
+    for method, path, name in plan:
+        started = time.perf_counter()
+        try:
+            status, queries = transport.request(method, path, token, client_ip)
+        except Exception:
+            status, queries = 'exception', 0
+        recorder.record(name, time.perf_counter() - started, status, queries)
+
+        if think:
+            time.sleep(think * random.uniform(0.5, 1.5))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Método do posto mais próximo
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def build_report(recorder, elapsed):
+    endpoint_names = {'start': 'mining.start_mining', 'status': 'mining.get_mining_status', 'stop': 'mining.stop_mining'}
+    report = {'elapsed_seconds': elapsed, 'players': args.players, 'workers': args.workers, 'mode': args.mode, 'endpoints': {}}
+
+    for name, samples in recorder.samples.items():
+        latencies = sorted(samples)
+        statuses = recorder.statuses[name]
+        errors = sum(count for status, count in statuses.items() if status == 'exception' or status >= 500)
+        report['endpoints'][name] = {
+            'requests': len(latencies),
+            'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'queries_per_request': recorder.queries[name] / len(latencies) if latencies else 0.0,
+            'errors': errors,
+            'lock_errors': lock_errors.get(endpoint_names[name], 0),
+            'statuses': {str(status): count for status, count in sorted(statuses.items(), key=str)}
+        }
+
+    report['background_lock_errors'] = lock_errors.get('background', 0)
+    return report
+
+
+def print_report(report):
+    print(f"\n{report['players']} miners, {report['workers']} workers, mode={report['mode']}, "
+          f"{report['elapsed_seconds']:.2f}s")
+    header = f"{'endpoint':<10}{'reqs':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>8}{'errors':>8}{'locks':>8}  statuses"
+    print(header)
+    print('-' * len(header))
+    for name in ('start', 'status', 'stop'):
+        stats = report['endpoints'].get(name)
+        if not stats:
+            continue
+        print(f"{name:<10}{stats['requests']:>8}{stats['throughput_rps']:>10.1f}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['queries_per_request']:>8.1f}"
+              f"{stats['errors']:>8}{stats['lock_errors']:>8}  {stats['statuses']}")
+    if report['background_lock_errors']:
+        print(f"background lock errors: {report['background_lock_errors']}")
+
+
+def main():
+    print(f'Database: {database_path}')
+    tokens = seed_players(args.players)
+    transport = WSGITransport() if args.mode == 'wsgi' else ClientTransport()
+    recorder = Recorder()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run_miner, transport, recorder, token, index) for index, token in enumerate(tokens)]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    report = build_report(recorder, elapsed)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    return 0 if all(stats['errors'] == 0 for stats in report['endpoints'].values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models.user import db
+from models.mining import MiningSession, MiningReward
+from models.mining_archive import MiningRewardSummary, MiningSessionArchive
+from utils.background import PeriodicTask
+from utils.schema import register_index
+
+# Índice usado para encontrar recompensas mais antigas que o corte
+register_index(db.Index('ix_mining_rewards_timestamp', MiningReward.__table__.c.timestamp))
+# Índice usado para encontrar sessões encerradas mais antigas que o corte
+register_index(db.Index('ix_mining_sessions_active_end', MiningSession.__table__.c.is_active, MiningSession.__table__.c.end_time))
+
+_ARCHIVED_COLUMNS = (
+    'id', 'player_id', 'start_time', 'end_time',
+    'current_rate', 'mining_interval_seconds', 'total_mined'
+)
+
+
+class MiningRetention:
+    """Rotina de retenção: compacta recompensas antigas e arquiva sessões encerradas."""
+
+    # Sessões processadas por lote (um commit por lote)
+    batch_size = 200
+    reward_retention_days = 30
+    session_retention_days = 30
+
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """Inicia a rotina em segundo plano com os parâmetros configurados na aplicação."""
+        MiningRetention.reward_retention_days = app.config.get('MINING_REWARD_RETENTION_DAYS', MiningRetention.reward_retention_days)
+        MiningRetention.session_retention_days = app.config.get('MINING_SESSION_RETENTION_DAYS', MiningRetention.session_retention_days)
+
+        if MiningRetention._task is None:
+            MiningRetention._task = PeriodicTask(
+                'mining_retention',
+                app.config.get('MINING_RETENTION_INTERVAL_SECONDS', 3600),
+                MiningRetention.run_once
+            )
+
+        MiningRetention._task.start(app)
+
+    @staticmethod
+    def run_once(now=None):
+        """
+        Executa uma passagem completa de retenção.
+
+        Returns:
+            dict: Quantidade de recompensas compactadas e de sessões arquivadas
+        """
+        now = now or datetime.utcnow()
+
+        compacted = MiningRetention.compact_rewards(now - timedelta(days=MiningRetention.reward_retention_days))
+        archived = MiningRetention.archive_sessions(now - timedelta(days=MiningRetention.session_retention_days))
+
+        return {'rewards_compacted': compacted, 'sessions_archived': archived}
+
+    @staticmethod
+    def compact_rewards(cutoff):
+        """
+        Substitui as recompensas anteriores ao corte por uma linha de resumo por sessão.
+
+        O resumo acumula contagem, soma exata (ponto fixo) e intervalo de datas, então
+        compactações sucessivas da mesma sessão se somam ao resumo existente.
+
+        Args:
+            cutoff: Recompensas com timestamp anterior a esta data são compactadas
+
+        Returns:
+            int: Quantidade de recompensas removidas da tabela quente
+        """
+        reward_table = MiningReward.__table__
+        summary_table = MiningRewardSummary.__table__
+        total = 0
+
+        while True:
+            session_ids = [row[0] for row in db.session.query(MiningReward.session_id).filter(
+                MiningReward.timestamp < cutoff
+            ).distinct().limit(MiningRetention.batch_size).all()]
+
+            if not session_ids:
+                break
+
+            in_batch = db.and_(reward_table.c.timestamp < cutoff, reward_table.c.session_id.in_(session_ids))
+
+            aggregates = db.session.execute(db.select(
+                reward_table.c.session_id,
+                reward_table.c.player_id,
+                db.func.count(),
+                db.func.doof_sum(db.func.doof_units(reward_table.c.amount)),
+                db.func.min(reward_table.c.timestamp),
+                db.func.max(reward_table.c.timestamp)
+            ).where(in_batch).group_by(reward_table.c.session_id, reward_table.c.player_id)).all()
+
+            rows = [{
+                'session_id': session_id,
+                'player_id': player_id,
+                'reward_count': count,
+                'amount_units': int(amount),
+                'first_timestamp': first_timestamp,
+                'last_timestamp': last_timestamp,
+                'compacted_at': datetime.utcnow()
+            } for session_id, player_id, count, amount, first_timestamp, last_timestamp in aggregates]
+
+            # Datas vêm como texto em agregados do SQLite; convertê-las para o tipo da coluna
+            for row in rows:
+                for key in ('first_timestamp', 'last_timestamp'):
+                    if isinstance(row[key], str):
+                        row[key] = datetime.fromisoformat(row[key])
+
+            statement = sqlite_insert(summary_table).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=[summary_table.c.session_id],
+                set_={
+                    'reward_count': summary_table.c.reward_count + statement.excluded.reward_count,
+                    'amount_units': db.func.doof_add(summary_table.c.amount_units, statement.excluded.amount_units),
+                    'first_timestamp': db.func.min(summary_table.c.first_timestamp, statement.excluded.first_timestamp),
+                    'last_timestamp': db.func.max(summary_table.c.last_timestamp, statement.excluded.last_timestamp),
+                    'compacted_at': statement.excluded.compacted_at
+                }
+            )
+            db.session.execute(statement)
+
+            result = db.session.execute(reward_table.delete().where(in_batch))
+            db.session.commit()
+
+            total += result.rowcount
+
+        return total
+
+    @staticmethod
+    def archive_sessions(cutoff):
+        """
+        Move sessões encerradas antes do corte, já sem recompensas na tabela quente,
+        para mining_sessions_archive.
+
+        Args:
+            cutoff: Sessões com end_time anterior a esta data são arquivadas
+
+        Returns:
+            int: Quantidade de sessões arquivadas
+        """
+        session_table = MiningSession.__table__
+        archive_table = MiningSessionArchive.__table__
+        reward_table = MiningReward.__table__
+        total = 0
+
+        while True:
+            session_ids = [row[0] for row in db.session.execute(db.select(session_table.c.id).where(
+                session_table.c.is_active == False,
+                session_table.c.end_time < cutoff,
+                ~db.exists().where(reward_table.c.session_id == session_table.c.id)
+            ).limit(MiningRetention.batch_size)).all()]
+
+            if not session_ids:
+                break
+
+            columns = [session_table.c[name] for name in _ARCHIVED_COLUMNS]
+            db.session.execute(archive_table.insert().from_select(
+                list(_ARCHIVED_COLUMNS),
+                db.select(*columns).where(session_table.c.id.in_(session_ids))
+            ).prefix_with('OR IGNORE'))
+            db.session.execute(session_table.delete().where(session_table.c.id.in_(session_ids)))
+            db.session.commit()
+
+            total += len(session_ids)
+
+        return total
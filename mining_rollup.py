@@ -0,0 +1,185 @@
+from collections import defaultdict
+from database import db
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from utils.money import FixedPoint, from_units
+from utils.schema import register_migration
+
+# Linhas por upsert (limite de parâmetros por instrução do SQLite)
+UPSERT_BATCH_ROWS = 500
+
+class MiningRollup(db.Model):
+    """Agregados horários e diários de mineração, por jogador e globais."""
+
+    __tablename__ = 'mining_rollups'
+
+    # player_id usado para as linhas globais (somatório de todos os jogadores)
+    GLOBAL = 0
+    PERIODS = ('hour', 'day')
+
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(10), nullable=False)  # hour, day
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    player_id = db.Column(db.Integer, nullable=False, default=0)  # 0 = global
+    amount_mined_units = db.Column(FixedPoint, nullable=False, default=0)
+    reward_count = db.Column(db.Integer, nullable=False, default=0)
+    active_seconds = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('period', 'player_id', 'bucket_start', name='uq_mining_rollups_bucket'),
+    )
+
+    def __repr__(self):
+        return f'<MiningRollup {self.period} {self.bucket_start} player={self.player_id}>'
+
+    def to_dict(self):
+        return {
+            'period': self.period,
+            'bucket_start': self.bucket_start.isoformat(),
+            'player_id': self.player_id if self.player_id != MiningRollup.GLOBAL else None,
+            'amount_mined': from_units(self.amount_mined_units),
+            'reward_count': self.reward_count,
+            'active_seconds': self.active_seconds
+        }
+
+    @staticmethod
+    def bucket_for(period, timestamp):
+        """Retorna o início do balde (hora ou dia) que contém o instante informado."""
+        if period == 'hour':
+            return timestamp.replace(minute=0, second=0, microsecond=0)
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    @staticmethod
+    def record_intervals(player_id, rate_units, first_due, interval_seconds, count, timestamp):
+        """
+        Acumula intervalos de recompensa pagos de uma vez nos baldes em que ocorreram.
+
+        O k-ésimo intervalo vence em first_due + k * interval_seconds e cobre os
+        interval_seconds anteriores: quantidade e contagem entram no balde do
+        vencimento e o tempo ativo é dividido entre os baldes que o intervalo
+        atravessa. Um catch-up depois de horas sem pagamento não concentra tudo
+        na hora atual.
+
+        Executa upserts com a soma feita no banco (doof_add), então escritas
+        concorrentes não se sobrescrevem. Não faz commit.
+
+        Args:
+            player_id: ID do jogador
+            rate_units: Recompensa de um intervalo em unidades de ponto fixo
+            first_due: Vencimento do primeiro intervalo pago
+            interval_seconds: Duração de cada intervalo
+            count: Quantidade de intervalos pagos
+            timestamp: Instante do pagamento
+        """
+        interval = timedelta(seconds=interval_seconds)
+        covered_start = first_due - interval
+        last_due = first_due + interval * (count - 1)
+        hour = timedelta(hours=1)
+
+        # (period, bucket_start) -> [unidades, recompensas, microssegundos ativos]
+        buckets = defaultdict(lambda: [0, 0, 0])
+        bucket_start = MiningRollup.bucket_for('hour', covered_start)
+        while bucket_start <= last_due:
+            bucket_end = bucket_start + hour
+            # Vencimentos first_due + k * interval dentro de [bucket_start, bucket_end)
+            first_k = max(0, -((first_due - bucket_start) // interval))
+            last_k = min(count - 1, -((first_due - bucket_end) // interval) - 1)
+            rewards = max(0, last_k - first_k + 1)
+            active = max(timedelta(0), min(bucket_end, last_due) - max(bucket_start, covered_start))
+
+            for period in MiningRollup.PERIODS:
+                totals = buckets[(period, MiningRollup.bucket_for(period, bucket_start))]
+                totals[0] += rate_units * rewards
+                totals[1] += rewards
+                totals[2] += active // timedelta(microseconds=1)
+            bucket_start = bucket_end
+
+        rows = []
+        for (period, bucket), (units, rewards, active_us) in buckets.items():
+            for owner in (player_id, MiningRollup.GLOBAL):
+                rows.append({
+                    'period': period,
+                    'bucket_start': bucket,
+                    'player_id': owner,
+                    'amount_mined_units': units,
+                    'reward_count': rewards,
+                    'active_seconds': round(active_us / 1000000),
+                    'updated_at': timestamp
+                })
+
+        table = MiningRollup.__table__
+        for start in range(0, len(rows), UPSERT_BATCH_ROWS):
+            statement = sqlite_insert(table).values(rows[start:start + UPSERT_BATCH_ROWS])
+            statement = statement.on_conflict_do_update(
+                index_elements=[table.c.period, table.c.player_id, table.c.bucket_start],
+                set_={
+                    'amount_mined_units': db.func.doof_add(table.c.amount_mined_units, statement.excluded.amount_mined_units),
+                    'reward_count': table.c.reward_count + statement.excluded.reward_count,
+                    'active_seconds': table.c.active_seconds + statement.excluded.active_seconds,
+                    'updated_at': statement.excluded.updated_at
+                }
+            )
+            db.session.execute(statement)
+
+    @staticmethod
+    def recent(player_id=GLOBAL, period='day', limit=30):
+        """Obtém os baldes mais recentes de um jogador (ou globais)."""
+        return MiningRollup.query.filter_by(
+            period=period,
+            player_id=player_id
+        ).order_by(MiningRollup.bucket_start.desc()).limit(limit).all()
+
+    @staticmethod
+    def totals(player_id=GLOBAL, since=None):
+        """
+        Soma os baldes diários de um jogador (ou globais).
+
+        Args:
+            player_id: ID do jogador ou MiningRollup.GLOBAL
+            since: Considerar apenas baldes a partir desta data (opcional)
+
+        Returns:
+            dict: amount_mined_units (int), reward_count e active_seconds
+        """
+        query = db.session.query(
+            db.func.doof_sum(MiningRollup.amount_mined_units),
+            db.func.coalesce(db.func.sum(MiningRollup.reward_count), 0),
+            db.func.coalesce(db.func.sum(MiningRollup.active_seconds), 0)
+        ).filter(
+            MiningRollup.period == 'day',
+            MiningRollup.player_id == player_id
+        )
+
+        if since is not None:
+            query = query.filter(MiningRollup.bucket_start >= MiningRollup.bucket_for('day', since))
+
+        amount, reward_count, active_seconds = query.one()
+
+        return {
+            'amount_mined_units': int(amount) if amount else 0,
+            'reward_count': reward_count,
+            'active_seconds': active_seconds
+        }
+
+
+@register_migration
+def backfill_mining_rollups():
+    """Gera os agregados a partir de mining_rewards quando a tabela de rollups ainda está vazia."""
+    if db.session.execute(db.text('SELECT 1 FROM mining_rollups LIMIT 1')).first():
+        return
+    if not db.session.execute(db.text('SELECT 1 FROM mining_rewards LIMIT 1')).first():
+        return
+
+    # Mesmo formato de data gravado pelo SQLAlchemy, para que os baldes coincidam
+    formats = {'hour': '%Y-%m-%d %H:00:00.000000', 'day': '%Y-%m-%d 00:00:00.000000'}
+
+    for period, bucket_format in formats.items():
+        for owner, group_by in (('player_id', 'bucket, player_id'), (str(MiningRollup.GLOBAL), 'bucket')):
+            db.session.execute(db.text(
+                'INSERT INTO mining_rollups '
+                '(period, bucket_start, player_id, amount_mined_units, reward_count, active_seconds, updated_at) '
+                f"SELECT :period, strftime('{bucket_format}', timestamp) AS bucket, {owner}, "
+                'doof_sum(doof_units(amount)), COUNT(*), 0, CURRENT_TIMESTAMP '
+                f'FROM mining_rewards GROUP BY {group_by}'
+            ), {'period': period})
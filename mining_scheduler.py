@@ -0,0 +1,141 @@
+from datetime import datetime
+from sqlalchemy import and_, or_
+from models.user import db
+from models.player import Player
+from models.mining import MiningSession
+from utils.background import PeriodicTask
+from utils.schema import register_index
+from utils.fraud_detection import FraudDetector
+from utils.mining_accrual import MiningAccrual
+from utils.mining_events import MiningEventHub
+
+# Índice usado pela varredura de sessões com recompensa vencida
+register_index(db.Index(
+    'ix_mining_sessions_active_due',
+    MiningSession.__table__.c.is_active,
+    MiningSession.__table__.c.next_reward_time
+))
+
+
+class MiningScheduler:
+    """Motor de ticks que credita recompensas de mineração no servidor, sem depender de polling do cliente."""
+
+    # Quantidade de sessões processadas por lote (um commit por lote)
+    batch_size = 500
+    # Limite de lotes por passagem, para que um tick não monopolize o banco
+    max_batches_per_pass = 20
+
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """Inicia o agendador em segundo plano com o intervalo configurado na aplicação."""
+        MiningScheduler.batch_size = app.config.get('MINING_SCHEDULER_BATCH_SIZE', MiningScheduler.batch_size)
+
+        if MiningScheduler._task is None:
+            MiningScheduler._task = PeriodicTask(
+                'mining_scheduler',
+                app.config.get('MINING_TICK_SECONDS', 5),
+                MiningScheduler.run_once
+            )
+
+        MiningScheduler._task.start(app)
+
+    @staticmethod
+    def stop():
+        if MiningScheduler._task is not None:
+            MiningScheduler._task.stop()
+
+    @staticmethod
+    def is_running():
+        return MiningScheduler._task is not None and MiningScheduler._task.is_running
+
+    @staticmethod
+    def run_once(now=None):
+        """
+        Executa uma passagem do agendador sobre as sessões com recompensa vencida.
+
+        Args:
+            now: Instante de referência (padrão: datetime.utcnow())
+
+        Returns:
+            int: Quantidade de recompensas creditadas
+        """
+        now = now or datetime.utcnow()
+        credited = 0
+        cursor = None
+
+        for _ in range(MiningScheduler.max_batches_per_pass):
+            query = MiningSession.query.filter(
+                MiningSession.is_active == True,
+                MiningSession.next_reward_time <= now
+            )
+
+            # Paginação por chave (next_reward_time, id) para não reler o mesmo lote
+            if cursor:
+                query = query.filter(or_(
+                    MiningSession.next_reward_time > cursor[0],
+                    and_(MiningSession.next_reward_time == cursor[0], MiningSession.id > cursor[1])
+                ))
+
+            sessions = query.order_by(
+                MiningSession.next_reward_time,
+                MiningSession.id
+            ).limit(MiningScheduler.batch_size).all()
+
+            if not sessions:
+                break
+
+            cursor = (sessions[-1].next_reward_time, sessions[-1].id)
+            credited += MiningScheduler._process_batch(sessions, now)
+
+            if len(sessions) < MiningScheduler.batch_size:
+                break
+
+        return credited
+
+    @staticmethod
+    def _process_batch(sessions, now):
+        """Gera e credita as recompensas vencidas de um lote de sessões com um único commit."""
+        # Carregar todos os jogadores do lote em uma única consulta
+        player_ids = {session.player_id for session in sessions}
+        players = {player.id: player for player in Player.query.filter(Player.id.in_(player_ids)).all()}
+
+        credited = []
+        for session in sessions:
+            player = players.get(session.player_id)
+            if not player:
+                continue
+
+            # Todos os intervalos vencidos são pagos de uma vez, em uma recompensa agregada;
+            # sessões já pagas por outro processo ou por /status e /stop são ignoradas
+            reward, intervals = MiningAccrual.catch_up(session, player, now)
+            if reward:
+                credited.append((player, session, reward, intervals))
+
+        # Montar os eventos SSE antes do commit, enquanto os objetos ainda estão carregados
+        db.session.flush()
+        events = [
+            (player.id, MiningAccrual.reward_event(player, session, reward))
+            for player, session, reward, _ in credited
+            if MiningEventHub.has_subscribers(player.id)
+        ]
+        actions = [
+            (player.id, session.id, reward.amount, intervals)
+            for player, session, reward, intervals in credited
+        ]
+
+        db.session.commit()
+
+        for player_id, data in events:
+            MiningEventHub.publish(player_id, 'reward', data)
+
+        for player_id, session_id, amount, intervals in actions:
+            FraudDetector.record_player_action(player_id, 'earn_coins', {
+                'amount': amount,
+                'source': 'mining',
+                'session_id': session_id,
+                'intervals': intervals
+            })
+
+        return len(actions)
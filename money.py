@@ -0,0 +1,172 @@
+import sqlite3
+from decimal import Decimal, ROUND_DOWN, localcontext
+from sqlalchemy import event, func, literal, or_, type_coerce, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.types import TypeDecorator, String
+
+# Casas decimais representadas: a menor taxa de mineração é 1e-35 DOOF
+SCALE_DIGITS = 36
+SCALE = 10 ** SCALE_DIGITS
+# Quantidade total de dígitos armazenados (36 inteiros + 36 fracionários)
+WIDTH = 72
+# Precisão usada nas conversões para não perder dígitos da escala
+_PRECISION = WIDTH + 8
+
+
+def to_units(value):
+    """
+    Converte um valor em DOOF (string, Decimal ou int) para unidades inteiras de 1e-36 DOOF.
+
+    Args:
+        value: Quantidade em DOOF
+
+    Returns:
+        int: Quantidade em unidades de ponto fixo (truncada)
+    """
+    if value is None or value == '':
+        return 0
+
+    with localcontext() as ctx:
+        ctx.prec = _PRECISION
+        return int((Decimal(str(value)) * SCALE).to_integral_value(rounding=ROUND_DOWN))
+
+
+def from_units(units):
+    """
+    Converte unidades de ponto fixo de volta para uma string decimal em DOOF.
+
+    Args:
+        units: Quantidade em unidades inteiras
+
+    Returns:
+        str: Valor decimal sem notação científica (ex.: '0.00000000000000000000000000000000001')
+    """
+    with localcontext() as ctx:
+        ctx.prec = _PRECISION
+        amount = Decimal(int(units)).scaleb(-SCALE_DIGITS).normalize()
+        return format(amount, 'f')
+
+
+def encode_units(units):
+    """Codifica unidades não negativas como texto de largura fixa (ordenável e indexável)."""
+    units = int(units)
+    if units < 0:
+        raise ValueError('Fixed-point amounts cannot be negative')
+    return str(units).zfill(WIDTH)
+
+
+def decode_units(text):
+    """Decodifica o texto de largura fixa para unidades inteiras."""
+    return int(text) if text else 0
+
+
+class FixedPoint(TypeDecorator):
+    """
+    Coluna de valor monetário em unidades inteiras de 1e-36 DOOF.
+
+    O INTEGER do SQLite tem 64 bits e não comporta essa escala, então o inteiro é
+    gravado como texto com zeros à esquerda e largura fixa: a ordenação textual
+    coincide com a numérica e a coluna pode ser indexada normalmente.
+    No Python o valor é um int.
+    """
+
+    impl = String(WIDTH)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_units(value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode_units(value)
+
+
+class DoofAmount(TypeDecorator):
+    """
+    Coluna de valor em DOOF gravada no mesmo formato de FixedPoint.
+
+    No Python o valor continua sendo uma string decimal (ex.: '0.5'), mantendo a
+    compatibilidade da API, enquanto no banco a coluna pode ser comparada, ordenada,
+    indexada e somada com doof_add/doof_sum sem reinterpretar strings decimais.
+    """
+
+    impl = String(WIDTH)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_units(to_units(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return from_units(decode_units(value))
+
+
+def encode_legacy_amounts(column):
+    """
+    Monta o UPDATE que converte para ponto fixo os valores de uma coluna DoofAmount
+    ainda gravados como string decimal. Valores já codificados (72 dígitos) não são
+    alterados, então a migração pode ser executada mais de uma vez.
+
+    Args:
+        column: Coluna DoofAmount de uma tabela
+
+    Returns:
+        Update: Instrução pronta para db.session.execute
+    """
+    raw = type_coerce(column, String)
+    return update(column.table).values({column.name: func.doof_units(raw)}).where(
+        raw.isnot(None),
+        or_(func.length(raw) != WIDTH, raw.op('GLOB')(literal('*[^0-9]*', String)))
+    )
+
+
+class _DoofSum:
+    """Agregado SQL doof_sum: soma valores de ponto fixo codificados."""
+
+    def __init__(self):
+        self.total = 0
+
+    def step(self, value):
+        if value is not None:
+            self.total += decode_units(value)
+
+    def finalize(self):
+        return encode_units(self.total)
+
+
+def _doof_add(a, b):
+    return encode_units(decode_units(a) + decode_units(b))
+
+
+def _doof_sub(a, b):
+    return encode_units(decode_units(a) - decode_units(b))
+
+
+def _doof_units(value):
+    return encode_units(to_units(value))
+
+
+@event.listens_for(Engine, 'connect')
+def register_sqlite_functions(dbapi_connection, connection_record):
+    """
+    Registra funções de ponto fixo em cada conexão SQLite, permitindo aritmética e
+    agregação no próprio banco (por isso main.py recusa outros bancos):
+
+        doof_add(a, b)     -> a + b
+        doof_sub(a, b)     -> a - b (erro se o resultado for negativo)
+        doof_sum(x)        -> soma agregada
+        doof_units(texto)  -> converte uma string decimal legada em DOOF
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    dbapi_connection.create_function('doof_add', 2, _doof_add, deterministic=True)
+    dbapi_connection.create_function('doof_sub', 2, _doof_sub, deterministic=True)
+    dbapi_connection.create_function('doof_units', 1, _doof_units, deterministic=True)
+    dbapi_connection.create_aggregate('doof_sum', 1, _DoofSum)
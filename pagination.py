@@ -0,0 +1,76 @@
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(value, row_id):
+    """Gera o cursor '<valor>,<id>' que aponta para o último item de uma página (datas em ISO)."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return f'{value},{row_id}'
+
+
+def parse_cursor(value, parse_value=datetime.fromisoformat):
+    """
+    Interpreta um cursor no formato '<valor>,<id>'.
+
+    Args:
+        value: Cursor recebido na query string (ou None)
+        parse_value: Conversão do valor de ordenação (padrão: timestamp ISO)
+
+    Returns:
+        tuple: (valor, int) ou None se nenhum cursor foi informado
+
+    Raises:
+        ValueError: Se o cursor estiver malformado
+    """
+    if not value:
+        return None
+
+    sort_value, _, row_id = value.rpartition(',')
+    if not sort_value:
+        raise ValueError('Invalid cursor')
+
+    return parse_value(sort_value), int(row_id)
+
+
+def parse_bool_arg(value):
+    """Interpreta flags de query string como '1', 'true' ou 'yes'."""
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def keyset_page(query, sort_column, id_column, after, limit):
+    """
+    Pagina uma consulta em ordem decrescente de (valor, id) sem OFFSET.
+
+    Args:
+        query: Consulta base (já filtrada); pode selecionar colunas, desde que inclua as de ordenação
+        sort_column: Coluna usada na ordenação (ex.: data)
+        id_column: Coluna de id usada no desempate
+        after: Cursor já interpretado (valor, id) ou None para a primeira página
+        limit: Quantidade máxima de itens
+
+    Returns:
+        tuple: (itens, próximo cursor ou None)
+
+    Raises:
+        ValueError: Se limit for menor que 1
+    """
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+
+    if after:
+        sort_value, row_id = after
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id)
+        ))
+
+    items = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return items, next_cursor
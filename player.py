@@ -1,5 +1,8 @@
 from database import db
-from decimal import Decimal
+from sqlalchemy import inspect
+from utils.counter_cache import CounterCache
+from utils.money import DoofAmount, encode_legacy_amounts, from_units, to_units
+from utils.schema import register_migration
 
 class Player(db.Model):
     __tablename__ = 'players'
@@ -10,7 +13,7 @@ class Player(db.Model):
     level = db.Column(db.Integer, default=1)
     health = db.Column(db.Integer, default=100)
     power = db.Column(db.Integer, default=10)
-    wallet_balance = db.Column(db.String(100), default="0")  # Saldo em string para precisão
+    wallet_balance = db.Column(DoofAmount, default="0")  # Ponto fixo no banco, string decimal no Python
     monsters_killed = db.Column(db.Integer, default=0)
     self_eliminations = db.Column(db.Integer, default=0)
     player_kills = db.Column(db.Integer, default=0)
@@ -23,7 +26,8 @@ class Player(db.Model):
     user = db.relationship('User', backref='player', uselist=False)
 
     def to_dict(self):
-        return {
+        # Contadores ainda no cache write-behind entram na resposta
+        return CounterCache.overlay(self.id, {
             'id': self.id,
             'user_id': self.user_id,
             'username': self.username,
@@ -38,38 +42,51 @@ class Player(db.Model):
             'current_phase': self.current_phase,
             'is_mining': self.is_mining,
             'last_activity': self.last_activity.isoformat() if self.last_activity else None
-        }
+        })
     
-    def add_coins(self, amount_str):
+    def _is_persisted(self):
+        """Indica se o jogador já existe no banco (saldo alterado via UPDATE atômico)."""
+        return inspect(self).persistent
+    
+    def add_coins(self, amount_str, reason='reward', reference=None):
         """
         Adiciona moedas ao saldo do jogador.
         
         Args:
             amount_str: Quantidade a adicionar como string para precisão
+            reason: Motivo registrado no livro-razão (ex.: 'mining', 'reward')
+            reference: Referência opcional registrada no livro-razão
         """
-        current_balance = Decimal(self.wallet_balance)
-        amount = Decimal(amount_str)
-        new_balance = current_balance + amount
-        self.wallet_balance = str(new_balance)
+        if self._is_persisted():
+            from utils.balance import BalanceService
+            BalanceService.credit(self.id, amount_str, reason=reason, reference=reference)
+            return
+        
+        self.wallet_balance = from_units(to_units(self.wallet_balance) + to_units(amount_str))
     
-    def remove_coins(self, amount_str):
+    def remove_coins(self, amount_str, reason='purchase', reference=None):
         """
         Remove moedas do saldo do jogador.
         
         Args:
             amount_str: Quantidade a remover como string para precisão
+            reason: Motivo registrado no livro-razão (ex.: 'purchase')
+            reference: Referência opcional registrada no livro-razão
             
         Returns:
             bool: True se a operação foi bem-sucedida, False se o saldo for insuficiente
         """
-        current_balance = Decimal(self.wallet_balance)
-        amount = Decimal(amount_str)
+        if self._is_persisted():
+            from utils.balance import BalanceService
+            return BalanceService.debit(self.id, amount_str, reason=reason, reference=reference)
+        
+        current_balance = to_units(self.wallet_balance)
+        amount = to_units(amount_str)
         
         if current_balance < amount:
             return False
         
-        new_balance = current_balance - amount
-        self.wallet_balance = str(new_balance)
+        self.wallet_balance = from_units(current_balance - amount)
         return True
     
     def kill_monster(self):
@@ -102,11 +119,17 @@ class Player(db.Model):
         Returns:
             str: Quantidade de Dooficoin ganha
         """
-        self.self_eliminations += 1
-        
         # Quantidade fixa de Dooficoin por auto-eliminação
         coin_reward = "0.00000000000000000000000000000000001"
         
+        if self._is_persisted():
+            from utils.balance import BalanceService
+            BalanceService.credit(self.id, coin_reward, reason='self_eliminate')
+            CounterCache.increment(self.id, 'self_eliminations')
+            return coin_reward
+        
+        self.self_eliminations += 1
+        
         # Adicionar ao saldo
         self.add_coins(coin_reward)
         
@@ -116,16 +139,21 @@ class Player(db.Model):
         """
         Registra a morte do jogador e zera o saldo da partida atual.
         """
+        # Em um sistema real, você armazenaria o saldo da partida separadamente
+        # Por enquanto, vamos simular removendo 10% do saldo total
+        if self._is_persisted():
+            from utils.balance import BalanceService
+            BalanceService.die(self.id, loss_divisor=10)
+            CounterCache.increment(self.id, 'deaths')
+            CounterCache.set_value(self.id, 'health', 100)
+            return
+        
         self.deaths += 1
         
-        # Em um sistema real, você armazenaria o saldo da partida separadamente
-        # Por enquanto, vamos simular zerando uma porcentagem do saldo total
-        current_balance = Decimal(self.wallet_balance)
-        loss_percentage = Decimal("0.1")  # Perder 10% do saldo total
-        loss_amount = current_balance * loss_percentage
+        loss_amount = to_units(self.wallet_balance) // 10  # Perder 10% do saldo total
         
         if loss_amount > 0:
-            self.remove_coins(str(loss_amount))
+            self.remove_coins(from_units(loss_amount))
         
         # Restaurar vida
         self.health = 100
@@ -138,24 +166,39 @@ class Player(db.Model):
             target_player: O jogador alvo que foi morto
             
         Returns:
-            str: Quantidade de Dooficoin ganha
+            str: Quantidade de Dooficoin ganha, ou None se o saldo do alvo mudou
+                 durante a transferência (a transação deve ser desfeita)
         """
+        if self._is_persisted() and inspect(target_player).persistent:
+            from utils.balance import BalanceService
+            coin_reward = BalanceService.transfer_ratio(target_player.id, self.id, 5)
+            if coin_reward is not None:
+                CounterCache.increment(self.id, 'player_kills')
+                CounterCache.increment(target_player.id, 'deaths')
+                CounterCache.set_value(target_player.id, 'health', 100)
+            return coin_reward
+        
         self.player_kills += 1
         target_player.deaths += 1
         
         # Calcular 20% do saldo do jogador alvo
-        target_balance = Decimal(target_player.wallet_balance)
-        coin_reward = target_balance * Decimal("0.2")
+        coin_reward = from_units(to_units(target_player.wallet_balance) // 5)
         
-        if coin_reward > 0:
+        if to_units(coin_reward) > 0:
             # Remover do alvo
-            target_player.remove_coins(str(coin_reward))
+            target_player.remove_coins(coin_reward)
             
             # Adicionar ao jogador
-            self.add_coins(str(coin_reward))
+            self.add_coins(coin_reward)
         
         # Restaurar vida do alvo
         target_player.health = 100
         
-        return str(coin_reward)
+        return coin_reward
+
+
+@register_migration
+def encode_player_balances():
+    """Converte saldos gravados como string decimal para o formato de ponto fixo."""
+    db.session.execute(encode_legacy_amounts(Player.__table__.c.wallet_balance))
 
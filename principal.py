@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import g, request
+from models.user import db, User
+from models.player import Player
+
+_lock = threading.Lock()
+# user_id -> (expira_em, Principal), em ordem de uso (LRU)
+_cache = OrderedDict()
+
+
+class Principal:
+    """
+    Identidade autenticada da requisição: usuário e jogador associado.
+
+    Privilégios vêm do token de cada requisição (request.token_payload) e não são
+    guardados aqui, pois o principal é compartilhado entre tokens pelo cache.
+    """
+
+    __slots__ = ('user_id', 'player_id')
+
+    def __init__(self, user_id, player_id):
+        self.user_id = user_id
+        self.player_id = player_id
+
+    def __repr__(self):
+        return f'<Principal user={self.user_id} player={self.player_id}>'
+
+
+class PrincipalCache:
+    """
+    Cache em processo, com TTL curto, dos principals resolvidos.
+
+    Guarda apenas IDs (nunca instâncias do ORM, que pertencem a uma sessão), então
+    chamadas repetidas do mesmo usuário evitam a consulta de User/Player. Usuários
+    sem jogador não são guardados, para que o jogador recém-criado apareça na
+    próxima requisição.
+    """
+
+    ttl_seconds = 30
+    max_entries = 10000
+
+    @staticmethod
+    def configure(app):
+        PrincipalCache.ttl_seconds = app.config.get('AUTH_PRINCIPAL_TTL_SECONDS', PrincipalCache.ttl_seconds)
+        PrincipalCache.max_entries = app.config.get('AUTH_PRINCIPAL_CACHE_SIZE', PrincipalCache.max_entries)
+
+    @staticmethod
+    def get(user_id):
+        now = time.monotonic()
+        with _lock:
+            entry = _cache.get(user_id)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= now:
+                del _cache[user_id]
+                return None
+            _cache.move_to_end(user_id)
+            return principal
+
+    @staticmethod
+    def put(principal):
+        if PrincipalCache.ttl_seconds <= 0:
+            return
+        with _lock:
+            _cache[principal.user_id] = (time.monotonic() + PrincipalCache.ttl_seconds, principal)
+            _cache.move_to_end(principal.user_id)
+            while len(_cache) > PrincipalCache.max_entries:
+                _cache.popitem(last=False)
+
+    @staticmethod
+    def invalidate(user_id):
+        """Remove o principal do usuário (ex.: usuário ou jogador excluído)."""
+        with _lock:
+            _cache.pop(user_id, None)
+
+    @staticmethod
+    def clear():
+        with _lock:
+            _cache.clear()
+
+
+def current_principal():
+    """
+    Principal da requisição autenticada por token_required (resolvido uma vez e guardado em g).
+
+    Returns:
+        Principal: Identidade autenticada, ou None se o usuário não existir
+    """
+    if 'principal' in g:
+        return g.principal
+
+    payload = getattr(request, 'token_payload', None) or {}
+    user_id = payload.get('user_id')
+    principal = PrincipalCache.get(user_id) if user_id is not None else None
+
+    if principal is None and user_id is not None:
+        # Usuário e jogador em uma única consulta. players.user_id é declarado unique
+        # no modelo, mas a consulta não depende disso: havendo mais de um jogador para
+        # o usuário, escolhe sempre o mais antigo (menor id)
+        row = db.session.query(User.id, Player.id).outerjoin(
+            Player, Player.user_id == User.id
+        ).filter(User.id == user_id).order_by(Player.id).first()
+
+        if row:
+            principal = Principal(user_id, row[1])
+            if principal.player_id is not None:
+                PrincipalCache.put(principal)
+
+    g.principal = principal
+    return principal
+
+
+def current_player():
+    """
+    Jogador do usuário autenticado, carregado pela chave primária uma vez por requisição.
+
+    Returns:
+        Player: O jogador, ou None se o usuário ainda não tiver um
+    """
+    if 'current_player' in g:
+        return g.current_player
+
+    principal = current_principal()
+    player = None
+    if principal is not None and principal.player_id is not None:
+        player = db.session.get(Player, principal.player_id)
+        if player is None:
+            # Jogador excluído depois de entrar no cache
+            PrincipalCache.invalidate(principal.user_id)
+
+    g.current_player = player
+    return player
@@ -0,0 +1,171 @@
+import re
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Listas de parâmetros de tamanho variável (IN (?, ?, ?)) contam como o mesmo formato
+_PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+# Tamanho máximo do SQL guardado no relatório por endpoint
+MAX_STATEMENT_LENGTH = 300
+
+_lock = threading.Lock()
+# Agregado por endpoint: 'MÉTODO /rota' -> estatísticas
+_endpoints = {}
+
+
+def statement_shape(statement):
+    """Normaliza um comando SQL para agrupar execuções que diferem apenas nos parâmetros."""
+    return _PARAMETER_LIST.sub('(?)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class QueryProfiler:
+    """
+    Contagem de consultas SQL por requisição e detecção de padrões N+1.
+
+    Eventos do SQLAlchemy registram cada comando executado durante a requisição:
+    quantidade, tempo total no banco e quantas vezes cada formato de comando se
+    repetiu. Um formato repetido n_plus_one_threshold vezes ou mais na mesma
+    requisição é reportado como suspeita de N+1. Os totais são acumulados por
+    endpoint e, em modo debug (ou com QUERY_PROFILER_HEADERS), enviados nos
+    cabeçalhos X-Query-* da resposta.
+    """
+
+    n_plus_one_threshold = 10
+    headers_enabled = False
+
+    _app = None
+    _listening = False
+
+    @staticmethod
+    def init_app(app):
+        """Registra os hooks da aplicação e os eventos do SQLAlchemy."""
+        QueryProfiler._app = app
+        QueryProfiler.n_plus_one_threshold = app.config.get('QUERY_N_PLUS_ONE_THRESHOLD', QueryProfiler.n_plus_one_threshold)
+        QueryProfiler.headers_enabled = app.config.get('QUERY_PROFILER_HEADERS', False)
+
+        app.before_request(QueryProfiler._begin_request)
+        app.after_request(QueryProfiler._end_request)
+
+        if not QueryProfiler._listening:
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+            QueryProfiler._listening = True
+
+    @staticmethod
+    def _begin_request():
+        g.query_profile = {'count': 0, 'seconds': 0.0, 'shapes': {}}
+
+    @staticmethod
+    def _end_request(response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+
+        endpoint = f'{request.method} {request.url_rule.rule}' if request.url_rule else 'unmatched'
+        duplicates = sum(count - 1 for count in profile['shapes'].values() if count > 1)
+        worst_shape, worst_count = max(profile['shapes'].items(), key=lambda item: item[1], default=(None, 0))
+        suspected = worst_count >= QueryProfiler.n_plus_one_threshold
+
+        if suspected:
+            QueryProfiler._app.logger.warning(
+                'Possible N+1 in %s: %d executions of %s',
+                endpoint, worst_count, worst_shape[:MAX_STATEMENT_LENGTH]
+            )
+
+        QueryProfiler._record(endpoint, profile, duplicates, worst_shape, worst_count, suspected)
+
+        if QueryProfiler.headers_enabled or QueryProfiler._app.debug:
+            response.headers['X-Query-Count'] = str(profile['count'])
+            response.headers['X-Query-Time-Ms'] = f"{profile['seconds'] * 1000:.2f}"
+            response.headers['X-Query-Duplicates'] = str(duplicates)
+            if suspected:
+                response.headers['X-Query-N-Plus-One'] = str(worst_count)
+
+        return response
+
+    @staticmethod
+    def _record(endpoint, profile, duplicates, worst_shape, worst_count, suspected):
+        with _lock:
+            stats = _endpoints.setdefault(endpoint, {
+                'requests': 0,
+                'queries': 0,
+                'max_queries': 0,
+                'db_seconds': 0.0,
+                'duplicates': 0,
+                'n_plus_one_requests': 0,
+                'worst_statement': None,
+                'worst_statement_count': 0
+            })
+            stats['requests'] += 1
+            stats['queries'] += profile['count']
+            stats['max_queries'] = max(stats['max_queries'], profile['count'])
+            stats['db_seconds'] += profile['seconds']
+            stats['duplicates'] += duplicates
+            if suspected:
+                stats['n_plus_one_requests'] += 1
+            if worst_count > stats['worst_statement_count']:
+                stats['worst_statement'] = worst_shape[:MAX_STATEMENT_LENGTH]
+                stats['worst_statement_count'] = worst_count
+
+    @staticmethod
+    def report():
+        """
+        Relatório agregado por endpoint, ordenado pelo total de consultas.
+
+        Returns:
+            list: Estatísticas de cada endpoint desde o início do processo (ou do último reset)
+        """
+        with _lock:
+            items = [(endpoint, dict(stats)) for endpoint, stats in _endpoints.items()]
+
+        report = []
+        for endpoint, stats in items:
+            requests = stats['requests']
+            report.append({
+                'endpoint': endpoint,
+                'requests': requests,
+                'queries': stats['queries'],
+                'avg_queries': round(stats['queries'] / requests, 2),
+                'max_queries': stats['max_queries'],
+                'db_time_ms': round(stats['db_seconds'] * 1000, 2),
+                'avg_db_time_ms': round(stats['db_seconds'] * 1000 / requests, 2),
+                'duplicates': stats['duplicates'],
+                'n_plus_one_requests': stats['n_plus_one_requests'],
+                'worst_statement': stats['worst_statement'],
+                'worst_statement_count': stats['worst_statement_count']
+            })
+
+        report.sort(key=lambda item: item['queries'], reverse=True)
+        return report
+
+    @staticmethod
+    def reset():
+        with _lock:
+            _endpoints.clear()
+
+
+def _current_profile():
+    if not has_request_context():
+        return None
+    return g.get('query_profile')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile() is not None:
+        conn.info.setdefault('query_profiler_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile()
+    starts = conn.info.get('query_profiler_start')
+    if profile is None or not starts:
+        return
+
+    profile['count'] += 1
+    profile['seconds'] += time.perf_counter() - starts.pop()
+    shape = statement_shape(statement)
+    profile['shapes'][shape] = profile['shapes'].get(shape, 0) + 1
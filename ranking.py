@@ -0,0 +1,481 @@
+import random
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database import db
+from models.player import Player
+from models.level import PlayerLevel
+from models.mining_leaderboard import MiningLeaderboardEntry, RANK_PENDING_KEY
+from utils.background import PeriodicTask
+
+# Estatísticas de PlayerLevel mantidas em memória para montar as respostas
+STAT_FIELDS = (
+    'current_level',
+    'current_phase',
+    'experience_points',
+    'total_monsters_killed',
+    'total_players_killed',
+    'last_level_up'
+)
+
+# Critérios de cada ranking: (estatística principal, estatística de desempate)
+RANKING_TYPES = {
+    'level': ('current_level', 'experience_points'),
+    'monsters': ('total_monsters_killed', 'current_level'),
+    'players': ('total_players_killed', 'current_level')
+}
+
+# Chave em Session.info onde as alterações de PlayerLevel aguardam o commit
+_PENDING_KEY = 'leaderboard_pending_stats'
+
+
+class _SkipNode:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        # Quantidade de posições avançadas ao seguir cada ligação
+        self.width = [0] * level
+
+
+class IndexableSkipList:
+    """
+    Skip list ordenada com larguras nas ligações (order-statistic).
+
+    Inserção, remoção, posição de uma chave e acesso por índice em O(log n)
+    esperado. As chaves devem ser únicas e comparáveis entre si.
+    """
+
+    max_levels = 32
+
+    def __init__(self):
+        self._head = _SkipNode(None, self.max_levels)
+        self._level = 1
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _random_level(self):
+        level = 1
+        while level < self.max_levels and random.random() < 0.5:
+            level += 1
+        return level
+
+    def _search(self, key):
+        """Retorna os predecessores da chave em cada nível e as posições deles."""
+        update = [self._head] * self.max_levels
+        ranks = [0] * self.max_levels
+        node = self._head
+        position = 0
+
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and node.next[i].key < key:
+                position += node.width[i]
+                node = node.next[i]
+            update[i] = node
+            ranks[i] = position
+
+        return update, ranks
+
+    def insert(self, key):
+        update, ranks = self._search(key)
+        position = ranks[0]
+
+        level = self._random_level()
+        if level > self._level:
+            # Novos níveis começam na cabeça (posição 0, sem sucessor)
+            self._level = level
+
+        node = _SkipNode(key, level)
+        for i in range(level):
+            previous = update[i]
+            node.next[i] = previous.next[i]
+            previous.next[i] = node
+            if node.next[i] is not None:
+                node.width[i] = ranks[i] + previous.width[i] - position
+            previous.width[i] = position + 1 - ranks[i]
+
+        for i in range(level, self._level):
+            if update[i].next[i] is not None:
+                update[i].width[i] += 1
+
+        self._size += 1
+
+    def remove(self, key):
+        """Remove a chave; retorna False se ela não estiver na lista."""
+        update, _ = self._search(key)
+        target = update[0].next[0]
+        if target is None or target.key != key:
+            return False
+
+        for i in range(self._level):
+            previous = update[i]
+            if previous.next[i] is target:
+                previous.width[i] += target.width[i] - 1
+                previous.next[i] = target.next[i]
+            elif previous.next[i] is not None:
+                previous.width[i] -= 1
+
+        while self._level > 1 and self._head.next[self._level - 1] is None:
+            self._level -= 1
+
+        self._size -= 1
+        return True
+
+    def index(self, key):
+        """Posição da chave (0 = primeira), ou None se ela não estiver na lista."""
+        update, ranks = self._search(key)
+        candidate = update[0].next[0]
+        if candidate is None or candidate.key != key:
+            return None
+        return ranks[0]
+
+    def _node_at(self, index):
+        target = index + 1
+        node = self._head
+        position = 0
+
+        for i in range(self._level - 1, -1, -1):
+            while node.next[i] is not None and position + node.width[i] <= target:
+                position += node.width[i]
+                node = node.next[i]
+
+        return node
+
+    def slice(self, start, count):
+        """Retorna até count chaves a partir da posição start."""
+        if start < 0 or start >= self._size or count <= 0:
+            return []
+
+        keys = []
+        node = self._node_at(start)
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+
+class _Board:
+    """Estruturas de ranking de todos os tipos, trocadas por inteiro na reconstrução."""
+
+    def __init__(self):
+        self.lists = {ranking_type: IndexableSkipList() for ranking_type in RANKING_TYPES}
+        self.keys = {ranking_type: {} for ranking_type in RANKING_TYPES}
+        self.stats = {}
+
+    def put(self, player_id, stats):
+        if player_id in self.stats:
+            self.discard(player_id)
+        if stats is None:
+            return
+
+        self.stats[player_id] = stats
+        for ranking_type, (primary, secondary) in RANKING_TYPES.items():
+            # Ordem crescente da skip list: estatísticas negadas, player_id no desempate
+            key = (-stats[primary], -stats[secondary], player_id)
+            self.keys[ranking_type][player_id] = key
+            self.lists[ranking_type].insert(key)
+
+    def discard(self, player_id):
+        self.stats.pop(player_id, None)
+        for ranking_type in RANKING_TYPES:
+            key = self.keys[ranking_type].pop(player_id, None)
+            if key is not None:
+                self.lists[ranking_type].remove(key)
+
+
+class _MiningBoard:
+    """Ranking de mineração: total minerado desc, player_id desc no desempate."""
+
+    def __init__(self):
+        self.list = IndexableSkipList()
+        self.keys = {}
+
+    def put(self, player_id, units):
+        key = self.keys.pop(player_id, None)
+        if key is not None:
+            self.list.remove(key)
+        key = (-units, -player_id)
+        self.keys[player_id] = key
+        self.list.insert(key)
+
+
+_lock = threading.RLock()
+_board = None
+# Um diário por reconstrução em andamento: alterações aplicadas durante a leitura
+# do banco, reaplicadas no novo ranking (reconstruções podem se sobrepor)
+_journals = []
+_mining_board = None
+_mining_journals = []
+
+
+def _stats_of(source):
+    """Extrai as estatísticas de ranking de um PlayerLevel (ou linha com os mesmos campos)."""
+    stats = {field: getattr(source, field) for field in STAT_FIELDS}
+    for field in STAT_FIELDS:
+        if field != 'last_level_up' and stats[field] is None:
+            stats[field] = 1 if field in ('current_level', 'current_phase') else 0
+    return stats
+
+
+class LeaderboardEngine:
+    """
+    Rankings de PlayerLevel mantidos em memória.
+
+    Cada tipo de ranking é uma skip list indexável, então as páginas, a posição de
+    um jogador e os vizinhos dele custam O(log n) em vez de ordenar a tabela a cada
+    requisição. As alterações de PlayerLevel são aplicadas após o commit da sessão
+    que as gravou. Cada processo mantém sua própria cópia, reconstruída a partir do
+    banco na inicialização e periodicamente (para incorporar alterações feitas por
+    outros processos).
+    """
+
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """Carrega os rankings e inicia a reconstrução periódica."""
+        with app.app_context():
+            LeaderboardEngine.rebuild()
+
+            MiningRanking.rebuild()
+
+        if LeaderboardEngine._task is None:
+            LeaderboardEngine._task = PeriodicTask(
+                'leaderboard_rebuild',
+                app.config.get('LEADERBOARD_REBUILD_SECONDS', 300),
+                LeaderboardEngine.rebuild_all
+            )
+
+        LeaderboardEngine._task.start(app)
+
+    @staticmethod
+    def rebuild_all():
+        """Reconstrói os rankings de PlayerLevel e o de mineração."""
+        LeaderboardEngine.rebuild()
+        MiningRanking.rebuild()
+
+    @staticmethod
+    def rebuild():
+        """
+        Reconstrói todos os rankings a partir do banco com uma única consulta.
+
+        Returns:
+            int: Quantidade de jogadores no ranking
+        """
+        global _board
+
+        journal = []
+        with _lock:
+            _journals.append(journal)
+
+        try:
+            rows = db.session.query(
+                PlayerLevel.player_id,
+                *[getattr(PlayerLevel, field) for field in STAT_FIELDS]
+            ).join(Player, Player.id == PlayerLevel.player_id).all()
+
+            board = _Board()
+            for row in rows:
+                board.put(row.player_id, _stats_of(row))
+
+            with _lock:
+                # Alterações confirmadas durante a leitura prevalecem sobre ela
+                for player_id, stats in journal:
+                    board.put(player_id, stats)
+                _board = board
+        finally:
+            with _lock:
+                _journals.remove(journal)
+
+        return len(rows)
+
+    @staticmethod
+    def _ensure_loaded():
+        if _board is None:
+            LeaderboardEngine.rebuild()
+
+    @staticmethod
+    def apply(changes):
+        """
+        Aplica alterações confirmadas no banco.
+
+        Args:
+            changes: dict player_id -> estatísticas (ou None para remover o jogador)
+        """
+        with _lock:
+            for player_id, stats in changes.items():
+                for journal in _journals:
+                    journal.append((player_id, stats))
+                if _board is not None:
+                    _board.put(player_id, stats)
+
+    @staticmethod
+    def size(ranking_type):
+        LeaderboardEngine._ensure_loaded()
+        with _lock:
+            return len(_board.lists[ranking_type])
+
+    @staticmethod
+    def page(ranking_type, offset, limit):
+        """
+        Retorna uma página do ranking.
+
+        Returns:
+            list: Tuplas (posição, player_id, estatísticas), posição começando em 1
+        """
+        LeaderboardEngine._ensure_loaded()
+        with _lock:
+            keys = _board.lists[ranking_type].slice(offset, limit)
+            return [
+                (offset + i + 1, key[-1], dict(_board.stats[key[-1]]))
+                for i, key in enumerate(keys)
+            ]
+
+    @staticmethod
+    def rank_of(ranking_type, player_id):
+        """Posição do jogador no ranking (1 = primeiro), ou None se ele não estiver nele."""
+        LeaderboardEngine._ensure_loaded()
+        with _lock:
+            key = _board.keys[ranking_type].get(player_id)
+            if key is None:
+                return None
+            return _board.lists[ranking_type].index(key) + 1
+
+    @staticmethod
+    def stats_of(player_id):
+        LeaderboardEngine._ensure_loaded()
+        with _lock:
+            stats = _board.stats.get(player_id)
+            return dict(stats) if stats else None
+
+    @staticmethod
+    def around(ranking_type, player_id, radius):
+        """
+        Retorna os jogadores até radius posições acima e abaixo do jogador.
+
+        Returns:
+            list: Tuplas (posição, player_id, estatísticas); vazia se o jogador não estiver no ranking
+        """
+        LeaderboardEngine._ensure_loaded()
+        with _lock:
+            key = _board.keys[ranking_type].get(player_id)
+            if key is None:
+                return []
+            start = max(_board.lists[ranking_type].index(key) - radius, 0)
+            keys = _board.lists[ranking_type].slice(start, 2 * radius + 1)
+            return [
+                (start + i + 1, key[-1], dict(_board.stats[key[-1]]))
+                for i, key in enumerate(keys)
+            ]
+
+
+class MiningRanking:
+    """
+    Posição no ranking de mineração em O(log n), sem varrer mining_leaderboard.
+
+    Cópia em memória da tabela mining_leaderboard mantida como o LeaderboardEngine:
+    carregada do banco e reconstruída periodicamente junto com ele, e atualizada
+    após o commit das transações que alteram as chaves de ranking
+    (MiningLeaderboardEntry.sync e add).
+    """
+
+    @staticmethod
+    def rebuild():
+        """
+        Recarrega o ranking de mineração a partir do banco.
+
+        Returns:
+            int: Quantidade de jogadores no ranking
+        """
+        global _mining_board
+
+        journal = []
+        with _lock:
+            _mining_journals.append(journal)
+
+        try:
+            rows = db.session.query(
+                MiningLeaderboardEntry.player_id,
+                MiningLeaderboardEntry.total_mined_units
+            ).all()
+
+            board = _MiningBoard()
+            for player_id, units in rows:
+                board.put(player_id, units)
+
+            with _lock:
+                for player_id, units in journal:
+                    board.put(player_id, units)
+                _mining_board = board
+        finally:
+            with _lock:
+                _mining_journals.remove(journal)
+
+        return len(rows)
+
+    @staticmethod
+    def apply(changes):
+        """
+        Aplica totais confirmados no banco.
+
+        Args:
+            changes: dict player_id -> total minerado em unidades de ponto fixo
+        """
+        with _lock:
+            for player_id, units in changes.items():
+                for journal in _mining_journals:
+                    journal.append((player_id, units))
+                if _mining_board is not None:
+                    _mining_board.put(player_id, units)
+
+    @staticmethod
+    def rank_of(player_id):
+        """Posição do jogador (1 = primeiro), ou None se ele não estiver no ranking."""
+        if _mining_board is None:
+            MiningRanking.rebuild()
+        with _lock:
+            key = _mining_board.keys.get(player_id)
+            if key is None:
+                return None
+            return _mining_board.list.index(key) + 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_player_levels(session, flush_context):
+    changes = {}
+    for obj in session.new | session.dirty:
+        if isinstance(obj, PlayerLevel):
+            changes[obj.player_id] = _stats_of(obj)
+    for obj in session.deleted:
+        if isinstance(obj, PlayerLevel):
+            changes[obj.player_id] = None
+
+    if changes:
+        session.info.setdefault(_PENDING_KEY, {}).update(changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_player_levels(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        LeaderboardEngine.apply(pending)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_player_levels(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_mining_ranks(session):
+    pending = session.info.pop(RANK_PENDING_KEY, None)
+    if pending:
+        MiningRanking.apply(pending)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_mining_ranks(session, previous_transaction):
+    session.info.pop(RANK_PENDING_KEY, None)
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+_lock = threading.Lock()
+# player_id -> (expira_em, pontuação), em ordem de uso (LRU)
+_scores = OrderedDict()
+
+
+class RiskScoreService:
+    """
+    Pontuações de risco de fraude por jogador, com TTL e consulta O(1).
+
+    O FraudDetector atualiza a pontuação do jogador a cada lote de ações
+    analisado; as rotas (anúncios, mineração) apenas leem o valor guardado. Uma
+    pontuação expirada ou ausente é recalculada a partir do estado do jogador por
+    quem a consulta, então o TTL também limita quanto o fator de idade da conta
+    pode ficar desatualizado.
+
+    A atividade suspeita que compõe a pontuação só cresce, então por padrão as
+    rotas apenas registram pontuações altas; o bloqueio depende de enforce.
+    """
+
+    ttl_seconds = 60
+    max_entries = 100000
+    # Bloquear anúncios e mineração acima de HIGH_RISK_SCORE (em vez de apenas registrar)
+    enforce = False
+
+    @staticmethod
+    def configure(app):
+        RiskScoreService.ttl_seconds = app.config.get('FRAUD_RISK_SCORE_TTL_SECONDS', RiskScoreService.ttl_seconds)
+        RiskScoreService.max_entries = app.config.get('FRAUD_RISK_SCORE_CACHE_SIZE', RiskScoreService.max_entries)
+        RiskScoreService.enforce = app.config.get('FRAUD_RISK_SCORE_ENFORCE', RiskScoreService.enforce)
+
+    @staticmethod
+    def get(player_id):
+        """Pontuação guardada do jogador, ou None se ausente ou expirada."""
+        now = time.monotonic()
+        with _lock:
+            entry = _scores.get(player_id)
+            if entry is None:
+                return None
+            expires_at, score = entry
+            if expires_at <= now:
+                del _scores[player_id]
+                return None
+            _scores.move_to_end(player_id)
+            return score
+
+    @staticmethod
+    def put(player_id, score):
+        with _lock:
+            _scores[player_id] = (time.monotonic() + RiskScoreService.ttl_seconds, score)
+            _scores.move_to_end(player_id)
+            while len(_scores) > RiskScoreService.max_entries:
+                _scores.popitem(last=False)
+
+    @staticmethod
+    def invalidate(player_id):
+        with _lock:
+            _scores.pop(player_id, None)
+
+    @staticmethod
+    def clear():
+        with _lock:
+            _scores.clear()
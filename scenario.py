@@ -2,8 +2,8 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from models.user import db
 from models.scenario import Scenario, Monster, ScenarioReward, PlayerScenarioProgress, ScenarioType, MonsterType
-from models.player import Player
 from models.item import CollectibleCard, Item
+from utils.principal import current_player
 from utils.security import token_required, log_security_event
 from utils.fraud_detection import FraudDetector
 
@@ -134,11 +134,8 @@ def get_scenario_monsters(scenario_id):
 def get_scenario_progress(scenario_id):
     """Obtém o progresso do jogador em um cenário específico."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -180,11 +177,8 @@ def get_scenario_progress(scenario_id):
 def start_scenario(scenario_id):
     """Inicia um cenário para o jogador."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
@@ -239,7 +233,7 @@ def start_scenario(scenario_id):
         log_security_event('scenario_started', 
                           f'Player {player.id} started scenario {scenario_id}', 
                           'info',
-                          user_id=user_id)
+                          user_id=player.user_id)
         
         return jsonify({
             'message': 'Scenario started successfully',
@@ -335,11 +329,8 @@ def get_monster_types():
 def get_player_all_progress():
     """Obtém o progresso do jogador em todos os cenários."""
     try:
-        # Obter o ID do jogador do token
-        user_id = request.token_payload.get('user_id')
-        
         # Buscar o jogador
-        player = Player.query.filter_by(user_id=user_id).first()
+        player = current_player()
         if not player:
             return jsonify({'error': 'Player not found'}), 404
         
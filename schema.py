@@ -0,0 +1,37 @@
+from database import db
+
+# Índices que precisam existir também em bancos criados antes de sua declaração
+# (db.create_all() não cria índices novos em tabelas já existentes)
+_indexes = []
+# Migrações de dados idempotentes, executadas antes da criação dos índices
+_migrations = []
+
+
+def register_index(index):
+    """
+    Registra um índice para ser criado em bancos já existentes.
+
+    Args:
+        index: Instância de db.Index associada a uma tabela
+
+    Returns:
+        db.Index: O próprio índice, para permitir uso em atribuições
+    """
+    _indexes.append(index)
+    return index
+
+
+def register_migration(func):
+    """Decorator que registra uma migração idempotente executada na inicialização."""
+    _migrations.append(func)
+    return func
+
+
+def apply_schema_updates():
+    """Aplica as migrações registradas e cria os índices ausentes."""
+    for migration in _migrations:
+        migration()
+        db.session.commit()
+
+    for index in _indexes:
+        index.create(bind=db.engine, checkfirst=True)
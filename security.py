@@ -5,7 +5,7 @@ import ipaddress
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
 
 # Dicionário para armazenar tentativas de login por IP
 login_attempts = {}
@@ -63,19 +63,50 @@ def generate_token(user_id, is_admin=False, expiration_hours=24):
     return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
 
 def verify_token(token):
-    """Verifica se um token JWT é válido."""
+    """Verifica se um token JWT é válido (tokens de escopo restrito não são aceitos)."""
     try:
         payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+        if 'scope' in payload:
+            return None
         return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
-def token_required(f):
-    """Decorator para rotas que requerem autenticação por token."""
-    @wraps(f)
-    def decorated(*args, **kwargs):
+def generate_scoped_token(user_id, scope, expiration_seconds=60):
+    """
+    Gera um token JWT de curta duração válido apenas para um escopo (ex.: 'mining_stream').
+    
+    Usado onde o token precisa ir na URL (EventSource não envia headers), para que o
+    token principal não apareça em logs de acesso e de proxies.
+    """
+    payload = {
+        'user_id': user_id,
+        'scope': scope,
+        'exp': datetime.utcnow() + timedelta(seconds=expiration_seconds)
+    }
+    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+def verify_scoped_token(token, scope):
+    """Verifica um token gerado por generate_scoped_token para o escopo informado."""
+    try:
+        payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+    if payload.get('scope') != scope:
+        return None
+    return payload
+
+def _request_token_payload():
+    """
+    Extrai e decodifica o token da requisição uma única vez; decorators empilhados
+    (token_required + admin_required) reutilizam o resultado guardado em g.
+    
+    Returns:
+        tuple: (token presente, payload ou None)
+    """
+    if 'auth_token' not in g:
         token = None
         
         # Verificar se o token está no header Authorization
@@ -84,10 +115,19 @@ def token_required(f):
             if auth_header.startswith('Bearer '):
                 token = auth_header.split(' ')[1]
         
-        if not token:
+        g.auth_token = (bool(token), verify_token(token) if token else None)
+    
+    return g.auth_token
+
+def token_required(f):
+    """Decorator para rotas que requerem autenticação por token."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        has_token, payload = _request_token_payload()
+        
+        if not has_token:
             return jsonify({'error': 'Token is missing'}), 401
         
-        payload = verify_token(token)
         if not payload:
             return jsonify({'error': 'Token is invalid or expired'}), 401
         
@@ -102,18 +142,11 @@ def admin_required(f):
     """Decorator para rotas que requerem privilégios de administrador."""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Verificar se o token está no header Authorization
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
+        has_token, payload = _request_token_payload()
         
-        if not token:
+        if not has_token:
             return jsonify({'error': 'Token is missing'}), 401
         
-        payload = verify_token(token)
         if not payload:
             return jsonify({'error': 'Token is invalid or expired'}), 401
         
@@ -222,7 +255,7 @@ def is_ip_in_blacklist(ip_address):
     
     return ip_address in blacklist
 
-def log_security_event(event_type, details, severity='info'):
+def log_security_event(event_type, details, severity='info', user_id=None):
     """
     Registra eventos de segurança para análise posterior.
     Severidade pode ser: 'info', 'warning', 'error', 'critical'
@@ -233,7 +266,8 @@ def log_security_event(event_type, details, severity='info'):
         'event_type': event_type,
         'details': details,
         'severity': severity,
-        'ip_address': request.remote_addr if request else 'unknown'
+        'ip_address': request.remote_addr if request else 'unknown',
+        'user_id': user_id
     }
     
     # Por enquanto, apenas imprimimos o evento
@@ -1,5 +1,7 @@
+import json
 from database import db
 from datetime import datetime
+from utils.schema import register_index
 
 class SecurityLog(db.Model):
     """Modelo para armazenar logs de segurança e eventos relacionados."""
@@ -58,13 +60,39 @@ class FraudAlert(db.Model):
             'timestamp': self.timestamp.isoformat(),
             'player_id': self.player_id,
             'alert_type': self.alert_type,
-            'details': self.details,
+            'details': self._decoded_details(),
             'risk_score': self.risk_score,
             'reviewed': self.reviewed,
             'reviewed_by': self.reviewed_by,
             'review_timestamp': self.review_timestamp.isoformat() if self.review_timestamp else None,
             'action_taken': self.action_taken
         }
+    
+    def _decoded_details(self):
+        # Alertas do FraudDetector guardam os detalhes como JSON
+        try:
+            return json.loads(self.details) if self.details else None
+        except ValueError:
+            return self.details
+
+# Listagem de alertas (todos, pendentes/revisados e por jogador), mais recentes primeiro
+register_index(db.Index('ix_fraud_alerts_reviewed_timestamp', FraudAlert.__table__.c.reviewed, FraudAlert.__table__.c.timestamp))
+register_index(db.Index('ix_fraud_alerts_player_timestamp', FraudAlert.__table__.c.player_id, FraudAlert.__table__.c.timestamp))
+register_index(db.Index('ix_fraud_alerts_timestamp', FraudAlert.__table__.c.timestamp))
+
+class FraudPlayerState(db.Model):
+    """Estado de detecção de fraude de um jogador, compartilhado entre os workers (JSON)."""
+    
+    __tablename__ = 'fraud_player_states'
+    
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), primary_key=True)
+    # Incrementada a cada gravação (compare-and-set entre workers)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    state = db.Column(db.Text, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<FraudPlayerState for Player {self.player_id}>'
 
 class LoginAttempt(db.Model):
     """Modelo para armazenar tentativas de login para análise de segurança."""
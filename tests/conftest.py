@@ -0,0 +1,73 @@
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Os módulos são importados como no servidor (main, models.*, utils.*)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Banco SQLite descartável e nenhuma tarefa de fundo: os testes chamam as passagens diretamente
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='dooficoin-tests-'), 'app.db')}")
+for flag in (
+    'MINING_SCHEDULER_ENABLED',
+    'MINING_RETENTION_ENABLED',
+    'LEDGER_SNAPSHOTS_ENABLED',
+    'WITHDRAWAL_QUEUE_ENABLED',
+    'COUNTER_CACHE_ENABLED',
+    'LEADERBOARD_ENGINE_ENABLED',
+    'LEADERBOARD_SNAPSHOTS_ENABLED',
+    'FRAUD_PIPELINE_ENABLED'
+):
+    os.environ.setdefault(flag, '0')
+os.environ.setdefault('WITHDRAWAL_CHAIN_ADAPTER', 'utils.withdrawal_queue.LocalStubChainAdapter')
+
+_user_numbers = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def db(app):
+    """Contexto da aplicação com o esquema recriado ao fim de cada teste."""
+    from database import db as database
+    from utils.schema import apply_schema_updates
+
+    with app.app_context():
+        yield database
+        database.session.remove()
+        # Recriado em vez de esvaziado: ledger_entries recusa DELETE (trigger append-only)
+        database.drop_all()
+        database.create_all()
+        apply_schema_updates()
+
+
+@pytest.fixture
+def make_player(db):
+    """Cria um usuário com seu jogador e, opcionalmente, saldo inicial."""
+    from models.user import User
+    from models.player import Player
+    from utils.balance import BalanceService
+
+    def factory(balance=None):
+        number = next(_user_numbers)
+        user = User(username=f'player{number}', email=f'player{number}@example.com')
+        db.session.add(user)
+        db.session.flush()
+
+        player = Player(user_id=user.id, username=user.username)
+        db.session.add(player)
+        db.session.flush()
+
+        if balance is not None:
+            BalanceService.credit(player.id, balance, reason='adjustment')
+        db.session.commit()
+        return player
+
+    return factory
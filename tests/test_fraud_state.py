@@ -0,0 +1,113 @@
+import pytest
+
+from utils.fraud_state import FraudStateStore, MemoryBackend, SQLiteBackend
+
+PLAYER_ID = 7
+
+
+@pytest.fixture
+def store(db):
+    """FraudStateStore sobre o backend SQLite compartilhado, com cache local sempre válido."""
+    ttl = FraudStateStore.cache_ttl_seconds
+    FraudStateStore.cache_ttl_seconds = 3600
+    FraudStateStore.set_backend(SQLiteBackend())
+    yield FraudStateStore
+    FraudStateStore.cache_ttl_seconds = ttl
+    FraudStateStore.set_backend(MemoryBackend())
+
+
+def _remote_write(backend, player_id, actions, suspicious=0):
+    """Simula outro worker: lê, altera e grava o estado com comparação de versão."""
+    version, state = backend.load_many([player_id])[player_id]
+    for action_type, timestamp in actions:
+        state.record(action_type, {}, timestamp)
+    state.suspicious_activity += suspicious
+    assert player_id in backend.save_many({player_id: (version, state)})
+
+
+def _stored(backend, player_id):
+    return backend.load_many([player_id])[player_id]
+
+
+def test_flush_saves_pending_states(store):
+    store.record(PLAYER_ID, 'kill_monster', {}, 100.0)
+    store.record(PLAYER_ID, 'kill_monster', {}, 101.0)
+
+    assert store.pending_count() == 1
+    assert store.flush() == 1
+    assert store.pending_count() == 0
+
+    version, state = _stored(store.get_backend(), PLAYER_ID)
+    assert version == 1
+    assert state.total_actions == 2
+
+
+def test_conflict_reapplies_local_actions_over_the_remote_state(store):
+    backend = store.get_backend()
+    store.record(PLAYER_ID, 'kill_monster', {}, 100.0)
+    store.flush()
+
+    # Outro worker grava depois da nossa leitura
+    _remote_write(backend, PLAYER_ID, [('buy_item', 200.0)], suspicious=10)
+
+    store.record(PLAYER_ID, 'kill_monster', {}, 150.0)
+    store.get(PLAYER_ID).suspicious_activity += 5
+    store.mark_dirty(PLAYER_ID)
+
+    # Primeira gravação: conflito, mescla e continua pendente
+    assert store.flush() == 0
+    assert store.pending_count() == 1
+    assert store.flush() == 1
+
+    version, state = _stored(backend, PLAYER_ID)
+    assert version == 3
+    assert state.total_actions == 3
+    assert state.action_counts == {'kill_monster': 2, 'buy_item': 1}
+    assert state.suspicious_activity == 15
+    # O objeto em cache foi atualizado no lugar com o estado mesclado
+    assert store.get(PLAYER_ID).total_actions == 3
+
+
+def test_conflict_on_a_state_created_by_both_workers(store):
+    backend = store.get_backend()
+    store.record(PLAYER_ID, 'kill_monster', {}, 100.0)
+
+    # Outro worker cria o estado do mesmo jogador primeiro
+    from utils.fraud_detection import PlayerFraudState
+    remote = PlayerFraudState()
+    remote.record('earn_coins', {'amount': 1}, 90.0)
+    assert backend.save_many({PLAYER_ID: (None, remote)}) == {PLAYER_ID: 1}
+
+    assert store.flush() == 0
+    assert store.flush() == 1
+
+    _, state = _stored(backend, PLAYER_ID)
+    assert state.action_counts == {'earn_coins': 1, 'kill_monster': 1}
+
+
+def test_actions_recorded_during_a_flush_are_not_lost(store):
+    backend = store.get_backend()
+    store.record(PLAYER_ID, 'kill_monster', {}, 100.0)
+    store.flush()
+    store.record(PLAYER_ID, 'kill_monster', {}, 101.0)
+
+    save_many = backend.save_many
+
+    def save_while_recording(states):
+        # Outra thread registra uma ação (com o cache vencido) enquanto o lote é gravado
+        FraudStateStore.cache_ttl_seconds = 0
+        store.record(PLAYER_ID, 'kill_monster', {}, 102.0)
+        return save_many(states)
+
+    backend.save_many = save_while_recording
+    try:
+        assert store.flush() == 1
+    finally:
+        backend.save_many = save_many
+        FraudStateStore.cache_ttl_seconds = 3600
+
+    assert store.pending_count() == 1
+    store.flush()
+
+    _, state = _stored(backend, PLAYER_ID)
+    assert state.total_actions == 3
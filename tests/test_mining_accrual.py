@@ -0,0 +1,99 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.mining_accrual import MiningAccrual
+
+INTERVAL = 600
+
+
+@pytest.fixture
+def mining_session(db, make_player):
+    """Sessão ativa com seis intervalos vencidos e nenhum pago, a 1 DOOF por intervalo."""
+    from models.mining import MiningSession
+
+    now = datetime(2025, 6, 1, 12, 0, 0)
+    player = make_player()
+    session = MiningSession(
+        player_id=player.id,
+        start_time=now - timedelta(seconds=6 * INTERVAL),
+        next_reward_time=now - timedelta(seconds=5 * INTERVAL),
+        mining_interval_seconds=INTERVAL,
+        current_rate='1'
+    )
+    db.session.add(session)
+    db.session.commit()
+    return session, player, now
+
+
+def test_catch_up_pays_all_missed_intervals_once(db, mining_session):
+    session, player, now = mining_session
+
+    reward, paid = MiningAccrual.catch_up(session, player, now)
+    db.session.commit()
+
+    assert paid == 6
+    assert reward.amount == '6'
+    assert session.next_reward_time == now + timedelta(seconds=INTERVAL)
+
+    assert MiningAccrual.catch_up(session, player, now) == (None, 0)
+
+
+def test_claim_with_a_stale_session_is_refused(db, mining_session):
+    from models.mining import MiningSession
+
+    session, player, now = mining_session
+    assert session.next_reward_time == now - timedelta(seconds=5 * INTERVAL)
+
+    # Outro processo paga os intervalos depois da nossa leitura (o objeto não é recarregado)
+    table = MiningSession.__table__
+    db.session.execute(table.update().where(table.c.id == session.id).values(
+        next_reward_time=now + timedelta(seconds=INTERVAL)
+    ))
+
+    assert MiningAccrual.claim_intervals(session, now + timedelta(seconds=INTERVAL), '6') is False
+    # A sessão foi recarregada com o estado atual do banco
+    assert session.next_reward_time == now + timedelta(seconds=INTERVAL)
+
+
+def test_concurrent_catch_up_credits_the_intervals_once(app, db, mining_session):
+    from models.mining import MiningReward, MiningSession
+    from models.player import Player
+
+    session, player, now = mining_session
+    session_id, player_id = session.id, player.id
+    workers = 4
+    barrier = threading.Barrier(workers)
+    results = []
+    errors = []
+
+    def worker():
+        with app.app_context():
+            try:
+                own_session = db.session.get(MiningSession, session_id)
+                own_player = db.session.get(Player, player_id)
+                # Todos leem o mesmo next_reward_time antes de qualquer um reivindicar
+                barrier.wait()
+                _, paid = MiningAccrual.catch_up(own_session, own_player, now)
+                db.session.commit()
+                results.append(paid)
+            except Exception as e:
+                db.session.rollback()
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(results) == [0] * (workers - 1) + [6]
+
+    db.session.expire_all()
+    assert MiningReward.query.filter_by(session_id=session_id).count() == 1
+    assert db.session.get(Player, player_id).wallet_balance == '6'
+    assert db.session.get(MiningSession, session_id).total_mined == '6'
@@ -0,0 +1,81 @@
+from decimal import Decimal
+
+import pytest
+
+from utils.money import SCALE, WIDTH, decode_units, encode_units, from_units, to_units
+
+
+def test_to_units_scales_decimal_strings():
+    assert to_units('1') == SCALE
+    assert to_units('0.5') == SCALE // 2
+    assert to_units('0.000000000000000000000000000000000001') == 1
+    assert to_units(Decimal('2.25')) == 2 * SCALE + SCALE // 4
+    assert to_units(3) == 3 * SCALE
+
+
+def test_to_units_treats_empty_values_as_zero():
+    assert to_units(None) == 0
+    assert to_units('') == 0
+
+
+def test_to_units_truncates_below_the_scale():
+    assert to_units('0.0000000000000000000000000000000000019') == 1
+    assert to_units('1e-40') == 0
+
+
+def test_from_units_returns_plain_decimal_strings():
+    assert from_units(SCALE) == '1'
+    assert from_units(SCALE // 2) == '0.5'
+    assert from_units(1) == '0.000000000000000000000000000000000001'
+    assert from_units(0) == '0'
+
+
+@pytest.mark.parametrize('value', [
+    '0',
+    '1',
+    '0.1',
+    '123456789.987654321',
+    '0.00000000000000000000000000000000001',
+    '999999999999999999999999999999999999.999999999999999999999999999999999999'
+])
+def test_decimal_round_trip(value):
+    assert from_units(to_units(value)) == value
+
+
+def test_encode_units_is_fixed_width_and_order_preserving():
+    values = [0, 1, 9, 10, SCALE - 1, SCALE, 10 ** 70]
+    encoded = [encode_units(value) for value in values]
+
+    assert all(len(text) == WIDTH for text in encoded)
+    assert sorted(encoded) == encoded
+    assert [decode_units(text) for text in encoded] == values
+
+
+def test_encode_units_rejects_negative_amounts():
+    with pytest.raises(ValueError):
+        encode_units(-1)
+
+
+def test_decode_units_treats_empty_text_as_zero():
+    assert decode_units('') == 0
+    assert decode_units(None) == 0
+
+
+def test_sql_functions_add_and_sum_fixed_point_text(db):
+    half = encode_units(to_units('0.5'))
+    tiny = encode_units(1)
+
+    total = db.session.execute(db.select(db.func.doof_add(half, tiny))).scalar()
+    assert decode_units(total) == SCALE // 2 + 1
+
+    converted = db.session.execute(db.select(db.func.doof_units('0.25'))).scalar()
+    assert converted == encode_units(SCALE // 4)
+
+
+def test_doof_amount_column_round_trip(db, make_player):
+    from models.player import Player
+
+    player = make_player(balance='0.000000000000000000000000000000000003')
+    db.session.expire_all()
+
+    assert db.session.get(Player, player.id).wallet_balance == '0.000000000000000000000000000000000003'
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.pagination import encode_cursor, keyset_page, parse_cursor
+
+
+@pytest.fixture
+def players(db, make_player):
+    """Cinco jogadores; os três primeiros empatados em last_activity."""
+    from models.player import Player
+
+    base = datetime(2025, 1, 1, 12, 0, 0)
+    created = [make_player() for _ in range(5)]
+    for player, minutes in zip(created, (0, 0, 0, 5, 10)):
+        player.last_activity = base + timedelta(minutes=minutes)
+    db.session.commit()
+
+    # Ordem esperada: last_activity desc, id desc
+    expected = sorted(created, key=lambda player: (player.last_activity, player.id), reverse=True)
+    return Player, [player.id for player in expected]
+
+
+def _walk(Player, limit):
+    pages = []
+    after = None
+    while True:
+        items, next_cursor = keyset_page(Player.query, Player.last_activity, Player.id, after, limit)
+        pages.append([player.id for player in items])
+        if next_cursor is None:
+            return pages
+        after = parse_cursor(next_cursor)
+
+
+def test_pages_follow_the_sort_order_across_ties(players):
+    Player, expected = players
+
+    pages = _walk(Player, 2)
+
+    assert pages == [expected[0:2], expected[2:4], expected[4:5]]
+
+
+def test_no_cursor_when_the_last_page_is_exactly_full(players):
+    Player, expected = players
+
+    items, next_cursor = keyset_page(Player.query, Player.last_activity, Player.id, None, 5)
+
+    assert [player.id for player in items] == expected
+    assert next_cursor is None
+
+
+def test_cursor_after_the_last_item_returns_an_empty_page(db, players):
+    Player, expected = players
+    last = db.session.get(Player, expected[-1])
+
+    items, next_cursor = keyset_page(Player.query, Player.last_activity, Player.id, (last.last_activity, last.id), 2)
+
+    assert items == []
+    assert next_cursor is None
+
+
+def test_column_queries_can_be_paged(db, players):
+    Player, expected = players
+    query = db.session.query(Player.id, Player.last_activity)
+
+    items, next_cursor = keyset_page(query, Player.last_activity, Player.id, None, 3)
+
+    assert [row.id for row in items] == expected[:3]
+    assert parse_cursor(next_cursor) == (items[-1].last_activity, items[-1].id)
+
+
+def test_limit_must_be_positive(players):
+    Player, _ = players
+
+    with pytest.raises(ValueError):
+        keyset_page(Player.query, Player.last_activity, Player.id, None, 0)
+
+
+def test_cursor_round_trip():
+    moment = datetime(2025, 3, 4, 5, 6, 7, 890)
+
+    assert parse_cursor(encode_cursor(moment, 42)) == (moment, 42)
+    assert parse_cursor(encode_cursor(1500, 7), parse_value=int) == (1500, 7)
+
+
+def test_parse_cursor_without_value():
+    assert parse_cursor(None) is None
+    assert parse_cursor('') is None
+
+
+@pytest.mark.parametrize('cursor', ['42', ',42', 'not-a-date,1', '2025-01-01T00:00:00,abc'])
+def test_parse_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(ValueError):
+        parse_cursor(cursor)
@@ -0,0 +1,83 @@
+import bisect
+import random
+
+from utils.ranking import IndexableSkipList
+
+
+def _assert_matches(skip_list, expected):
+    assert len(skip_list) == len(expected)
+    assert skip_list.slice(0, len(expected) + 1) == expected
+    for position, key in enumerate(expected):
+        assert skip_list.index(key) == position
+        assert skip_list.slice(position, 1) == [key]
+
+
+def test_empty_list():
+    skip_list = IndexableSkipList()
+
+    assert len(skip_list) == 0
+    assert skip_list.index(1) is None
+    assert skip_list.slice(0, 10) == []
+    assert skip_list.remove(1) is False
+
+
+def test_insert_keeps_keys_ordered_and_indexed():
+    skip_list = IndexableSkipList()
+    keys = list(range(200))
+    random.Random(17).shuffle(keys)
+
+    for key in keys:
+        skip_list.insert(key)
+
+    _assert_matches(skip_list, sorted(keys))
+
+
+def test_random_inserts_and_removes_match_a_sorted_list():
+    rng = random.Random(42)
+    skip_list = IndexableSkipList()
+    expected = []
+
+    for _ in range(2000):
+        key = rng.randrange(500)
+        position = bisect.bisect_left(expected, key)
+        present = position < len(expected) and expected[position] == key
+
+        if present and rng.random() < 0.5:
+            assert skip_list.remove(key) is True
+            del expected[position]
+        elif not present:
+            skip_list.insert(key)
+            expected.insert(position, key)
+
+    _assert_matches(skip_list, expected)
+
+
+def test_remove_missing_key_leaves_list_unchanged():
+    skip_list = IndexableSkipList()
+    for key in (10, 20, 30):
+        skip_list.insert(key)
+
+    assert skip_list.remove(25) is False
+    assert skip_list.index(25) is None
+    _assert_matches(skip_list, [10, 20, 30])
+
+
+def test_slice_bounds():
+    skip_list = IndexableSkipList()
+    for key in range(10):
+        skip_list.insert(key)
+
+    assert skip_list.slice(8, 5) == [8, 9]
+    assert skip_list.slice(10, 5) == []
+    assert skip_list.slice(-1, 5) == []
+    assert skip_list.slice(3, 0) == []
+
+
+def test_ranking_keys_order_by_score_then_player():
+    # Chaves como as do ranking: estatísticas negadas e player_id no desempate
+    skip_list = IndexableSkipList()
+    for key in ((-5, -1, 3), (-7, 0, 1), (-5, -1, 2), (-5, -2, 4)):
+        skip_list.insert(key)
+
+    assert skip_list.slice(0, 4) == [(-7, 0, 1), (-5, -2, 4), (-5, -1, 2), (-5, -1, 3)]
+    assert skip_list.index((-5, -1, 2)) == 2
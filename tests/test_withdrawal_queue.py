@@ -0,0 +1,190 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.balance import BalanceService
+from utils.money import to_units
+from utils.withdrawal_queue import ChainAdapter, LocalStubChainAdapter, WithdrawalQueue
+
+WALLET = '0x' + 'a' * 40
+
+
+class ScriptedAdapter(ChainAdapter):
+    """Adaptador que devolve, a cada envio, o próximo resultado programado (ou levanta a exceção)."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.sent = []
+
+    def send_batch(self, transfers):
+        self.sent.append(transfers)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def queue(db):
+    adapter = WithdrawalQueue._adapter
+    yield WithdrawalQueue
+    WithdrawalQueue.set_adapter(adapter)
+
+
+@pytest.fixture
+def withdrawal(db, make_player):
+    """Saque de 4 DOOF de um jogador com 10 DOOF (6 DOOF restantes após a reserva)."""
+    player = make_player(balance='10')
+    request = WithdrawalQueue.enqueue(player.id, '4', WALLET)
+    db.session.commit()
+    return request
+
+
+def _reload(db, withdrawal):
+    db.session.expire_all()
+    return db.session.get(type(withdrawal), withdrawal.id)
+
+
+def _make_retryable(db, withdrawal):
+    # Passa o intervalo de espera entre tentativas
+    type(withdrawal).query.filter_by(id=withdrawal.id).update({
+        'updated_at': datetime.utcnow() - timedelta(seconds=WithdrawalQueue.retry_delay_seconds + 1)
+    })
+    db.session.commit()
+
+
+def test_empty_queue(queue):
+    queue.set_adapter(LocalStubChainAdapter())
+
+    assert queue.settle_batch() is None
+
+
+def test_enqueue_reserves_the_amount(withdrawal):
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('6')
+
+
+def test_enqueue_refuses_insufficient_balance(db, make_player):
+    player = make_player(balance='1')
+
+    assert WithdrawalQueue.enqueue(player.id, '4', WALLET) is None
+    assert BalanceService.balance_units(player.id) == to_units('1')
+
+
+def test_confirmed_transfer_completes(db, queue, withdrawal):
+    adapter = LocalStubChainAdapter()
+    queue.set_adapter(adapter)
+
+    assert queue.settle_batch() == 1
+
+    settled = _reload(db, withdrawal)
+    assert settled.status == settled.COMPLETED
+    assert settled.tx_hash.startswith('0x')
+    assert settled.settled_at is not None
+    assert [transfer['idempotency_key'] for transfer in adapter.sent] == [f'withdrawal:{withdrawal.id}']
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('6')
+
+
+def test_rejected_transfer_fails_and_refunds(db, queue, withdrawal):
+    queue.set_adapter(LocalStubChainAdapter(fail_addresses=[WALLET]))
+
+    assert queue.settle_batch() == 1
+
+    settled = _reload(db, withdrawal)
+    assert settled.status == settled.FAILED
+    assert settled.error
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('10')
+
+
+def test_missing_result_is_retried_without_refund(db, queue, withdrawal):
+    queue.set_adapter(ScriptedAdapter({}))
+
+    assert queue.settle_batch() == 0
+
+    pending = _reload(db, withdrawal)
+    assert pending.status == pending.PENDING
+    assert pending.attempts == 1
+    assert pending.batch_id is None
+    assert pending.error == 'No result from chain adapter'
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('6')
+
+    # Não é reenviado antes do intervalo entre tentativas
+    assert queue.settle_batch() is None
+
+
+def test_adapter_exception_is_retried_with_the_same_idempotency_key(db, queue, withdrawal):
+    adapter = ScriptedAdapter(TimeoutError('chain timeout'), {withdrawal.id: {'tx_hash': '0xabc'}})
+    queue.set_adapter(adapter)
+
+    assert queue.settle_batch() == 0
+    pending = _reload(db, withdrawal)
+    assert pending.status == pending.PENDING
+    assert pending.error == 'chain timeout'
+
+    _make_retryable(db, withdrawal)
+    assert queue.settle_batch() == 1
+
+    settled = _reload(db, withdrawal)
+    assert settled.status == settled.COMPLETED
+    assert settled.tx_hash == '0xabc'
+    assert settled.attempts == 2
+    keys = [transfer['idempotency_key'] for batch in adapter.sent for transfer in batch]
+    assert keys == [f'withdrawal:{withdrawal.id}'] * 2
+
+
+def test_unknown_outcome_goes_to_reconciliation_after_max_attempts(db, queue, withdrawal, monkeypatch):
+    monkeypatch.setattr(WithdrawalQueue, 'max_attempts', 2)
+    queue.set_adapter(ScriptedAdapter({}, RuntimeError('connection reset')))
+
+    assert queue.settle_batch() == 0
+    _make_retryable(db, withdrawal)
+    assert queue.settle_batch() == 0
+
+    flagged = _reload(db, withdrawal)
+    assert flagged.status == flagged.NEEDS_RECONCILIATION
+    assert flagged.attempts == 2
+    # Sem estorno: a transferência pode ter sido enviada
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('6')
+    assert queue.settle_batch() is None
+
+
+def test_resolving_a_missing_transfer_refunds_once(db, queue, withdrawal, monkeypatch):
+    monkeypatch.setattr(WithdrawalQueue, 'max_attempts', 1)
+    queue.set_adapter(ScriptedAdapter({}))
+    queue.settle_batch()
+
+    resolved = queue.resolve(withdrawal.id, error='Not found on chain')
+    db.session.commit()
+
+    assert resolved.status == resolved.FAILED
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('10')
+
+    assert queue.resolve(withdrawal.id, error='Not found on chain') is None
+    db.session.commit()
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('10')
+
+
+def test_resolving_a_found_transfer_completes(db, queue, withdrawal, monkeypatch):
+    monkeypatch.setattr(WithdrawalQueue, 'max_attempts', 1)
+    queue.set_adapter(ScriptedAdapter({}))
+    queue.settle_batch()
+
+    resolved = queue.resolve(withdrawal.id, tx_hash='0xdef')
+    db.session.commit()
+
+    assert resolved.status == resolved.COMPLETED
+    assert _reload(db, withdrawal).tx_hash == '0xdef'
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('6')
+
+
+def test_stale_processing_batches_go_to_reconciliation(db, queue, withdrawal):
+    type(withdrawal).query.filter_by(id=withdrawal.id).update({
+        'status': withdrawal.PROCESSING,
+        'updated_at': datetime.utcnow() - timedelta(seconds=WithdrawalQueue.stale_after_seconds + 1)
+    })
+    db.session.commit()
+
+    queue.flag_stale(datetime.utcnow())
+
+    flagged = _reload(db, withdrawal)
+    assert flagged.status == flagged.NEEDS_RECONCILIATION
+    assert BalanceService.balance_units(withdrawal.player_id) == to_units('6')
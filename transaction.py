@@ -1,11 +1,13 @@
 from database import db
 from datetime import datetime
+from utils.money import DoofAmount, encode_legacy_amounts
+from utils.schema import register_migration
 
 class Transaction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     receiver_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    amount = db.Column(db.String(100), nullable=False)
+    amount = db.Column(DoofAmount, nullable=False)
     currency = db.Column(db.String(10), nullable=False)
     transaction_type = db.Column(db.String(50), nullable=False) # e.g., 'transfer', 'purchase', 'mining_reward'
     item_id = db.Column(db.Integer, db.ForeignKey("items.id"), nullable=True)
@@ -24,3 +26,7 @@ class Transaction(db.Model):
         }
 
 
+@register_migration
+def encode_transaction_amounts():
+    """Converte valores gravados como string decimal para o formato de ponto fixo."""
+    db.session.execute(encode_legacy_amounts(Transaction.__table__.c.amount))
@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from models.user import User, db
 from models.security_log import LoginAttempt
+from utils.principal import PrincipalCache
 from utils.security import is_valid_email, is_valid_username, sanitize_input, check_login_attempts, generate_token, log_security_event
 
 user_bp = Blueprint('user', __name__)
@@ -101,6 +102,7 @@ def delete_user(user_id):
     
     db.session.delete(user)
     db.session.commit()
+    PrincipalCache.invalidate(user_id)
     return '', 204
 
 @user_bp.route('/login', methods=['POST'])
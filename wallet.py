@@ -1,124 +1,282 @@
+from decimal import InvalidOperation
 from flask import Blueprint, request, jsonify
 from models.user import db
 from models.player import Player
+from models.withdrawal import WithdrawalRequest
+from utils.balance import BalanceService
+from utils.money import to_units
+from utils.principal import current_player
+from utils.security import token_required, admin_required, log_security_event
+from utils.withdrawal_queue import WithdrawalQueue
 
 wallet_bp = Blueprint('wallet', __name__)
 
-@wallet_bp.route('/connect', methods=['POST'])
-def connect_wallet():
-    data = request.get_json()
-    player_id = data.get('player_id')
-    wallet_address = data.get('wallet_address')
-    
-    if not player_id or not wallet_address:
-        return jsonify({'error': 'Player ID and wallet address are required'}), 400
-    
-    player = Player.query.get(player_id)
+# Campos obrigatórios e mensagem de erro de cada operação de carteira
+WALLET_OPERATIONS = {
+    'connect': (('wallet_address',), 'Wallet address is required'),
+    'disconnect': ((), None),
+    'withdraw': (('amount', 'wallet_address'), 'Amount and wallet address are required'),
+    'deposit': (('player_id', 'amount', 'transaction_hash'), 'Player ID, amount, and transaction hash are required'),
+    'mine': (('player_id',), 'Player ID is required')
+}
+# Operações que creditam saldo sem verificação na blockchain: apenas administradores,
+# para o jogador indicado em player_id. As demais valem sempre para o jogador do token.
+ADMIN_OPERATIONS = ('deposit', 'mine')
+# Limite de operações por chamada de /batch
+MAX_BATCH_OPERATIONS = 100
+# Recompensa da mineração simulada da carteira
+MINING_REWARD = '0.0000001'
+
+
+def _validate_operation(operation_type, data):
+    """
+    Valida os campos de uma operação de carteira.
+
+    Returns:
+        str: Mensagem de erro, ou None se a operação for válida
+    """
+    if operation_type not in WALLET_OPERATIONS:
+        return 'Unknown wallet operation'
+
+    required, message = WALLET_OPERATIONS[operation_type]
+    if any(not data.get(field) for field in required):
+        return message
+
+    if 'player_id' in required:
+        try:
+            int(data['player_id'])
+        except (TypeError, ValueError):
+            return 'Player ID must be an integer'
+
+    if 'amount' in required:
+        try:
+            if to_units(data['amount']) <= 0:
+                return 'Amount must be positive'
+        except (InvalidOperation, ValueError):
+            return 'Invalid amount'
+
+    return None
+
+
+def _apply_operation(operation_type, data, player):
+    """
+    Aplica uma operação de carteira já validada, sem commit.
+
+    Returns:
+        tuple: (dados do resultado, código HTTP)
+    """
+    if operation_type == 'connect':
+        # Aqui seria implementada a lógica real de conexão com a carteira
+        # Por enquanto, apenas simulamos o sucesso
+        return {
+            'success': True,
+            'message': 'Wallet connected successfully',
+            'wallet_address': data['wallet_address']
+        }, 200
+
+    if operation_type == 'disconnect':
+        # Aqui seria implementada a lógica real de desconexão da carteira
+        # Por enquanto, apenas simulamos o sucesso
+        return {
+            'success': True,
+            'message': 'Wallet disconnected successfully'
+        }, 200
+
+    if operation_type == 'withdraw':
+        amount = str(data['amount'])
+        wallet_address = data['wallet_address']
+
+        # O valor fica reservado e a transferência é liquidada em lote pela fila de saques
+        withdrawal = WithdrawalQueue.enqueue(player.id, amount, wallet_address)
+        if not withdrawal:
+            return {'error': 'Insufficient balance'}, 400
+
+        return {
+            'success': True,
+            'message': f'Withdrawal of {amount} DOOF to {wallet_address} queued',
+            'withdrawal': withdrawal.to_dict(),
+            'status_url': f'/api/wallet/withdrawals/{withdrawal.id}'
+        }, 202
+
+    if operation_type == 'deposit':
+        amount = str(data['amount'])
+
+        # Aqui seria implementada a lógica real de verificação da transação na blockchain
+        # Por enquanto, apenas simulamos o sucesso
+        BalanceService.credit(player.id, amount, reason='deposit', reference=f"tx:{data['transaction_hash']}")
+
+        return {
+            'success': True,
+            'message': f'Successfully deposited {amount} DOOF'
+        }, 200
+
+    # Simulação de mineração - ganhar uma pequena quantidade de DOOF
+    BalanceService.credit(player.id, MINING_REWARD, reason='mining', reference='wallet_mine')
+
+    return {
+        'success': True,
+        'message': f'Successfully mined {MINING_REWARD} DOOF'
+    }, 200
+
+
+def _operation_player_id(operation_type, data):
+    """
+    Jogador afetado por uma operação já validada: o informado em player_id nas
+    operações administrativas, o do token nas demais.
+
+    Returns:
+        int: ID do jogador, ou None se o usuário autenticado não tiver jogador
+    """
+    if operation_type in ADMIN_OPERATIONS:
+        return int(data['player_id'])
+
+    player = current_player()
+    return player.id if player else None
+
+
+def _single_operation(operation_type):
+    """Executa uma operação isolada (uma requisição, um commit)."""
+    data = request.get_json() or {}
+
+    error = _validate_operation(operation_type, data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    player_id = _operation_player_id(operation_type, data)
+    player = db.session.get(Player, player_id) if player_id is not None else None
     if not player:
         return jsonify({'error': 'Player not found'}), 404
-    
-    # Aqui seria implementada a lógica real de conexão com a carteira
-    # Por enquanto, apenas simulamos o sucesso
-    
-    return jsonify({
-        'success': True,
-        'message': 'Wallet connected successfully',
-        'wallet_address': wallet_address
-    })
+
+    result, status = _apply_operation(operation_type, data, player)
+    if status >= 400:
+        db.session.rollback()
+        return jsonify(result), status
+
+    db.session.commit()
+
+    if operation_type in ('withdraw', 'deposit', 'mine'):
+        result['new_balance'] = player.wallet_balance
+
+    return jsonify(result), status
+
+
+@wallet_bp.route('/connect', methods=['POST'])
+@token_required
+def connect_wallet():
+    return _single_operation('connect')
 
 @wallet_bp.route('/disconnect', methods=['POST'])
+@token_required
 def disconnect_wallet():
-    data = request.get_json()
-    player_id = data.get('player_id')
-    
-    if not player_id:
-        return jsonify({'error': 'Player ID is required'}), 400
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'error': 'Player not found'}), 404
-    
-    # Aqui seria implementada a lógica real de desconexão da carteira
-    # Por enquanto, apenas simulamos o sucesso
-    
-    return jsonify({
-        'success': True,
-        'message': 'Wallet disconnected successfully'
-    })
+    return _single_operation('disconnect')
 
 @wallet_bp.route('/withdraw', methods=['POST'])
+@token_required
 def withdraw():
-    data = request.get_json()
-    player_id = data.get('player_id')
-    amount = data.get('amount')
-    wallet_address = data.get('wallet_address')
-    
-    if not player_id or not amount or not wallet_address:
-        return jsonify({'error': 'Player ID, amount, and wallet address are required'}), 400
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'error': 'Player not found'}), 404
-    
-    if player.dooficoin_balance < amount:
-        return jsonify({'error': 'Insufficient balance'}), 400
-    
-    # Aqui seria implementada a lógica real de transferência para a blockchain
-    # Por enquanto, apenas simulamos o sucesso
-    player.dooficoin_balance -= amount
-    db.session.commit()
-    
-    return jsonify({
-        'success': True,
-        'message': f'Successfully withdrawn {amount} DOOF to {wallet_address}',
-        'new_balance': player.dooficoin_balance
-    })
+    return _single_operation('withdraw')
 
 @wallet_bp.route('/deposit', methods=['POST'])
+@admin_required
 def deposit():
-    data = request.get_json()
-    player_id = data.get('player_id')
-    amount = data.get('amount')
-    transaction_hash = data.get('transaction_hash')
-    
-    if not player_id or not amount or not transaction_hash:
-        return jsonify({'error': 'Player ID, amount, and transaction hash are required'}), 400
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'error': 'Player not found'}), 404
-    
-    # Aqui seria implementada a lógica real de verificação da transação na blockchain
-    # Por enquanto, apenas simulamos o sucesso
-    player.dooficoin_balance += amount
-    db.session.commit()
-    
-    return jsonify({
-        'success': True,
-        'message': f'Successfully deposited {amount} DOOF',
-        'new_balance': player.dooficoin_balance
-    })
+    """Credita um depósito já confirmado na blockchain (apenas administradores)."""
+    return _single_operation('deposit')
 
 @wallet_bp.route('/mine', methods=['POST'])
+@admin_required
 def mine():
-    data = request.get_json()
-    player_id = data.get('player_id')
-    
-    if not player_id:
-        return jsonify({'error': 'Player ID is required'}), 400
-    
-    player = Player.query.get(player_id)
-    if not player:
-        return jsonify({'error': 'Player not found'}), 404
-    
-    # Simulação de mineração - ganhar uma pequena quantidade de DOOF
-    mining_reward = 0.0000001
-    player.dooficoin_balance += mining_reward
-    db.session.commit()
-    
-    return jsonify({
-        'success': True,
-        'message': f'Successfully mined {mining_reward} DOOF',
-        'new_balance': player.dooficoin_balance
-    })
+    """Credita a recompensa da mineração simulada (apenas administradores)."""
+    return _single_operation('mine')
+
+@wallet_bp.route('/withdrawals/<int:withdrawal_id>', methods=['GET'])
+@token_required
+def get_withdrawal(withdrawal_id):
+    """Consulta o andamento de um saque (pending, processing, completed ou failed)."""
+    withdrawal = db.session.get(WithdrawalRequest, withdrawal_id)
+    player = current_player()
+    # Saques de outros jogadores respondem como inexistentes
+    if not withdrawal or not player or withdrawal.player_id != player.id:
+        return jsonify({'error': 'Withdrawal not found'}), 404
+
+    return jsonify({'withdrawal': withdrawal.to_dict()})
+
+@wallet_bp.route('/batch', methods=['POST'])
+@token_required
+def batch():
+    """
+    Executa várias operações de carteira em uma única transação.
+
+    Corpo: {"operations": [{"type": "withdraw", "amount": "1.5", ...}, ...], "atomic": false}
+
+    As operações valem para o jogador do token; deposit e mine exigem privilégios
+    de administrador e usam o player_id de cada operação.
+
+    Todas as operações são validadas antes de qualquer alteração e os jogadores são
+    carregados em uma única consulta. Com atomic=true, qualquer falha desfaz o lote
+    inteiro; caso contrário, as operações bem-sucedidas são confirmadas juntas e as
+    demais são reportadas individualmente.
+    """
+    data = request.get_json() or {}
+    operations = data.get('operations')
+    atomic = bool(data.get('atomic', False))
+
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'A non-empty list of operations is required'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+
+    # Validar tudo antes de aplicar qualquer operação
+    errors = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors.append({'index': index, 'error': 'Operation must be an object'})
+            continue
+        error = _validate_operation(operation.get('type'), operation)
+        if not error and operation['type'] in ADMIN_OPERATIONS and not request.token_payload.get('is_admin', False):
+            error = 'Admin privileges required'
+        if error:
+            errors.append({'index': index, 'type': operation.get('type'), 'error': error})
+
+    if errors:
+        return jsonify({'error': 'Invalid operations', 'operations': errors}), 400
+
+    try:
+        # Carregar todos os jogadores envolvidos em uma única consulta
+        operation_player_ids = [_operation_player_id(operation['type'], operation) for operation in operations]
+        player_ids = {player_id for player_id in operation_player_ids if player_id is not None}
+        players = {player.id: player for player in Player.query.filter(Player.id.in_(player_ids)).all()}
+
+        results = []
+        failed = False
+        for index, operation in enumerate(operations):
+            player = players.get(operation_player_ids[index])
+            if not player:
+                result, status = {'error': 'Player not found'}, 404
+            else:
+                result, status = _apply_operation(operation['type'], operation, player)
+
+            failed = failed or status >= 400
+            results.append({'index': index, 'type': operation['type'], 'status': status, **result})
+
+            if failed and atomic:
+                break
+
+        if failed and atomic:
+            db.session.rollback()
+            return jsonify({'success': False, 'committed': False, 'results': results}), 409
+
+        db.session.commit()
+
+        # Saldos finais de todos os jogadores do lote em uma única consulta
+        balances = dict(db.session.query(Player.id, Player.wallet_balance).filter(Player.id.in_(player_ids)).all())
+
+        return jsonify({
+            'success': not failed,
+            'committed': True,
+            'results': results,
+            'balances': {str(player_id): balance for player_id, balance in balances.items()}
+        })
 
+    except Exception as e:
+        db.session.rollback()
+        log_security_event('wallet_batch_error', str(e), 'error')
+        return jsonify({'error': 'An error occurred while processing the wallet batch'}), 500
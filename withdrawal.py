@@ -0,0 +1,52 @@
+from database import db
+from datetime import datetime
+from utils.money import DoofAmount
+
+class WithdrawalRequest(db.Model):
+    """Saque para uma carteira externa, liquidado em lotes pela fila de saques."""
+
+    __tablename__ = 'withdrawal_requests'
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    # Desfecho do envio desconhecido: valor continua reservado até conferência manual
+    NEEDS_RECONCILIATION = 'needs_reconciliation'
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('players.id'), nullable=False)
+    amount = db.Column(DoofAmount, nullable=False)
+    wallet_address = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)  # pending, processing, completed, failed, needs_reconciliation
+    batch_id = db.Column(db.String(40), nullable=True)  # Lote de liquidação que processou o saque
+    tx_hash = db.Column(db.String(128), nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    settled_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Fila: próximos saques pendentes em ordem de chegada
+        db.Index('ix_withdrawal_requests_status_id', 'status', 'id'),
+        db.Index('ix_withdrawal_requests_player_created', 'player_id', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<WithdrawalRequest {self.id}: {self.amount} DOOF ({self.status})>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'player_id': self.player_id,
+            'amount': self.amount,
+            'wallet_address': self.wallet_address,
+            'status': self.status,
+            'tx_hash': self.tx_hash,
+            'error': self.error,
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'settled_at': self.settled_at.isoformat() if self.settled_at else None
+        }
@@ -0,0 +1,310 @@
+import abc
+import hashlib
+import importlib
+import uuid
+from datetime import datetime, timedelta
+from models.user import db
+from models.withdrawal import WithdrawalRequest
+from utils.background import PeriodicTask
+from utils.balance import BalanceService
+
+
+class ChainAdapter(abc.ABC):
+    """
+    Interface de envio de saques para a blockchain.
+
+    Implementações recebem um lote de transferências e devolvem o resultado de cada
+    uma. Cada transferência traz uma idempotency_key estável por saque, e o adaptador
+    é obrigado a respeitá-la: reenviar a mesma chave nunca pode gerar uma segunda
+    transferência, apenas devolver o resultado da primeira. A fila reenvia saques cujo
+    envio anterior terminou em exceção ou sem resultado.
+    """
+
+    @abc.abstractmethod
+    def send_batch(self, transfers):
+        """
+        Envia um lote de transferências.
+
+        Args:
+            transfers: Lista de dicts com id, idempotency_key, wallet_address e amount (string decimal)
+
+        Returns:
+            dict: id -> {'tx_hash': str} em caso de sucesso ou {'error': str} se a rede
+            recusou a transferência (nada foi enviado). Saques ausentes do resultado são
+            tratados como de desfecho desconhecido.
+        """
+
+
+class LocalStubChainAdapter(ChainAdapter):
+    """
+    Adaptador local para desenvolvimento e testes: confirma tudo com hashes determinísticos.
+
+    Nunca é usado por padrão; precisa ser escolhido em WITHDRAWAL_CHAIN_ADAPTER ou set_adapter.
+    """
+
+    def __init__(self, fail_addresses=()):
+        """
+        Args:
+            fail_addresses: Endereços cujos saques devem ser recusados (simulação de falha)
+        """
+        self.fail_addresses = set(fail_addresses)
+        self.sent = []
+        # idempotency_key -> tx_hash das transferências já enviadas
+        self._sent_keys = {}
+
+    def send_batch(self, transfers):
+        results = {}
+        for transfer in transfers:
+            if transfer['wallet_address'] in self.fail_addresses:
+                results[transfer['id']] = {'error': 'Transfer rejected by the stub chain'}
+                continue
+
+            key = transfer['idempotency_key']
+            if key not in self._sent_keys:
+                self.sent.append(transfer)
+                digest = hashlib.sha256(f"{key}:{transfer['wallet_address']}".encode()).hexdigest()
+                self._sent_keys[key] = f'0x{digest}'
+            results[transfer['id']] = {'tx_hash': self._sent_keys[key]}
+        return results
+
+
+class WithdrawalQueue:
+    """
+    Fila persistente de saques: o pedido reserva o saldo e a liquidação ocorre em lotes.
+
+    O valor reservado só é estornado quando o adaptador recusa explicitamente o saque.
+    Se o desfecho for desconhecido (exceção do adaptador, saque ausente do resultado ou
+    lote interrompido em processing), a transferência pode já estar na rede: o saque é
+    reenviado com a mesma chave de idempotência até max_attempts e depois vai para
+    needs_reconciliation, sem estorno, até um administrador resolvê-lo com resolve().
+    """
+
+    batch_size = 100
+    # Lotes processados por passagem da tarefa
+    max_batches_per_pass = 10
+    # Lotes em processing há mais tempo que isso vão para reconciliação manual
+    stale_after_seconds = 600
+    # Tentativas de envio com desfecho desconhecido antes de enviar o saque para reconciliação
+    max_attempts = 5
+    # Espera antes de reenviar um saque cuja tentativa anterior falhou
+    retry_delay_seconds = 60
+
+    _adapter = None
+    _task = None
+
+    @staticmethod
+    def start(app):
+        """
+        Inicia a liquidação periódica com os parâmetros configurados na aplicação.
+
+        Falha na inicialização se nenhum adaptador foi configurado, em vez de
+        liquidar saques com um adaptador simulado.
+        """
+        WithdrawalQueue.batch_size = app.config.get('WITHDRAWAL_BATCH_SIZE', WithdrawalQueue.batch_size)
+
+        adapter_path = app.config.get('WITHDRAWAL_CHAIN_ADAPTER')
+        if adapter_path and WithdrawalQueue._adapter is None:
+            module_name, class_name = adapter_path.rsplit('.', 1)
+            WithdrawalQueue.set_adapter(getattr(importlib.import_module(module_name), class_name)())
+        WithdrawalQueue.get_adapter()
+
+        if WithdrawalQueue._task is None:
+            WithdrawalQueue._task = PeriodicTask(
+                'withdrawal_settlement',
+                app.config.get('WITHDRAWAL_SETTLE_SECONDS', 10),
+                WithdrawalQueue.run_once
+            )
+
+        WithdrawalQueue._task.start(app)
+
+    @staticmethod
+    def set_adapter(adapter):
+        """Define o adaptador de blockchain usado na liquidação."""
+        WithdrawalQueue._adapter = adapter
+
+    @staticmethod
+    def get_adapter():
+        if WithdrawalQueue._adapter is None:
+            raise RuntimeError('No withdrawal chain adapter configured (set WITHDRAWAL_CHAIN_ADAPTER)')
+        return WithdrawalQueue._adapter
+
+    @staticmethod
+    def enqueue(player_id, amount, wallet_address):
+        """
+        Cria um pedido de saque e reserva o valor no saldo do jogador (sem commit).
+
+        Args:
+            player_id: ID do jogador
+            amount: Quantidade em DOOF (string decimal)
+            wallet_address: Endereço de destino
+
+        Returns:
+            WithdrawalRequest: O pedido criado, ou None se o saldo for insuficiente
+        """
+        withdrawal = WithdrawalRequest(player_id=player_id, amount=amount, wallet_address=wallet_address)
+        db.session.add(withdrawal)
+        db.session.flush()
+
+        if not BalanceService.debit(player_id, amount, reason='withdrawal', reference=f'withdrawal:{withdrawal.id}'):
+            db.session.delete(withdrawal)
+            db.session.flush()
+            return None
+
+        return withdrawal
+
+    @staticmethod
+    def run_once(now=None):
+        """
+        Executa uma passagem de liquidação.
+
+        Returns:
+            int: Quantidade de saques finalizados (concluídos ou estornados)
+        """
+        now = now or datetime.utcnow()
+        WithdrawalQueue.flag_stale(now)
+
+        settled = 0
+        for _ in range(WithdrawalQueue.max_batches_per_pass):
+            count = WithdrawalQueue.settle_batch()
+            if count is None:
+                break
+            settled += count
+
+        return settled
+
+    @staticmethod
+    def flag_stale(now):
+        """
+        Envia para reconciliação os lotes que ficaram em processing (ex.: processo
+        interrompido durante o envio). Não são reenviados: o envio pode ter ocorrido.
+        """
+        cutoff = now - timedelta(seconds=WithdrawalQueue.stale_after_seconds)
+        WithdrawalRequest.query.filter(
+            WithdrawalRequest.status == WithdrawalRequest.PROCESSING,
+            WithdrawalRequest.updated_at < cutoff
+        ).update({
+            'status': WithdrawalRequest.NEEDS_RECONCILIATION,
+            'error': 'Settlement interrupted; outcome unknown'
+        }, synchronize_session=False)
+        db.session.commit()
+
+    @staticmethod
+    def _claim_batch():
+        """Marca o próximo lote de saques pendentes como processing e o retorna."""
+        batch_id = uuid.uuid4().hex
+        retry_cutoff = datetime.utcnow() - timedelta(seconds=WithdrawalQueue.retry_delay_seconds)
+        next_ids = db.session.query(WithdrawalRequest.id).filter(
+            WithdrawalRequest.status == WithdrawalRequest.PENDING,
+            db.or_(WithdrawalRequest.attempts == 0, WithdrawalRequest.updated_at < retry_cutoff)
+        ).order_by(WithdrawalRequest.id).limit(WithdrawalQueue.batch_size).scalar_subquery()
+
+        WithdrawalRequest.query.filter(
+            WithdrawalRequest.id.in_(next_ids),
+            WithdrawalRequest.status == WithdrawalRequest.PENDING
+        ).update({
+            'status': WithdrawalRequest.PROCESSING,
+            'batch_id': batch_id,
+            'attempts': WithdrawalRequest.attempts + 1,
+            'updated_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+
+        return WithdrawalRequest.query.filter_by(batch_id=batch_id).order_by(WithdrawalRequest.id).all()
+
+    @staticmethod
+    def settle_batch():
+        """
+        Envia um lote ao adaptador e registra os resultados com um único commit.
+        Saques recusados são marcados como failed e o valor reservado é estornado;
+        saques de desfecho desconhecido voltam para a fila ou vão para reconciliação.
+
+        Returns:
+            int: Saques finalizados no lote, ou None se a fila estava vazia
+        """
+        withdrawals = WithdrawalQueue._claim_batch()
+        if not withdrawals:
+            return None
+
+        transfers = [{
+            'id': withdrawal.id,
+            'idempotency_key': f'withdrawal:{withdrawal.id}',
+            'wallet_address': withdrawal.wallet_address,
+            'amount': withdrawal.amount
+        } for withdrawal in withdrawals]
+
+        adapter_error = None
+        try:
+            results = WithdrawalQueue.get_adapter().send_batch(transfers)
+        except Exception as e:
+            # Falha do adaptador (ex.: rede ou timeout): o envio pode ter ocorrido
+            results = None
+            adapter_error = str(e)[:255]
+
+        now = datetime.utcnow()
+        settled = 0
+        for withdrawal in withdrawals:
+            result = results.get(withdrawal.id) if results is not None else None
+
+            if result and result.get('tx_hash'):
+                withdrawal.status = WithdrawalRequest.COMPLETED
+                withdrawal.tx_hash = result['tx_hash']
+                withdrawal.settled_at = now
+                settled += 1
+            elif result and result.get('error'):
+                WithdrawalQueue._fail(withdrawal, result['error'], now)
+                settled += 1
+            else:
+                withdrawal.error = adapter_error if results is None else 'No result from chain adapter'
+                if withdrawal.attempts < WithdrawalQueue.max_attempts:
+                    withdrawal.status = WithdrawalRequest.PENDING
+                    withdrawal.batch_id = None
+                else:
+                    withdrawal.status = WithdrawalRequest.NEEDS_RECONCILIATION
+
+        db.session.commit()
+        return settled
+
+    @staticmethod
+    def _fail(withdrawal, error, now):
+        """Marca o saque como failed e estorna o valor reservado (sem commit)."""
+        withdrawal.status = WithdrawalRequest.FAILED
+        withdrawal.error = str(error)[:255]
+        withdrawal.settled_at = now
+        BalanceService.credit(
+            withdrawal.player_id,
+            withdrawal.amount,
+            reason='withdrawal_refund',
+            reference=f'withdrawal:{withdrawal.id}'
+        )
+
+    @staticmethod
+    def resolve(withdrawal_id, tx_hash=None, error=None):
+        """
+        Finaliza um saque em reconciliação depois de conferido na rede (sem commit).
+
+        Args:
+            withdrawal_id: ID do saque
+            tx_hash: Hash da transferência encontrada na rede (conclui o saque)
+            error: Motivo, se a transferência não existe na rede (estorna o valor)
+
+        Returns:
+            WithdrawalRequest: O saque finalizado, ou None se não estava em reconciliação
+        """
+        now = datetime.utcnow()
+        # Atualização condicional: duas resoluções concorrentes não estornam duas vezes
+        claimed = WithdrawalRequest.query.filter(
+            WithdrawalRequest.id == withdrawal_id,
+            WithdrawalRequest.status == WithdrawalRequest.NEEDS_RECONCILIATION
+        ).update({
+            'status': WithdrawalRequest.COMPLETED if tx_hash else WithdrawalRequest.FAILED,
+            'settled_at': now
+        }, synchronize_session=False)
+        if not claimed:
+            return None
+
+        withdrawal = db.session.get(WithdrawalRequest, withdrawal_id, populate_existing=True)
+        if tx_hash:
+            withdrawal.tx_hash = tx_hash
+        else:
+            WithdrawalQueue._fail(withdrawal, error, now)
+        return withdrawal